@@ -0,0 +1,79 @@
+# Usage (from the discord/ directory): python -m bench.classifier [recorded_happenings.txt]
+
+import random, sys, time
+from classifier import EVENTS, classify
+
+SEQUENTIAL = [(eventType, regex) for (eventType, verb, regex) in EVENTS]
+
+def classifySequential(text: str):
+    for (eventType, regex) in SEQUENTIAL:
+        match = regex.match(text)
+        if match is not None:
+            return (eventType, match.groups())
+    return None
+
+def nation(rng: random.Random) -> str:
+    return f"nation_{rng.randrange(250000)}"
+
+def region(rng: random.Random) -> str:
+    return f"region_{rng.randrange(20000)}"
+
+# (weight, template) roughly matching what the SSE buckets deliver during an update
+TEMPLATES = [
+    (40, lambda r: f"%%{region(r)}%% updated."),
+    (12, lambda r: f"@@{nation(r)}@@ relocated from %%{region(r)}%% to %%{region(r)}%%."),
+    (10, lambda r: f"@@{nation(r)}@@ endorsed @@{nation(r)}@@."),
+    (4, lambda r: f"@@{nation(r)}@@ withdrew its endorsement from @@{nation(r)}@@."),
+    (6, lambda r: f"@@{nation(r)}@@ was founded in %%{region(r)}%%."),
+    (2, lambda r: f"@@{nation(r)}@@ was refounded in %%{region(r)}%%."),
+    (3, lambda r: f"@@{nation(r)}@@ ceased to exist in %%{region(r)}%%."),
+    (3, lambda r: f"@@{nation(r)}@@ was admitted to the World Assembly."),
+    (2, lambda r: f"@@{nation(r)}@@ resigned from the World Assembly."),
+    (2, lambda r: f"@@{nation(r)}@@ applied to join the World Assembly."),
+    (2, lambda r: f"@@{nation(r)}@@ altered its national flag."),
+    (1, lambda r: f"@@{nation(r)}@@ became WA Delegate of %%{region(r)}%%."),
+    (1, lambda r: f"@@{nation(r)}@@ lost WA Delegate status in %%{region(r)}%%."),
+    (1, lambda r: f"@@{nation(r)}@@ seized the position of %%{region(r)}%% WA Delegate from @@{nation(r)}@@."),
+    (2, lambda r: f"@@{nation(r)}@@ lodged <a href=\"/region=x/page=display_region_rmb?postid=123#p123\">a message</a> on the %%{region(r)}%% Regional Message Board."),
+    (8, lambda r: f"@@{nation(r)}@@ changed its national motto to \"Lorem ipsum\"."),
+    (1, lambda r: f"Following new legislation in @@{nation(r)}@@, cats are now legal."),
+]
+
+def synthetic(count: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    weights = [t[0] for t in TEMPLATES]
+    makers = [t[1] for t in TEMPLATES]
+    return [rng.choices(makers, weights)[0](rng) for _ in range(count)]
+
+def measure(name: str, function, happenings: list[str], rounds: int = 5) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for text in happenings:
+            function(text)
+        best = min(best, time.perf_counter() - start)
+
+    rate = len(happenings) / best
+    print(f"{name:>12}: {rate:,.0f} events/sec ({best * 1000:.1f} ms for {len(happenings)} events)")
+    return rate
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as file:
+            happenings = [line.rstrip("\n") for line in file if line.strip()]
+        print(f"Loaded {len(happenings)} recorded happenings from {sys.argv[1]}")
+    else:
+        happenings = synthetic(200000)
+        print(f"Generated {len(happenings)} synthetic happenings")
+
+    for text in happenings:
+        old = classifySequential(text)
+        new = classify(text)
+        assert (old is None and new is None) or (old == (new.type, new.args)), text
+
+    old = measure("sequential", classifySequential, happenings)
+    new = measure("dispatched", classify, happenings)
+    print(f"speedup: {new / old:.2f}x")
+
+if __name__ == "__main__":
+    main()
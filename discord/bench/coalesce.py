@@ -0,0 +1,39 @@
+# Usage (from the discord/ directory): python -m bench.coalesce [nations [callers]]
+
+import asyncio, sys, time
+import sans
+from cogs.api import PROFILE_FULL
+from limiter import PRIORITY_RECRUITMENT
+from standin import StandInServer, StandInWorld
+from bench.rebuild import StandInAPIClient
+
+async def run(count: int, callers: int):
+    sans.set_agent("Polaris benchmark")
+
+    server = StandInServer(StandInWorld.synthetic(count), latency=0.2, limit=1_000_000)
+    await server.start()
+
+    api = StandInAPIClient(server)
+    api.limiter.limit = 1_000_000
+
+    try:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(api.fetchNationFields(nationId, PROFILE_FULL, PRIORITY_RECRUITMENT)
+                                         for nationId in server.nationIds for _ in range(callers)))
+        seconds = time.perf_counter() - start
+        assert all(result is not None for result in results)
+    finally:
+        await api.client.aclose()
+        await server.stop()
+
+    print(f"{count} nations, {callers} concurrent fetches each")
+    print(f"{len(results)} fetches answered by {server.served} requests in {seconds:.1f} s, "
+          f"{api.coalesced} saved ({api.coalesced / len(results):.0%})")
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    callers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    asyncio.run(run(count, callers))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# Usage (from the discord/ directory): python -m bench.dumps [nations.xml.gz region [regions.xml.gz]]
+
+import gzip, os, random, sys, tempfile, time
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+from dumps import loadNationsDump, loadRegionsDump, openDump, peakRss
+
+CENSUS_SCALES = 88
+
+def writeSyntheticNationsDump(path: str, count: int, regions: int, seed: int = 1) -> None:
+    rng = random.Random(seed)
+
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n<NATIONS api_version="12">\n')
+        for i in range(count):
+            waStatus = rng.choice(["Non-member", "Non-member", "WA Member"])
+            endorsements = ",".join(f"nation_{rng.randrange(count)}" for _ in range(rng.randrange(10))) if waStatus != "Non-member" else ""
+            census = "".join(
+                f'<SCALE id="{scale}"><SCORE>{rng.random() * 1000:.2f}</SCORE><RANK>{rng.randrange(count)}</RANK><RRANK>{rng.randrange(100)}</RRANK></SCALE>'
+                for scale in range(CENSUS_SCALES)
+            )
+            file.write(
+                f"<NATION><NAME>Nation {i}</NAME><TYPE>Republic</TYPE><FULLNAME>The Republic of Nation {i}</FULLNAME>"
+                f"<MOTTO>{escape('Peace & Prosperity')}</MOTTO><CATEGORY>Democratic Socialists</CATEGORY>"
+                f"<UNSTATUS>{waStatus}</UNSTATUS><ENDORSEMENTS>{endorsements}</ENDORSEMENTS>"
+                f"<REGION>Region {rng.randrange(regions)}</REGION><POPULATION>{rng.randrange(5, 30000)}</POPULATION>"
+                f"<FLAG>https://www.nationstates.net/images/flags/Default.svg</FLAG>"
+                f"<FIRSTLOGIN>{1500000000 + i}</FIRSTLOGIN><LASTLOGIN>{1700000000 + i}</LASTLOGIN>"
+                f"<CENSUS>{census}</CENSUS></NATION>\n"
+            )
+        file.write("</NATIONS>\n")
+
+def writeSyntheticRegionsDump(path: str, nations: int, regions: int, seed: int = 1) -> None:
+    rng = random.Random(seed)
+    members = [[] for _ in range(regions)]
+    for i in range(nations):
+        # A few huge regions and a long tail of tiny ones, like the real world
+        members[min(int(rng.paretovariate(1.2)) - 1, regions - 1)].append(f"nation_{i}")
+
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n<REGIONS>\n')
+        for i in range(regions):
+            tags = "<TAG>Puppet Storage</TAG>" if i % 50 == 0 else ""
+            file.write(
+                f"<REGION><NAME>Region {i}</NAME><NUMNATIONS>{len(members[i])}</NUMNATIONS>"
+                f"<NATIONS>{":".join(members[i])}</NATIONS><DELEGATE>0</DELEGATE>"
+                f"<FACTBOOK>{escape('Welcome to the region & enjoy your stay')}</FACTBOOK>"
+                f"<TAGS>{tags}<TAG>Medium</TAG></TAGS><LASTUPDATE>1700000000</LASTUPDATE></REGION>\n"
+            )
+        file.write("</REGIONS>\n")
+
+def main():
+    if len(sys.argv) > 2:
+        run(sys.argv[1], sys.argv[2])
+        if len(sys.argv) > 3:
+            runRegions(sys.argv[3])
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "nations.xml.gz")
+        writeSyntheticNationsDump(path, 50000, 500)
+        print(f"Generated synthetic nations dump ({os.path.getsize(path) // 1024} KiB compressed)")
+        run(path, "region_7")
+
+        path = os.path.join(directory, "regions.xml.gz")
+        writeSyntheticRegionsDump(path, 250000, 20000)
+        print(f"Generated synthetic regions dump ({os.path.getsize(path) // 1024} KiB compressed)")
+        runRegions(path)
+
+def runRegions(path: str):
+    dump, stats = loadRegionsDump(path)
+    print(f"indexed {stats.parsed} regions ({dump.nations.residents()} nations) in {stats.seconds:.2f} seconds ({stats.rate():,.0f} regions/sec)")
+    print(f"region membership footprint: {dump.nations.footprint() // 1024} KiB")
+    print(f"index added {stats.rssGrowth // 1024} MiB resident, peak RSS {stats.peakRss // 1024} MiB")
+    print(f"tags: {", ".join(f"{tag} ({len(regions)})" for tag, regions in dump.tags.items())}")
+
+# Baseline: build and clear an element for every record
+def iterparseCount(path: str) -> int:
+    count = 0
+    with openDump(path) as file:
+        root = None
+        for event, element in ET.iterparse(file, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = element
+            elif element.tag == "NATION":
+                count += 1
+                element.clear()
+                root.clear()
+    return count
+
+def run(path: str, region: str):
+    before = peakRss()
+    nations, stats = loadNationsDump(path, region)
+    print(f"parsed {stats.parsed} nations in {stats.seconds:.2f} seconds ({stats.rate():,.0f} nations/sec)")
+    print(f"matched {stats.matched} nations in {region}")
+    print(f"peak RSS {stats.peakRss // 1024} MiB (was {before // 1024} MiB before parsing)")
+
+    start = time.perf_counter()
+    count = iterparseCount(path)
+    seconds = time.perf_counter() - start
+    print(f"iterparse baseline: {count} nations in {seconds:.2f} seconds ({count / seconds:,.0f} nations/sec)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Usage (from the discord/ directory): python -m bench.endorsements [wa_nations]
+
+import random, sys, time
+from classes import *
+from cogs.cache import CacheManager
+
+class StandInBot:
+    region = "bench_region"
+
+    def get_cog(self, name):
+        return None
+
+def buildCache(count: int, seed: int = 1) -> CacheManager:
+    rng = random.Random(seed)
+    cache = CacheManager(StandInBot(), "bench_region")
+
+    nationIds = [f"nation_{i}" for i in range(count)]
+    residents = set(nationIds) | {f"resident_{i}" for i in range(count * 4)}
+    cache.mainRegion = Region("bench_region", "Bench Region", residents, nationIds[0], {}, set(), time.time())
+    cache.regionalNations.pin("bench_region", residents)
+    cache.waNations = set(nationIds) | {f"elsewhere_{i}" for i in range(30000)}
+    cache.recountRegionWa()
+
+    for nationId in nationIds:
+        # A few nations endorse nearly everyone, most endorse a handful
+        share = min(1.0, rng.paretovariate(1.5) / 20)
+        endorsers = set(rng.sample(nationIds, int(share * count)))
+        endorsers.discard(nationId)
+        cache.storeNation(Nation(nationId, nationId, "", WA_MEMBER, "bench_region", endorsers,
+                                 0, 0, True, 0, 0, time.time(), time.time()))
+
+    return cache
+
+# What endorsementsGiven did before the index
+def endorsementsGivenScan(cache: CacheManager, nationId: str) -> set[str]:
+    endorsements = set()
+    for endorsee in cache.regionWaNations():
+        if endorsee == nationId:
+            continue
+
+        if nationId in cache.nation(endorsee).endorsements and cache.verifyEndo(endorsee, nationId):
+            endorsements.add(endorsee)
+
+    return endorsements
+
+def timeCalls(function, nationIds: list[str]) -> float:
+    start = time.perf_counter()
+    for nationId in nationIds:
+        function(nationId)
+    return (time.perf_counter() - start) / len(nationIds)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    cache = buildCache(count)
+    rng = random.Random(2)
+    sample = rng.sample(sorted(cache.regionWaNations()), 200)
+
+    for nationId in sample:
+        assert endorsementsGivenScan(cache, nationId) == cache.endorsementsGiven(nationId)
+
+    given = sum(len(cache.endorsementsGiven(nationId)) for nationId in sample) / len(sample)
+    print(f"{count} WA nations, {given:.0f} endorsements given on average")
+
+    scan = timeCalls(lambda nationId: endorsementsGivenScan(cache, nationId), sample)
+    indexed = timeCalls(cache.endorsementsGiven, sample)
+    print(f"full scan: {scan * 1e6:,.0f} us per call")
+    print(f"index:     {indexed * 1e6:,.0f} us per call ({scan / indexed:.0f}x faster)")
+
+    # What /wastats computed on every call before the counters
+    start = time.perf_counter()
+    scanned = sum(len(cache.verifiedEndorsements(nationId)) for nationId in cache.waNations & cache.mainRegion.nations)
+    scan = time.perf_counter() - start
+
+    start = time.perf_counter()
+    counted = cache.regionEndorsementsGiven()
+    counter = time.perf_counter() - start
+
+    assert scanned == counted
+    print(f"regional endorsements given ({counted}): {scan * 1e3:,.1f} ms recomputed, {counter * 1e6:,.2f} us from the counters")
+
+    # Keeping the index current costs a little on every endorsement event
+    pairs = [(rng.choice(sample), rng.choice(sample)) for _ in range(50000)]
+    start = time.perf_counter()
+    for (targetId, sourceId) in pairs:
+        cache.addEndorsement(targetId, sourceId)
+    for (targetId, sourceId) in pairs:
+        try:
+            cache.removeEndorsement(targetId, sourceId)
+        except KeyError:
+            pass
+    seconds = time.perf_counter() - start
+    print(f"index upkeep: {seconds / (2 * len(pairs)) * 1e9:,.0f} ns per endorse/unendorse event")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Usage (from the discord/ directory): python -m bench.indexes [wa_nations]
+
+import random, sys, time
+from bench.endorsements import buildCache
+
+SECONDS_IN_A_DAY = 86400
+
+# What /inactive did before the index
+def inactiveScan(cache, days: int) -> list[str]:
+    inactive = []
+    for nationId in list(cache.regionWaNations()):
+        nation = cache.nation(nationId)
+        daysSinceLastLogin = (time.time() - nation.lastLogin) // SECONDS_IN_A_DAY
+        if daysSinceLastLogin >= days:
+            inactive.append((nation.id, daysSinceLastLogin))
+    inactive.sort(key=lambda a: a[1], reverse=True)
+    return [nationId for (nationId, _) in inactive]
+
+def topScan(cache, count: int) -> list[str]:
+    return sorted(cache.regionWaNations(), key=cache.verifiedEndorsementCount, reverse=True)[:count]
+
+def timeCalls(function, repeat: int = 50) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(3)
+    cache = buildCache(count)
+
+    now = int(time.time())
+    for nationId in cache.regionWaNations():
+        cache.nation(nationId).lastLogin = now - int(rng.expovariate(1 / (5 * SECONDS_IN_A_DAY)))
+    cache.recountRegionWa()
+
+    idle = cache.idleSince(time.time() - 7 * SECONDS_IN_A_DAY)
+    assert set(inactiveScan(cache, 7)) == {nationId for (_, nationId) in idle.page(0, len(idle))}
+    print(f"{count} WA nations, {len(idle)} idle for a week or more")
+
+    scan = timeCalls(lambda: inactiveScan(cache, 7))
+    indexed = timeCalls(lambda: cache.idleSince(time.time() - 7 * SECONDS_IN_A_DAY).page(0, 10))
+    print(f"/inactive first page: {scan * 1e3:,.2f} ms scanning, {indexed * 1e6:,.1f} us from the index")
+
+    scan = timeCalls(lambda: topScan(cache, 20))
+    indexed = timeCalls(lambda: cache.mostEndorsed().page(0, 20))
+    assert [cache.verifiedEndorsementCount(n) for n in topScan(cache, 20)] == [key for (key, _) in cache.mostEndorsed().page(0, 20)]
+    print(f"top 20 by endorsements: {scan * 1e3:,.2f} ms scanning, {indexed * 1e6:,.1f} us from the index")
+
+    nationIds = sorted(cache.regionWaNations())
+    pairs = [(rng.choice(nationIds), rng.choice(nationIds)) for _ in range(50000)]
+    start = time.perf_counter()
+    for (nationId, endorserId) in pairs:
+        cache.addEndorsement(nationId, endorserId)
+        cache.resetLogin(endorserId)
+    seconds = time.perf_counter() - start
+    print(f"endorsement + login event with index upkeep: {seconds / len(pairs) * 1e6:,.1f} us")
+
+if __name__ == "__main__":
+    main()
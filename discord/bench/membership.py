@@ -0,0 +1,65 @@
+# Usage (from the discord/ directory): python -m bench.membership [nations [regions]]
+
+import random, sys, time, tracemalloc
+from storage import RegionMembership
+
+def buildWorld(nations: int, regions: int, seed: int = 5) -> dict[str, list[str]]:
+    rng = random.Random(seed)
+    world = {f"region_{i}": [] for i in range(regions)}
+    for i in range(nations):
+        regionId = f"region_{min(int(rng.paretovariate(1.2)) - 1, regions - 1)}"
+        world[regionId].append(f"nation_{i}")
+    return world
+
+def measure(build) -> tuple[object, int]:
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+def timeLookups(contains, pairs: list[tuple[str, str]]) -> float:
+    start = time.perf_counter()
+    for (regionId, nationId) in pairs:
+        contains(regionId, nationId)
+    return (time.perf_counter() - start) / len(pairs)
+
+def buildMembership(world: dict[str, list[str]], capBytes: int = 0) -> RegionMembership:
+    membership = RegionMembership(capBytes)
+    for (regionId, nationIds) in world.items():
+        membership.replace(regionId, nationIds)
+    return membership
+
+def main():
+    nations = int(sys.argv[1]) if len(sys.argv) > 1 else 250000
+    regions = int(sys.argv[2]) if len(sys.argv) > 2 else 30000
+    world = buildWorld(nations, regions)
+
+    # Copy the names so neither structure shares strings with the generated world
+    sets, setBytes = measure(lambda: {regionId: {"".join(n) for n in nationIds} for (regionId, nationIds) in world.items()})
+    membership, arrayBytes = measure(lambda: buildMembership(world))
+
+    print(f"{nations} nations in {regions} regions")
+    print(f"dict of sets:      {setBytes / 1024 ** 2:,.1f} MiB")
+    print(f"RegionMembership:  {arrayBytes / 1024 ** 2:,.1f} MiB ({setBytes / arrayBytes:.1f}x smaller), "
+          f"footprint() reports {membership.footprint() / 1024 ** 2:,.1f} MiB")
+
+    rng = random.Random(6)
+    regionIds = list(world)
+    pairs = [(rng.choice(regionIds), f"nation_{rng.randrange(nations)}") for _ in range(200000)]
+    setLookup = timeLookups(lambda regionId, nationId: nationId in sets[regionId], pairs)
+    arrayLookup = timeLookups(membership.contains, pairs)
+    print(f"lookup: {setLookup * 1e9:,.0f} ns with sets, {arrayLookup * 1e9:,.0f} ns with sorted arrays")
+
+    # Weeks of moves into regions nobody cares about, with little room left under the cap
+    capBytes = membership.footprint() + 1024 * 1024
+    capped = buildMembership(world, capBytes)
+    start = time.perf_counter()
+    for i in range(200000):
+        capped.add(f"new_region_{rng.randrange(100000)}", f"mover_{i}")
+    seconds = time.perf_counter() - start
+    print(f"200000 moves under a {capBytes // 1024} KiB cap: {seconds / 200000 * 1e9:,.0f} ns each, "
+          f"{capped.footprint() // 1024} KiB used, {capped.evicted} regions evicted, {len(capped)} tracked")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Usage (from the discord/ directory): python -m bench.nations [wa_nations]
+
+import random, sys, time, tracemalloc
+from dataclasses import dataclass
+from classes import *
+from storage import NationIds, EndorsementSet
+import cogs.cache
+from bench.endorsements import buildCache
+
+@dataclass
+class UnslottedNation:
+    id: str
+    name: str
+    flagUrl: str
+    waStatus: int
+    region: str
+    endorsements: set[str]
+    residencyNum: float
+    population: int
+    canRecruit: bool
+    lastLogin: int
+    foundedAt: int
+    lastApiUpdateTime: float
+    lastResidencyUpdateTime: float
+    flagDirty: bool = False
+
+def endorsementLists(count: int, seed: int = 1) -> list[list[str]]:
+    rng = random.Random(seed)
+    nationIds = [f"nation_{i}" for i in range(count)]
+    lists = []
+    for _ in nationIds:
+        share = min(1.0, rng.paretovariate(1.5) / 20)
+        lists.append(rng.sample(nationIds, int(share * count)))
+    return lists
+
+def measure(build) -> tuple[object, int]:
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+def build(cls, lists: list[list[str]], pack) -> list:
+    now = time.time()
+    # Copy every name, as each API response does
+    return [cls(f"nation_{i}", f"Nation {i}", "https://www.nationstates.net/images/flags/Default.svg", WA_MEMBER,
+                "bench_region", pack(["".join(name) for name in names]), 1.5, 100, True, int(now), int(now), now, now)
+            for (i, names) in enumerate(lists)]
+
+def timeQuery(function, nationIds: list[str]) -> float:
+    start = time.perf_counter()
+    for nationId in nationIds:
+        function(nationId)
+    return (time.perf_counter() - start) / len(nationIds)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    lists = endorsementLists(count)
+    endorsements = sum(len(names) for names in lists)
+    print(f"{count} WA nations, {endorsements / count:.0f} endorsements each on average")
+
+    table = NationIds()
+    for (name, cls, pack) in [
+        ("dataclass, set", UnslottedNation, set),
+        ("slots, set", Nation, set),
+        ("slots, EndorsementSet", Nation, lambda names: EndorsementSet(table, names)),
+    ]:
+        _, size = measure(lambda: build(cls, lists, pack))
+        print(f"{name:>22}: {size / count:,.0f} bytes per nation")
+
+    rng = random.Random(2)
+    for compact in (False, True):
+        cogs.cache.COMPACT_ENDORSEMENTS = compact
+        cache = buildCache(count)
+        sample = rng.sample(sorted(cache.regionWaNations()), 200)
+        pairs = [(rng.choice(sample), rng.choice(sample)) for _ in range(20000)]
+
+        start = time.perf_counter()
+        for (nationId, endorserId) in pairs:
+            endorserId in cache.nation(nationId).endorsements
+        contains = (time.perf_counter() - start) / len(pairs)
+
+        verified = timeQuery(cache.verifiedEndorsements, sample)
+        recount = timeQuery(cache.recount, sample)
+        print(f"{"compact" if compact else "sets":>7}: membership test {contains * 1e9:,.0f} ns, "
+              f"verifiedEndorsements {verified * 1e6:,.0f} us, recount {recount * 1e6:,.0f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Usage (from the discord/ directory): python -m bench.nationstore [admits]
+
+import random, sys, tracemalloc
+from classes import *
+from cogs.cache import FOREIGN_NATION_CACHE_SIZE, FOREIGN_NATION_MAX_AGE
+from storage import NationStore
+
+def foreignNation(nationId: str, fetchedAt: float) -> Nation:
+    return Nation(nationId, nationId, "", WA_MEMBER, "elsewhere", {f"endorser_{i}" for i in range(5)},
+                  0, 0, True, 0, 0, fetchedAt, fetchedAt)
+
+class Clock:
+    now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def replay(store, clock: Clock, admits: int, seed: int = 8) -> tuple[int, int, list[int]]:
+    rng = random.Random(seed)
+    hits = misses = 0
+    samples = []
+
+    tracemalloc.start()
+    for i in range(admits):
+        # An admission a minute, a quarter of them nations we've seen before
+        now = clock.now = i * 60.0
+        nationId = f"nation_{rng.randrange(i + 1)}" if rng.random() < 0.25 else f"nation_{i}"
+
+        nation = store.get(nationId) if isinstance(store, dict) else store.lookup(nationId)
+        if nation is None:
+            misses += 1
+            nation = foreignNation(nationId, now)
+            if isinstance(store, dict):
+                store[nationId] = nation
+            else:
+                store.put(nation)
+        else:
+            hits += 1
+
+        if i % (admits // 5) == admits // 5 - 1:
+            samples.append(tracemalloc.get_traced_memory()[0])
+    tracemalloc.stop()
+
+    return hits, misses, samples
+
+def main():
+    admits = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{admits} WA admissions, one a minute ({admits / 1440:.0f} days)")
+
+    clock = Clock()
+    for (name, store) in [
+        ("dict", {}),
+        ("NationStore", NationStore(lambda nation: False, FOREIGN_NATION_CACHE_SIZE, FOREIGN_NATION_MAX_AGE, clock=clock)),
+    ]:
+        hits, misses, samples = replay(store, clock, admits)
+        growth = ", ".join(f"{size / 1024 ** 2:.1f}" for size in samples)
+        print(f"{name:>11}: {len(store)} nations kept, {hits} hits, {misses} misses, MiB held over time: {growth}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Usage (from the discord/ directory): python -m bench.offline [nations [events]]
+
+import asyncio, logging, random, sys, time
+import sans
+from cogs.cache import CacheManager
+from cogs.events import EventListener
+from ledger import accountTo, SUBSYSTEM_REBUILD
+from standin import StandInServer, StandInWorld
+from bench.rebuild import StandInAPIClient, WINDOW
+
+class StandInBot:
+    region = "bench_region"
+
+    def __init__(self):
+        self.cogs = {}
+        self.extra_events = {}
+
+    def get_cog(self, name):
+        return self.cogs.get(name)
+
+    def dispatch(self, *args):
+        pass
+
+async def run(count: int, events: int):
+    sans.set_agent("Polaris benchmark")
+    logging.disable(logging.WARNING)
+
+    world = StandInWorld.synthetic(count)
+    server = StandInServer(world, latency=0.05, limit=50, window=WINDOW)
+    await server.start()
+
+    bot = StandInBot()
+    api = bot.cogs["APIClient"] = StandInAPIClient(server)
+    listener = bot.cogs["EventListener"] = EventListener(bot)
+    cache = bot.cogs["CacheManager"] = CacheManager(bot, "bench_region")
+    bot.extra_events = {name: [getattr(cache, name)] for name in dir(cache) if name.startswith("on_event")}
+
+    try:
+        start = time.perf_counter()
+        with accountTo(SUBSYSTEM_REBUILD):
+            await cache.rebuildCache()
+        seconds = time.perf_counter() - start
+
+        matching = sum(set(cache.nation(nationId).endorsements) == set(nation.endorsements)
+                       for (nationId, nation) in world.nations.items())
+        print(f"{count} WA nations: rebuilt in {seconds:.1f} s with {server.served} requests, "
+              f"{matching}/{count} nations match the stand-in")
+
+        rows = api.ledger.rows()
+        print(f"ledger booked {sum(row['requests'] for row in rows)} requests:")
+        for row in rows:
+            print(f"  {row['subsystem']:>8} {row['endpoint']:<45} {row['requests']:>4} requests, "
+                  f"{row['bytes']:>7,} bytes, p50 {row['p50'] * 1e3:.0f} ms, p99 {row['p99'] * 1e3:.0f} ms")
+
+        await listener.on_startJobs()
+        # Lets the SSE connection open before anything is published
+        await asyncio.sleep(0.5)
+
+        rng = random.Random(5)
+        pairs = []
+        while len(pairs) < events:
+            (sourceId, targetId) = rng.sample(server.nationIds, 2)
+            if sourceId not in world.nations[targetId].endorsements:
+                world.nations[targetId].endorsements.append(sourceId)
+                pairs.append((sourceId, targetId))
+
+        start = time.perf_counter()
+        for (sourceId, targetId) in pairs:
+            server.publish(f"@@{sourceId}@@ endorsed @@{targetId}@@.")
+        while listener.queueStats.handled < events and time.perf_counter() - start < 30:
+            await asyncio.sleep(0.01)
+        seconds = time.perf_counter() - start
+
+        applied = sum(sourceId in cache.nation(targetId).endorsements for (sourceId, targetId) in pairs)
+        print(f"{events} endorsements over SSE: {applied} applied in {seconds * 1e3:,.0f} ms "
+              f"({listener.queueStats.handled / seconds:,.0f} events/s)")
+    finally:
+        await listener.close()
+        for worker in listener.workers:
+            worker.cancel()
+        await api.client.aclose()
+        await server.stop()
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 150
+    events = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    asyncio.run(run(count, events))
+
+if __name__ == "__main__":
+    main()
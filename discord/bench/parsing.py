@@ -0,0 +1,137 @@
+# Usage (from the discord/ directory): python -m bench.parsing [directory [repeats]]
+
+import os, random, statistics, sys, time, tracemalloc
+import httpx, sans
+from xml.sax.saxutils import escape
+from classes import *
+from cogs.api import parseWaMembers, parseRegion, parseRMBPosts
+
+def syntheticWa(count: int, rng: random.Random) -> bytes:
+    members = ",".join(f"nation_{i}_{rng.randrange(10**6)}" for i in range(count))
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n<WA council="1"><MEMBERS>{members}</MEMBERS></WA>'.encode()
+
+def syntheticRegion(count: int, rng: random.Random) -> bytes:
+    nations = ":".join(f"nation_{i}_{rng.randrange(10**6)}" for i in range(count))
+    officers = "".join(
+        f"<OFFICER><NATION>officer_{i}</NATION><OFFICE>{escape('Minister of Foreign Affairs & Recruitment')}</OFFICE>"
+        f"<AUTHORITY>ABCEP</AUTHORITY><TIME>1700000000</TIME><BY>officer_0</BY><ORDER>{i}</ORDER></OFFICER>"
+        for i in range(12)
+    )
+    recruiters = ",".join(f"officer_{i}" for i in range(4))
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n<REGION id="the_big_region"><NAME>The Big Region</NAME>'
+            f"<NATIONS>{nations}</NATIONS><DELEGATE>officer_0</DELEGATE><OFFICERS>{officers}</OFFICERS>"
+            f"<RECRUITERS>{recruiters}</RECRUITERS></REGION>").encode()
+
+def syntheticMessages(count: int, rng: random.Random) -> bytes:
+    posts = []
+    for i in range(count):
+        status = rng.choice([RMB_NORMAL_POST] * 8 + [RMB_SUPPRESSED, RMB_SELF_DELETED])
+        # Escaped like NationStates does it, apostrophes included
+        text = escape(" ".join(rng.choice(["[b]Welcome[/b]", "to", "the", "region's", "&", "<3", "quoted", "\"hi\"",
+                                           "recruitment", "[url=https://www.nationstates.net]link[/url]"])
+                               for _ in range(rng.randrange(20, 200))), {"\"": "&quot;", "'": "&#039;"})
+        suppressor = "<SUPPRESSOR>officer_0</SUPPRESSOR>" if status == RMB_SUPPRESSED else ""
+        posts.append(f'<POST id="{1000 + i}"><TIMESTAMP>{1700000000 + i}</TIMESTAMP><NATION>nation_{i}</NATION>'
+                     f"<STATUS>{status}</STATUS>{suppressor}<LIKES>0</LIKES><MESSAGE>{text}</MESSAGE></POST>")
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n<REGION id="the_big_region">'
+            f"<MESSAGES>{''.join(posts)}</MESSAGES></REGION>").encode()
+
+# The ElementTree parsers the scanning ones replaced, as the baseline
+
+def treeWaMembers(response: sans.Response) -> set[str]:
+    return set(response.xml.find("./MEMBERS").text.split(","))
+
+def treeRegion(response: sans.Response, id: str) -> Region:
+    name = response.xml.find("./NAME").text
+    delegate = response.xml.find("./DELEGATE").text
+    if delegate == "0":
+        delegate = None
+
+    nationList = response.xml.find("./NATIONS").text
+    nations = set(nationList.split(":")) if nationList else []
+    recruiterList = response.xml.find("./RECRUITERS").text
+    recruiters = set(recruiterList.split(",")) if recruiterList else []
+
+    officers = {}
+    for officerNode in response.xml.findall("./OFFICERS/OFFICER"):
+        nation = officerNode.find("./NATION").text
+        officers[nation] = RegionalOfficer(nation, officerNode.find("./OFFICE").text,
+                                           Authority.parse(officerNode.find("./AUTHORITY").text))
+
+    return Region(id, name, nations, delegate, officers, recruiters, lastApiUpdateTime=0)
+
+def treeRMBPosts(response: sans.Response) -> list[RMBMessage]:
+    messages = []
+    for post in response.xml.findall("./MESSAGES/POST"):
+        status = int(post.find("./STATUS").text)
+        message = RMBMessage(int(post.attrib["id"]), int(post.find("./TIMESTAMP").text), post.find("./NATION").text,
+                             status, None, None)
+        if status != RMB_MOD_SUPPRESSED and status != RMB_SELF_DELETED:
+            message.content = post.find("./MESSAGE").text
+        if status == RMB_SUPPRESSED:
+            message.suppressor = post.find("./SUPPRESSOR").text
+        messages.append(message)
+
+    return messages
+
+def newResponse(body: bytes) -> sans.Response:
+    return sans.Response(200, content=body, headers={"content-type": "text/xml; charset=UTF-8"},
+                         request=httpx.Request("GET", "https://www.nationstates.net/cgi-bin/api.cgi"))
+
+def sameRegion(region: Region) -> Region:
+    region.lastApiUpdateTime = 0
+    return region
+
+# (result, median CPU seconds per parse, peak bytes allocated while parsing)
+def measure(parse, body: bytes, repeats: int):
+    times = []
+    for _ in range(repeats):
+        # sans keeps the parsed tree on the response, so every parse gets a fresh one
+        response = newResponse(body)
+        start = time.process_time()
+        result = parse(response)
+        times.append(time.process_time() - start)
+        del result
+    seconds = statistics.median(times)
+    result = parse(newResponse(body))
+
+    response = newResponse(body)
+    tracemalloc.start()
+    parse(response)
+    (_, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return (result, seconds, peak)
+
+def load(directory: str | None, name: str, generate) -> tuple[bytes, str]:
+    path = os.path.join(directory, name) if directory else None
+    if path and os.path.exists(path):
+        with open(path, "rb") as file:
+            return (file.read(), "saved")
+    return (generate(random.Random(1)), "synthetic")
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else None
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    cases = [
+        ("wa members", "wa.xml", lambda rng: syntheticWa(30000, rng), treeWaMembers, parseWaMembers),
+        ("region", "region.xml", lambda rng: syntheticRegion(10000, rng),
+         lambda response: sameRegion(treeRegion(response, "the_big_region")),
+         lambda response: sameRegion(parseRegion(response, "the_big_region"))),
+        ("rmb messages", "messages.xml", lambda rng: syntheticMessages(100, rng), treeRMBPosts, parseRMBPosts),
+    ]
+
+    for (label, name, generate, tree, scan) in cases:
+        (body, origin) = load(directory, name, generate)
+        (expected, treeSeconds, treePeak) = measure(tree, body, repeats)
+        (result, scanSeconds, scanPeak) = measure(scan, body, repeats)
+        assert result == expected, f"{label}: parsers disagree"
+
+        print(f"{label:>12} ({origin}, {len(body) / 1024:,.0f} KiB): "
+              f"tree {treeSeconds * 1e3:6.2f} ms {treePeak / 1024:7,.0f} KiB peak, "
+              f"scan {scanSeconds * 1e3:6.2f} ms {scanPeak / 1024:7,.0f} KiB peak "
+              f"({treeSeconds / scanSeconds:.1f}x faster, {scanPeak / treePeak:.0%} of the memory)")
+
+if __name__ == "__main__":
+    main()
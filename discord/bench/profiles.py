@@ -0,0 +1,52 @@
+# Usage (from the discord/ directory): python -m bench.profiles [fetches]
+
+import asyncio, sys, time
+import sans
+from cogs.api import NATION_PROFILES, parseNationShards
+from limiter import PRIORITY_BACKGROUND
+from standin import StandInServer, StandInWorld
+from bench.rebuild import StandInAPIClient
+from bench.parsing import newResponse
+
+async def run(fetches: int):
+    sans.set_agent("Polaris benchmark")
+
+    server = StandInServer(StandInWorld.synthetic(fetches), latency=0, limit=1_000_000)
+    await server.start()
+
+    api = StandInAPIClient(server)
+    api.limiter.limit = 1_000_000
+
+    full = None
+    try:
+        print(f"{fetches} fetches per profile")
+        for profile in NATION_PROFILES:
+            bytesBefore = server.bytesServed
+            start = time.process_time()
+            for nationId in server.nationIds:
+                assert await api.fetchNationFields(nationId, profile, PRIORITY_BACKGROUND, fresh=True) is not None
+            seconds = (time.process_time() - start) / fetches
+            size = (server.bytesServed - bytesBefore) / fetches
+
+            responses = [newResponse(server.nationXml(nationId, NATION_PROFILES[profile]).encode())
+                         for nationId in server.nationIds]
+            start = time.process_time()
+            for response in responses:
+                parseNationShards(response, NATION_PROFILES[profile])
+            parsing = (time.process_time() - start) / fetches
+
+            if full is None:
+                full = (size, parsing)
+            print(f"{profile:>14}: {size:4,.0f} bytes ({size / full[0]:4.0%}), "
+                  f"parse {parsing * 1e6:4.1f} us ({parsing / full[1]:4.0%}), "
+                  f"end-to-end {seconds * 1e6:5,.0f} us CPU per fetch")
+    finally:
+        await api.client.aclose()
+        await server.stop()
+
+def main():
+    fetches = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    asyncio.run(run(fetches))
+
+if __name__ == "__main__":
+    main()
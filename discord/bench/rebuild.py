@@ -0,0 +1,78 @@
+# Usage (from the discord/ directory): python -m bench.rebuild [nations [latency]]
+
+import asyncio, math, sys, time
+import sans
+from classes import Region
+from limiter import RequestLimiter, PRIORITY_BACKGROUND, RESERVED_SLOTS
+from rebuild import RebuildProgress, fetchAll, importanceOrder
+from cogs.api import APIClient
+from standin import StandInServer, StandInWorld
+
+LIMIT = 45
+WINDOW = 5
+
+class StandInAPIClient(APIClient):
+    def __init__(self, server: StandInServer):
+        super().__init__(None, server.url())
+        self.limiter = RequestLimiter(LIMIT, WINDOW)
+
+async def fetchSerial(nationIds: list[str], fetch) -> RebuildProgress:
+    progress = RebuildProgress(len(nationIds))
+    for nationId in nationIds:
+        if await fetch(nationId):
+            progress.done += 1
+        else:
+            progress.failed += 1
+    return progress
+
+async def run(count: int, latency: float):
+    sans.set_agent("Polaris benchmark")
+
+    # The stand-in allows a little more than the limiter, like the real API does
+    server = StandInServer(StandInWorld.synthetic(count), latency=latency, limit=50, window=WINDOW)
+    await server.start()
+
+    region = Region("bench_region", "Bench Region", set(server.nationIds), "nation_7", {}, set(), 0)
+    order = importanceOrder(set(server.nationIds), region, lambda nationId: len(server.world.nations[nationId].endorsements))
+
+    print(f"{count} nations, {latency * 1000:.0f} ms latency, limiter at {LIMIT} requests per {WINDOW} seconds")
+    print(f"first fetched: {", ".join(order[:3])} (delegate, then most endorsed)")
+
+    modes = [
+        ("serial", lambda fetch: fetchSerial(order, fetch)),
+        ("pipelined x4", lambda fetch: fetchAll(order, fetch, 4)),
+        ("pipelined x8", lambda fetch: fetchAll(order, fetch, 8)),
+    ]
+
+    for (name, runner) in modes:
+        api = StandInAPIClient(server)
+        server.rejected = 0
+        server.maxInFlight = 0
+
+        # Start every mode from an empty server-side window
+        await asyncio.sleep(WINDOW)
+
+        async def fetch(nationId: str) -> bool:
+            return await api.fetchNation(nationId, PRIORITY_BACKGROUND) is not None
+
+        start = time.perf_counter()
+        progress = await runner(fetch)
+        seconds = time.perf_counter() - start
+
+        # Each window lets the background lane send all but its reserved slots
+        perWindow = LIMIT - RESERVED_SLOTS[PRIORITY_BACKGROUND]
+        bound = (math.ceil(progress.total / perWindow) - 1) * WINDOW
+        print(f"{name:>13}: {progress.done} fetched in {seconds:.1f} s ({progress.done / seconds:.1f}/s), "
+              f"{server.maxInFlight} in flight at most, {server.rejected} 429s, rate-limit bound {bound:.1f} s")
+
+        await api.client.aclose()
+
+    await server.stop()
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.25
+    asyncio.run(run(count, latency))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Usage (from the discord/ directory): python -m bench.regionupdate [regions]
+
+import asyncio, random, sys, time
+from classes import *
+from bench.endorsements import buildCache
+
+class StandInBot:
+    region = "bench_region"
+
+    def get_cog(self, name):
+        return None
+
+    def dispatch(self, *args):
+        pass
+
+def buildWorld(regions: int, seed: int = 3):
+    rng = random.Random(seed)
+    cache = buildCache(2000)
+    cache.bot = StandInBot()
+
+    members = {f"region_{i}": [] for i in range(regions)}
+    for i in range(regions * 12):
+        regionId = f"region_{min(int(rng.paretovariate(1.2)) - 1, regions - 1)}"
+        members[regionId].append(f"world_{i}")
+    for (regionId, nationIds) in members.items():
+        cache.regionalNations.replace(regionId, nationIds)
+
+    # Foreign WA nations fetched when they joined the WA somewhere else
+    for i in range(3000):
+        regionId = f"region_{rng.randrange(regions)}"
+        nationId = f"foreign_{i}"
+        members[regionId].append(nationId)
+        cache.regionalNations.add(regionId, nationId)
+        cache.waNations.add(nationId)
+        endorsers = set(rng.sample(members[regionId], min(5, len(members[regionId]))))
+        cache.storeNation(Nation(nationId, nationId, "", WA_MEMBER, regionId, endorsers,
+                                 0, 0, True, 0, 0, time.time(), time.time()))
+
+    return cache, members
+
+# What on_eventRegionUpdate did before tracking pending nations
+async def regionUpdateScan(cache, members: dict[str, list[str]], regionId: str) -> None:
+    if regionId in cache.regionalNations:
+        for nation in members.get(regionId, cache.regionalNations.pinned.get(regionId, ())):
+            if cache.isNationCached(nation):
+                cache.setEndorsements(nation, cache.verifiedEndorsements(nationId=nation))
+
+async def replay(handler, regionIds: list[str]) -> float:
+    start = time.process_time()
+    for regionId in regionIds:
+        await handler(regionId)
+    return time.process_time() - start
+
+async def run(regions: int):
+    regionIds = ["bench_region"] + [f"region_{i}" for i in range(regions)]
+
+    cache, members = buildWorld(regions)
+    scan = await replay(lambda regionId: regionUpdateScan(cache, members, regionId), regionIds)
+
+    cache, _ = buildWorld(regions)
+    # The first update after a rebuild or re-sync re-verifies the whole main region
+    first = await replay(cache.on_eventRegionUpdate, regionIds)
+
+    # A typical update: a day of endorsements, some from nations outside the region
+    rng = random.Random(4)
+    nationIds = sorted(cache.regionWaNations())
+    for _ in range(500):
+        cache.addEndorsement(rng.choice(nationIds), rng.choice(nationIds))
+    for i in range(20):
+        cache.addEndorsement(rng.choice(nationIds), f"world_{i}")
+    pending = sum(len(nations) for nations in cache.pendingReverify.values())
+    typical = await replay(cache.on_eventRegionUpdate, regionIds)
+
+    print(f"{len(regionIds)} RegionUpdate events, 2000 WA nations in the main region, 3000 foreign nations cached")
+    print(f"re-verify every cached resident: {scan * 1e3:,.0f} ms CPU")
+    print(f"pending only, after a re-sync:  {first * 1e3:,.0f} ms CPU")
+    print(f"pending only, typical update:    {typical * 1e3:,.0f} ms CPU ({pending} nations pending)")
+
+def main():
+    regions = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    asyncio.run(run(regions))
+
+if __name__ == "__main__":
+    main()
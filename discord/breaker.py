@@ -0,0 +1,48 @@
+import logging, time
+from typing import Callable
+
+logger = logging.getLogger("breaker")
+
+class CircuitBreaker:
+    def __init__(self, threshold: int, cooldown: float, clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.openUntil = 0.0
+        # Times the breaker has opened
+        self.trips = 0
+
+    def isOpen(self) -> bool:
+        return self.failures >= self.threshold
+
+    # Seconds until a call may be let through, 0 if one may go now
+    def wait(self) -> float:
+        if not self.isOpen():
+            return 0.0
+        return max(0.0, self.openUntil - self.clock())
+
+    # While open, the first call after the cooldown probes and everyone else waits another one
+    def allow(self) -> bool:
+        if not self.isOpen():
+            return True
+
+        if self.clock() < self.openUntil:
+            return False
+
+        self.openUntil = self.clock() + self.cooldown
+        return True
+
+    def succeeded(self) -> None:
+        if self.isOpen():
+            logger.info("NationStates API is answering again, closing the circuit breaker")
+        self.failures = 0
+
+    def failed(self) -> None:
+        self.failures += 1
+        if self.failures == self.threshold:
+            self.trips += 1
+            logger.warning(f"{self.failures} API requests failed in a row, failing fast for {self.cooldown} seconds")
+
+        if self.isOpen():
+            self.openUntil = self.clock() + self.cooldown
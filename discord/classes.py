@@ -7,7 +7,7 @@ NON_WA = 0
 WA_MEMBER = 1
 WA_DELEGATE = 2
 
-@dataclass
+@dataclass(slots=True)
 class Nation:
     id: str
     name: str
@@ -17,15 +17,21 @@ class Nation:
     endorsements: set[str]
     residencyNum: float
     population: int
-    canRecruit: bool
+    canRecruit: bool | None # None until fetched, the dumps don't say
     lastLogin: int
     foundedAt: int
     lastApiUpdateTime: float
     lastResidencyUpdateTime: float
     flagDirty: bool = False
+    # When lastLogin alone was last confirmed, without refetching everything else
+    lastLoginUpdateTime: float = 0.0
 
     def resetLogin(self):
         self.lastLogin = int(time.time())
+        self.lastLoginUpdateTime = time.time()
+
+    def loginCheckedAt(self) -> float:
+        return max(self.lastApiUpdateTime, self.lastLoginUpdateTime)
 
     def resetResidency(self):
         self.residencyNum = 0
@@ -34,7 +40,7 @@ class Nation:
     def residency(self):
         return self.residencyNum + ((time.time() - self.lastResidencyUpdateTime) / 86400)
 
-@dataclass
+@dataclass(slots=True)
 class Authority:
     successor: bool
     appearance: bool
@@ -62,13 +68,13 @@ class Authority:
         
         return authority
 
-@dataclass
+@dataclass(slots=True)
 class RegionalOfficer:
     nationId: str
     officeName: str
     authority: Authority
 
-@dataclass
+@dataclass(slots=True)
 class Region:
     id: str
     name: str
@@ -124,4 +130,10 @@ class RMBMessage:
     nation: str
     status: int
     suppressor: str | None
-    content: str | None
\ No newline at end of file
+    content: str | None
+
+@dataclass
+class WorldEvent:
+    id: int
+    timestamp: int
+    text: str
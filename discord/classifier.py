@@ -0,0 +1,67 @@
+import re
+from dataclasses import dataclass
+
+# (event type, verb following the leading nation/region, pattern)
+EVENTS: list[tuple[str, str, re.Pattern]] = [
+    ("RegionUpdate", None, re.compile(r"%%([a-z0-9_\-]+)%% updated\.")),
+    ("Endo", "endorsed", re.compile(r"@@([a-z0-9_\-]+)@@ endorsed @@([a-z0-9_\-]+)@@")),
+    ("Unendo", "withdrew", re.compile(r"@@([a-z0-9_\-]+)@@ withdrew its endorsement from @@([a-z0-9_\-]+)@@")),
+    ("WaApply", "applied", re.compile(r"@@([a-z0-9_\-]+)@@ applied to join the World Assembly")),
+    ("WaAdmit", "was", re.compile(r"@@([a-z0-9_\-]+)@@ was admitted to the World Assembly")),
+    ("WaResign", "resigned", re.compile(r"@@([a-z0-9_\-]+)@@ resigned from the World Assembly")),
+    ("NewDelegate", "became", re.compile(r"@@([a-z0-9_\-]+)@@ became WA Delegate of %%([a-z0-9_\-]+)%%")),
+    ("ReplaceDelegate", "seized", re.compile(r"@@([a-z0-9_\-]+)@@ seized the position of %%([a-z0-9_\-]+)%% WA Delegate from @@([a-z0-9_\-]+)@@")),
+    ("LoseDelegate", "lost", re.compile(r"@@([a-z0-9_\-]+)@@ lost WA Delegate status in %%([a-z0-9_\-]+)%%")),
+    ("Founding", "was", re.compile(r"@@([a-z0-9_\-]+)@@ was (founded|refounded) in %%([a-z0-9_\-]+)%%")),
+    ("Cte", "ceased", re.compile(r"@@([a-z0-9_\-]+)@@ ceased to exist in %%([a-z0-9_\-]+)%%")),
+    ("Move", "relocated", re.compile(r"@@([a-z0-9_\-]+)@@ relocated from %%([a-z0-9_\-]+)%% to %%([a-z0-9_\-]+)%%")),
+    ("Rmb", "lodged", re.compile(r"@@([a-z0-9_\-]+)@@ lodged <a href=\"/region=(?:[a-z0-9_\-]+)/page=display_region_rmb\?postid=([0-9]+)#p(?:[0-9]+)\">a message</a> on the %%([a-z0-9_\-]+)%% Regional Message Board")),
+    ("Flag", "altered", re.compile(r"@@([a-z0-9_\-]+)@@ altered its national flag")),
+    ("Suppress", "suppressed", re.compile(r"@@([a-z0-9_\-]+)@@ suppressed a post on the %%([a-z0-9_\-]+)%% Regional Message Board")),
+    ("Unsuppress", "unsuppressed", re.compile(r"@@([a-z0-9_\-]+)@@ unsuppressed a post on the %%([a-z0-9_\-]+)%% Regional Message Board")),
+]
+
+REGION_EVENTS: list[tuple[str, re.Pattern]] = [
+    (eventType, regex) for (eventType, verb, regex) in EVENTS if verb is None
+]
+
+NATION_EVENTS: dict[str, list[tuple[str, re.Pattern]]] = {}
+for (eventType, verb, regex) in EVENTS:
+    if verb is not None:
+        NATION_EVENTS.setdefault(verb, []).append((eventType, regex))
+
+@dataclass
+class Happening:
+    type: str
+    args: tuple[str, ...]
+
+def candidates(text: str) -> list[tuple[str, re.Pattern]] | None:
+    if text.startswith("%%"):
+        return REGION_EVENTS
+
+    if not text.startswith("@@"):
+        return None
+
+    # Nation IDs can't contain '@', so the first "@@ " closes the leading nation
+    verbStart = text.find("@@ ", 2)
+    if verbStart == -1:
+        return None
+    verbStart += 3
+
+    verbEnd = text.find(" ", verbStart)
+    if verbEnd == -1:
+        verbEnd = len(text)
+
+    return NATION_EVENTS.get(text[verbStart:verbEnd])
+
+def classify(text: str) -> Happening | None:
+    patterns = candidates(text)
+    if patterns is None:
+        return None
+
+    for (eventType, regex) in patterns:
+        match = regex.match(text)
+        if match is not None:
+            return Happening(eventType, match.groups())
+
+    return None
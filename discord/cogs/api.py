@@ -1,193 +1,556 @@
-import sans, logging, httpx, asyncio, time
+import sans, logging, httpx, asyncio, time, os, random, io, json, math, email.utils
+import xml.etree.ElementTree as ET
+from typing import Any, Callable, TypeVar
+import discord
 from discord.ext import commands
+from discord import app_commands
 from lib import normalize
 from classes import *
+from limiter import RequestLimiter, PRIORITY_INTERACTIVE, PRIORITY_RECRUITMENT, PRIORITY_BACKGROUND, PRIORITY_IDLE
+from breaker import CircuitBreaker
+from storage import ResponseCache
+from ledger import BudgetLedger
+from scan import iterElements, rootElement, childElements, requireChildren, leafElement, requireLeaves, elementText, attribute
+from views.apistats import getApiStatsEmbed
+from views.error import getManageGuildRequiredEmbed
 
 logger = logging.getLogger("api")
 
+# NationStates allows 50 requests per 30 seconds, keep a little headroom for clock drift
+API_LIMIT = int(os.getenv("POLARIS_API_LIMIT", "45"))
+API_WINDOW = 30
+
+# e.g. http://127.0.0.1:8080 for standin.py
+API_URL = os.getenv("POLARIS_API_URL")
+# Requests to anything else (server-sent events, dumps) are streams and left off the ledger
+API_PATH = sans.API_URL.path
+
+# Seconds a call may take by lane, queueing and retries included
+DEADLINES = {
+    PRIORITY_INTERACTIVE: int(os.getenv("POLARIS_DEADLINE_INTERACTIVE", "20")),
+    PRIORITY_RECRUITMENT: int(os.getenv("POLARIS_DEADLINE_RECRUITMENT", "60")),
+    PRIORITY_BACKGROUND: int(os.getenv("POLARIS_DEADLINE_BACKGROUND", "600")),
+    PRIORITY_IDLE: int(os.getenv("POLARIS_DEADLINE_IDLE", "60")),
+}
+
+# Retry n waits a random time of up to RETRY_BASE_DELAY * 2^n seconds, capped at RETRY_MAX_DELAY
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+
+# Dump downloads are retried the same way, with longer waits, before giving up
+DUMP_ATTEMPTS = int(os.getenv("POLARIS_DUMP_ATTEMPTS", "5"))
+DUMP_RETRY_BASE_DELAY = 10.0
+
+# Consecutive failures before failing fast, and for how many seconds
+BREAKER_THRESHOLD = int(os.getenv("POLARIS_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = int(os.getenv("POLARIS_BREAKER_COOLDOWN", "30"))
+
+# Seconds of requests /apistats looks back over
+LEDGER_WINDOW = int(os.getenv("POLARIS_LEDGER_WINDOW", "3600"))
+
+T = TypeVar("T")
+
+# NationStates is down, the deadline ran out or the response made no sense
+class APIUnavailableError(Exception):
+    pass
+
+def parseWaStatus(text: str) -> int:
+    if text == "WA Member":
+        return WA_MEMBER
+    elif text == "WA Delegate":
+        return WA_DELEGATE
+    return NON_WA
+
+def parseEndorsements(text: str) -> set[str]:
+    return set(text.split(",")) if text else set()
+
+# shard -> (element, Nation field, parser)
+NATION_SHARDS = {
+    "name": ("NAME", "name", str),
+    "flag": ("FLAG", "flagUrl", str),
+    "wa": ("UNSTATUS", "waStatus", parseWaStatus),
+    "region": ("REGION", "region", normalize),
+    "endorsements": ("ENDORSEMENTS", "endorsements", parseEndorsements),
+    "lastlogin": ("LASTLOGIN", "lastLogin", int),
+    "population": ("POPULATION", "population", int),
+    "tgcanrecruit": ("TGCANRECRUIT", "canRecruit", lambda text: text == "1"),
+    "foundedtime": ("FOUNDEDTIME", "foundedAt", int),
+}
+
+# Named sets of nation shards, so callers only pay for the fields they read
+PROFILE_FULL = "full"
+PROFILE_RECRUIT_CHECK = "recruit-check"
+PROFILE_FLAG = "flag"
+PROFILE_LOGIN = "login"
+
+NATION_PROFILES = {
+    PROFILE_FULL: tuple(NATION_SHARDS),
+    PROFILE_RECRUIT_CHECK: ("region", "population", "tgcanrecruit"),
+    PROFILE_FLAG: ("flag",),
+    PROFILE_LOGIN: ("lastlogin",),
+}
+
+# Seconds a nation answer is reused for, per profile, 0 to always ask the API
+NATION_TTL = {
+    PROFILE_FULL: int(os.getenv("POLARIS_NATION_TTL_FULL", "30")),
+    PROFILE_RECRUIT_CHECK: int(os.getenv("POLARIS_NATION_TTL_RECRUIT_CHECK", "300")),
+    PROFILE_FLAG: int(os.getenv("POLARIS_NATION_TTL_FLAG", "600")),
+    PROFILE_LOGIN: int(os.getenv("POLARIS_NATION_TTL_LOGIN", "0")),
+}
+NATION_CACHE_SIZE = int(os.getenv("POLARIS_NATION_CACHE_SIZE", "5000"))
+
+# "name flag" -> "flag", to name nation requests by profile in the ledger
+PROFILES_BY_SHARDS = {" ".join(shards): profile for (profile, shards) in NATION_PROFILES.items()}
+
+def profileFields(profile: str) -> list[str]:
+    return [NATION_SHARDS[shard][1] for shard in NATION_PROFILES[profile]]
+
+# Callers modify the sets they get
+def copyFields(fields: dict[str, Any]) -> dict[str, Any]:
+    return {field: set(value) if isinstance(value, set) else value for (field, value) in fields.items()}
+
+
+def parseWaMembers(response: sans.Response) -> set[str]:
+    data = response.content
+    members = requireChildren(data, rootElement(data), {"MEMBERS"})["MEMBERS"]
+    return set(elementText(data, members, response.encoding).split(","))
+
+def parseRegionsByTag(response: sans.Response) -> set[str]:
+    data = response.content
+    regions = elementText(data, requireChildren(data, rootElement(data), {"REGIONS"})["REGIONS"], response.encoding)
+    if not regions:
+        # No regions with said tag combination/tags do not exist
+        return set()
+
+    return set([normalize(r) for r in regions.split(",")])
+
+def parseNationShards(response: sans.Response, shards: tuple[str, ...]) -> dict[str, Any]:
+    data = response.content
+    encoding = response.encoding
+    elements = requireLeaves(data, rootElement(data), {NATION_SHARDS[shard][0] for shard in shards})
+
+    fields = {}
+    for shard in shards:
+        (tag, field, parse) = NATION_SHARDS[shard]
+        fields[field] = parse(elementText(data, elements[tag], encoding))
+
+    return fields
+
+def parseCensusRanks(response: sans.Response) -> dict[str, float]:
+    data = response.content
+    ranks = childElements(data, rootElement(data), {"CENSUSRANKS"}).get("CENSUSRANKS")
+    nations = childElements(data, ranks, {"NATIONS"}).get("NATIONS") if ranks else None
+    if nations is None:
+        return {}
+
+    scores = {}
+    for nation in iterElements(data, nations[2], nations[3]):
+        fields = requireLeaves(data, nation, {"NAME", "SCORE"})
+        scores[normalize(elementText(data, fields["NAME"], response.encoding))] = float(elementText(data, fields["SCORE"]))
+
+    return scores
+
+def parseRegion(response: sans.Response, id: str) -> Region:
+    data = response.content
+    encoding = response.encoding
+    shards = requireChildren(data, rootElement(data), {"NAME", "DELEGATE", "NATIONS", "RECRUITERS", "OFFICERS"})
+
+    name = elementText(data, shards["NAME"], encoding)
+    delegate = elementText(data, shards["DELEGATE"], encoding)
+    if delegate == "0" or not delegate:
+        delegate = None
+
+    nationList = elementText(data, shards["NATIONS"], encoding)
+    nations = []
+    if nationList:
+        nations = set(nationList.split(":"))
+
+    recruiterList = elementText(data, shards["RECRUITERS"], encoding)
+    recruiters = []
+    if recruiterList:
+        recruiters = set(recruiterList.split(","))
+
+    officers = {}
+
+    for officerNode in iterElements(data, shards["OFFICERS"][2], shards["OFFICERS"][3]):
+        fields = requireLeaves(data, officerNode, {"NATION", "OFFICE", "AUTHORITY"})
+        nation = elementText(data, fields["NATION"], encoding)
+        office = elementText(data, fields["OFFICE"], encoding)
+        authority = Authority.parse(elementText(data, fields["AUTHORITY"], encoding))
+        officers[nation] = RegionalOfficer(nation, office, authority)
+
+    updateTime = time.time()
+
+    return Region(id, name, nations, delegate, 
+                officers, recruiters, lastApiUpdateTime=updateTime)
+
+def parseRMBPosts(response: sans.Response) -> list[RMBMessage]:
+    data = response.content
+    encoding = response.encoding
+    posts = childElements(data, rootElement(data), {"MESSAGES"}).get("MESSAGES")
+    if posts is None:
+        return []
+
+    messages = []
+
+    for post in iterElements(data, posts[2], posts[3]):
+        fields = requireLeaves(data, post, {"TIMESTAMP", "NATION", "STATUS"})
+        id = int(attribute(post, "id"))
+        timestamp = int(elementText(data, fields["TIMESTAMP"]))
+        nation = elementText(data, fields["NATION"], encoding)
+        status = int(elementText(data, fields["STATUS"]))
+
+        message = RMBMessage(id, timestamp, nation, status, None, None)
+
+        if status != RMB_MOD_SUPPRESSED and status != RMB_SELF_DELETED:
+            message.content = elementText(data, leafElement(data, post, "MESSAGE"), encoding)
+
+        if status == RMB_SUPPRESSED:
+            message.suppressor = elementText(data, leafElement(data, post, "SUPPRESSOR"), encoding)
+
+        messages.append(message)
+
+    return messages
+
+def parseHappenings(response: sans.Response) -> list[WorldEvent]:
+    data = response.content
+    happenings = childElements(data, rootElement(data), {"HAPPENINGS"}).get("HAPPENINGS")
+    if happenings is None:
+        return []
+
+    events = []
+
+    # Newest events come first
+    for event in iterElements(data, happenings[2], happenings[3]):
+        fields = requireLeaves(data, event, {"TIMESTAMP", "TEXT"})
+        id = int(attribute(event, "id"))
+        timestamp = int(elementText(data, fields["TIMESTAMP"]))
+        text = elementText(data, fields["TEXT"], response.encoding)
+        events.append(WorldEvent(id, timestamp, text))
+
+    return events
+
+# Last-Modified of a response as a timestamp, None if it's missing or garbled
+def generatedAt(response: httpx.Response) -> float | None:
+    try:
+        return email.utils.parsedate_to_datetime(response.headers["Last-Modified"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+# "nation=testlandia q=name+flag" for log lines and errors
+def describeRequest(url: httpx.URL) -> str:
+    return " ".join(f"{key}={value}" for (key, value) in url.params.items() if key not in ("client", "key", "tgid"))
+
+# "nation:recruit-check", "region:messages", "sendtg", the ledger's name for the endpoint a url hits
+def describeEndpoint(url: httpx.URL) -> str:
+    params = url.params
+    if "a" in params:
+        return params["a"]
+
+    shards = params.get("q", "")
+    for kind in ("nation", "region", "wa"):
+        if kind in params:
+            if kind == "nation":
+                shards = PROFILES_BY_SHARDS.get(shards, shards)
+            return f"{kind}:{shards.replace(' ', '+')}"
+    return f"world:{shards.replace(' ', '+')}"
+
 class APIClient(commands.Cog):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, baseUrl: str | None = API_URL):
         self.bot = bot
-        self.client = sans.AsyncClient()
+        self.baseUrl = httpx.URL(baseUrl) if baseUrl else None
+        self.client = sans.AsyncClient(event_hooks={
+            "request": [self.redirect, self.stamp] if self.baseUrl else [self.stamp],
+            "response": [self.book],
+        })
+        self.limiter = RequestLimiter(API_LIMIT, API_WINDOW)
+        self.breaker = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+        # url -> (priority, request) for requests in flight, shared by identical concurrent ones
+        self.inFlight: dict[str, tuple[int, asyncio.Task]] = {}
+        # Requests that were answered by one already in flight instead of being sent
+        self.coalesced = 0
+        # (nation, profile) -> fields
+        self.responses = ResponseCache(NATION_CACHE_SIZE)
+        self.ledger = BudgetLedger(LEDGER_WINDOW)
+
+    # Points a NationStates url at the configured base url instead, if there is one
+    def rebase(self, url: httpx.URL) -> httpx.URL:
+        if self.baseUrl is None:
+            return url
+        return url.copy_with(scheme=self.baseUrl.scheme, host=self.baseUrl.host, port=self.baseUrl.port)
+
+    # For the requests sans builds itself (server-sent events). Ours are rebased before sending,
+    # so sans doesn't apply its NationStates rate limit to another server.
+    async def redirect(self, request: httpx.Request) -> None:
+        request.url = self.rebase(request.url)
+        request.headers["Host"] = request.url.netloc.decode("ascii")
+
+    # sans retries 429s inside client.get, only the event hooks see every attempt
+    async def stamp(self, request: httpx.Request) -> None:
+        if request.url.path == API_PATH:
+            request.extensions["sent"] = time.monotonic()
+
+    async def book(self, response: httpx.Response) -> None:
+        sent = response.request.extensions.get("sent")
+        if sent is None:
+            return
+
+        await response.aread()
+        self.ledger.record(describeEndpoint(response.request.url), len(response.content),
+                           time.monotonic() - sent, response.status_code)
+
+    async def send(self, url: httpx.URL, priority: int, **kwargs) -> sans.Response:
+        await self.limiter.acquire(priority)
+
+        try:
+            response = await self.client.get(self.rebase(url), **kwargs)
+        except httpx.TransportError:
+            # Nothing came back, so no response hook booked it
+            self.ledger.record(describeEndpoint(url), 0, 0.0, 0)
+            self.breaker.failed()
+            raise
+
+        # Here rather than in execute, so a request shared by several callers counts once
+        if response.status_code >= 500:
+            self.breaker.failed()
+        elif response.status_code != 429:
+            self.breaker.succeeded()
+
+        self.limiter.update(response.headers)
+        return response
+
+    # The url names the endpoint, the id and the shards, so identical urls get identical answers
+    async def get(self, url: httpx.URL, priority: int, **kwargs) -> sans.Response:
+        # Authenticated requests (telegrams) have side effects and are never shared
+        if kwargs:
+            return await self.send(url, priority, **kwargs)
+
+        key = str(url)
+        entry = self.inFlight.get(key)
+        # Only join a request that is at least as urgent, rather than queue behind a slower lane
+        if entry is not None and entry[0] <= priority:
+            self.coalesced += 1
+            self.ledger.share(describeEndpoint(url))
+            return await asyncio.shield(entry[1])
+
+        request = asyncio.ensure_future(self.send(url, priority))
+        self.inFlight[key] = (priority, request)
+        request.add_done_callback(lambda _: self.landed(key, request))
+        # One caller giving up doesn't cancel the request for the others
+        return await asyncio.shield(request)
+
+    def landed(self, key: str, request: asyncio.Task) -> None:
+        entry = self.inFlight.get(key)
+        if entry is not None and entry[1] is request:
+            del self.inFlight[key]
+
+        if not request.cancelled():
+            # Marks the error as seen when every caller has given up
+            request.exception()
+
+    # deadline is in seconds from now, math.inf for none. A 404 returns None, raises
+    # APIUnavailableError when no answer could be had.
+    async def execute(self, url: httpx.URL, parse: Callable[[sans.Response], T], priority: int,
+                      deadline: float | None = None, retry: bool = True, **kwargs) -> T | None:
+        description = describeRequest(url)
+        if deadline is None:
+            deadline = DEADLINES[priority]
+        deadline += time.monotonic()
+        attempt = 0
 
-    async def fetchWaNations(self) -> set[str]:
-        while True:
-            try:
-                response = await self.client.get(sans.WA(1, "members"))
-                return set(response.xml.find("./MEMBERS").text.split(","))
-            except httpx.ReadTimeout:
-                logger.warning("response for fetchWa() timed out, retrying in 10 seconds")
-                await asyncio.sleep(10)
-            except httpx.ReadError:
-                logger.warning(f"response for fetchWa() errored out, retrying in 15 seconds")
-                await asyncio.sleep(15)
-
-    async def fetchRegionsByTag(self, tags: list[str]) -> set[str]:
-        while True:
-            try:
-                response = await self.client.get(sans.World("regionsbytag", tags=normalize('+'.join(tags))))
-                regions = response.xml.find("./REGIONS")
-                if regions.text is None:
-                    # No regions with said tag combination/tags do not exist
-                    return set()
-                
-                return set([normalize(r) for r in regions.text.split(",")])
-            except httpx.ReadTimeout:
-                logger.warning(f"response for fetchRegionsByTag({tags}) timed out, retrying in 10 seconds")
-                await asyncio.sleep(10)
-            except httpx.ReadError:
-                logger.warning(f"response for fetchRegionsByTag({tags}) errored out, retrying in 15 seconds")
-                await asyncio.sleep(15)
-
-    async def fetchNation(self, id: str) -> Nation | None:
-        while True:
-            try:
-                response = await self.client.get(
-                    sans.Nation(id, 
-                                "name", "flag", "wa", 
-                                "region", "endorsements", "lastlogin", 
-                                "census", "population", "tgcanrecruit",
-                                "foundedtime", 
-                                scale="80", mode="score"))
-                
-                if response.status_code == 404:
-                    # Nation not found
-                    return None
-                
-                name = response.xml.find("./NAME").text
-                flagUrl = response.xml.find("./FLAG").text
-                region = normalize(response.xml.find("./REGION").text)
-                lastLogin = int(response.xml.find("./LASTLOGIN").text)
-                residency = float(response.xml.find("./CENSUS/SCALE/SCORE").text)
-                population = int(response.xml.find("./POPULATION").text)
-                canRecruit = response.xml.find("./TGCANRECRUIT").text == "1"
-                foundedAt = int(response.xml.find("./FOUNDEDTIME").text)
-
-                waStatus = NON_WA
-                waStatusText = response.xml.find("./UNSTATUS").text
-                if waStatusText == "WA Member":
-                    waStatus = WA_MEMBER
-                elif waStatusText == "WA Delegate":
-                    waStatus = WA_DELEGATE
-
-                endorsements = set()
-                if waStatus != NON_WA:
-                    endoList = response.xml.find("./ENDORSEMENTS").text
-                    if endoList:
-                        endorsements = set(endoList.split(","))
-
-                updateTime = time.time()
-                
-                return Nation(id, name, flagUrl, waStatus, region, 
-                                endorsements, residency, population, 
-                                canRecruit, lastLogin, foundedAt, lastApiUpdateTime=updateTime, 
-                                lastResidencyUpdateTime=updateTime)
-            except httpx.ReadTimeout:
-                logger.warning(f"response for fetchNation({id}) timed out, retrying in 10 seconds")
-                await asyncio.sleep(10)
-            except httpx.ReadError:
-                logger.warning(f"response for fetchNation({id}) errored out, retrying in 15 seconds")
-                await asyncio.sleep(15)
-
-    async def fetchRegion(self, id: str) -> None:
         while True:
+            wait = self.breaker.wait()
+            if wait > 0:
+                if time.monotonic() + wait >= deadline:
+                    raise APIUnavailableError(f"{description}: NationStates is unavailable")
+                await asyncio.sleep(wait)
+                continue
+
+            if not self.breaker.allow():
+                # Someone else is probing the API
+                continue
+
             try:
-                response = await self.client.get(
-                    sans.Region(id, "name", "nations", "delegate", "officers", "recruiters"))
-
-                if response.status_code == 404:
-                    # Region not found
-                    return None
-                
-                name = response.xml.find("./NAME").text
-                delegate = response.xml.find("./DELEGATE").text
-                if delegate == "0":
-                    delegate = None
-
-                nationList = response.xml.find("./NATIONS").text
-                nations = []
-                if nationList:
-                    nations = set(nationList.split(":"))
-
-                recruiterList = response.xml.find("./RECRUITERS").text
-                recruiters = []
-                if recruiterList:
-                    recruiters = set(recruiterList.split(","))
-
-                officers = {}
-
-                for officerNode in response.xml.findall("./OFFICERS/OFFICER"):
-                    nation = officerNode.find("./NATION").text
-                    office = officerNode.find("./OFFICE").text
-                    authority = Authority.parse(officerNode.find("./AUTHORITY").text)
-                    officers[nation] = RegionalOfficer(nation, office, authority)
-
-                updateTime = time.time()
-
-                return Region(id, name, nations, delegate, 
-                            officers, recruiters, lastApiUpdateTime=updateTime)
-            except httpx.ReadTimeout:
-                logger.warning(f"response for fetchRegion({id}) timed out, retrying in 10 seconds")
-                await asyncio.sleep(10)
-            except httpx.ReadError:
-                logger.warning(f"response for fetchRegion({id}) errored out, retrying in 15 seconds")
-                await asyncio.sleep(15)
+                timeout = deadline - time.monotonic() if deadline != math.inf else None
+                response = await asyncio.wait_for(self.get(url, priority, **kwargs), timeout)
+            except TimeoutError:
+                # Mostly time spent queueing for the limiter, which says nothing about the API
+                raise APIUnavailableError(f"{description}: no answer within the deadline")
+            except httpx.TransportError as error:
+                failure = f"{type(error).__name__}"
+            else:
+                status = response.status_code
+                if status == 429:
+                    # The limiter already holds every request for as long as the API asked
+                    failure = "rate limited"
+                elif status >= 500:
+                    failure = f"HTTP {status}"
+                else:
+                    if status == 404:
+                        return None
+                    if status >= 400:
+                        raise APIUnavailableError(f"{description}: HTTP {status}")
+
+                    try:
+                        return parse(response)
+                    except (ET.ParseError, AttributeError, KeyError, TypeError, ValueError) as error:
+                        raise APIUnavailableError(f"{description}: unexpected response") from error
+
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+            if not retry or time.monotonic() + delay >= deadline:
+                raise APIUnavailableError(f"{description}: {failure}")
+
+            logger.warning(f"{description} failed ({failure}), retrying in {delay:.1f} seconds")
+            await asyncio.sleep(delay)
+            attempt += 1
 
+    async def fetchWaNations(self, priority: int = PRIORITY_INTERACTIVE) -> set[str]:
+        return await self.execute(sans.WA(1, "members"), parseWaMembers, priority)
+
+    async def fetchRegionsByTag(self, tags: list[str], priority: int = PRIORITY_INTERACTIVE) -> set[str]:
+        return await self.execute(sans.World("regionsbytag", tags=normalize('+'.join(tags))), parseRegionsByTag, priority)
+
+    # With fresh, a recent answer isn't good enough, e.g. when the cache knows it missed events
+    async def fetchNationFields(self, id: str, profile: str, priority: int = PRIORITY_INTERACTIVE,
+                                fresh: bool = False) -> dict[str, Any] | None:
+        if not fresh:
+            fields = self.responses.get((id, profile))
+            if fields is not None:
+                return copyFields(fields)
+
+        shards = NATION_PROFILES[profile]
+        fields = await self.execute(sans.Nation(id, *shards), lambda response: parseNationShards(response, shards), priority)
+        if fields is not None:
+            self.rememberNation(id, profile, fields)
+
+        return fields
+
+    # A full answer also answers every smaller profile
+    def rememberNation(self, id: str, profile: str, fields: dict[str, Any]) -> None:
+        shards = set(NATION_PROFILES[profile])
+        for (other, otherShards) in NATION_PROFILES.items():
+            if shards.issuperset(otherShards):
+                self.responses.put((id, other), copyFields({field: fields[field] for field in profileFields(other)}),
+                                   NATION_TTL[other])
+
+    def forgetNation(self, id: str) -> None:
+        for profile in NATION_PROFILES:
+            self.responses.discard((id, profile))
+
+    async def fetchNation(self, id: str, priority: int = PRIORITY_INTERACTIVE, fresh: bool = False) -> Nation | None:
+        fields = await self.fetchNationFields(id, PROFILE_FULL, priority, fresh)
+        if fields is None:
+            return None
+
+        if fields["waStatus"] == NON_WA:
+            fields["endorsements"] = set()
+
+        updateTime = time.time()
+
+        # Residency comes from the region's census ranks, see CacheManager.fetchResidencies
+        return Nation(id, residencyNum=0.0, lastApiUpdateTime=updateTime,
+                      lastResidencyUpdateTime=updateTime, **fields)
+
+    # One page of a region's census ranks: nation -> score, in rank order from start
+    async def fetchCensusRanks(self, id: str, scale: str, start: int, priority: int = PRIORITY_INTERACTIVE) -> dict[str, float] | None:
+        return await self.execute(sans.Region(id, "censusranks", scale=scale, start=str(start)), parseCensusRanks, priority)
+
+    async def fetchRegion(self, id: str, priority: int = PRIORITY_INTERACTIVE) -> Region | None:
+        return await self.execute(sans.Region(id, "name", "nations", "delegate", "officers", "recruiters"),
+                                  lambda response: parseRegion(response, id), priority)
+
+    # Never retried, a telegram that timed out may still have been sent. No deadline: sans
+    # holds each telegram up to 180 seconds inside the request, cancelling it drops the telegram.
     async def sendAPITelegram(self, 
                               client_key: str,
                               telegram: APITelegram, 
                               limiter: sans.TelegramLimiter,
                               retry: bool = False) -> str | None:
-        try:
-            logger.debug(f"preparing API telegram with ID {telegram.tgid} for target '{telegram.targetId}'")
+        logger.debug(f"preparing API telegram with ID {telegram.tgid} for target '{telegram.targetId}'")
 
-            response = await self.client.get(
+        try:
+            return await self.execute(
                 sans.Telegram(
                     client=client_key, 
                     tgid=telegram.tgid, 
                     key=telegram.key, 
                     to=telegram.targetId), 
+                lambda response: response.content.rstrip().decode('utf-8'),
+                PRIORITY_RECRUITMENT,
+                deadline=math.inf,
+                retry=retry,
                 auth=limiter)
-            
-            return response.content.rstrip().decode('utf-8')
-        except httpx.ReadTimeout:
-            logger.warning(f"response for sendAPITelegram({telegram.tgid}) timed out")
-        except httpx.ReadError:
-            logger.warning(f"response for sendAPITelegram({telegram.tgid}) errored out")
-
-    async def fetchRMBPosts(self, regionId: str, fromid: int, limit: int) -> list[RMBMessage]:
-        while True:
+        except APIUnavailableError as error:
+            logger.warning(f"sendAPITelegram({telegram.tgid}) failed: {error}")
+
+    async def fetchRMBPosts(self, regionId: str, fromid: int, limit: int, priority: int = PRIORITY_INTERACTIVE) -> list[RMBMessage]:
+        return await self.execute(sans.Region(regionId, "messages", limit=str(limit), fromid=str(fromid)),
+                                  parseRMBPosts, priority) or []
+
+    async def fetchHappenings(self, filters: list[str], sinceId: int, beforeId: int | None, limit: int, priority: int = PRIORITY_INTERACTIVE) -> list[WorldEvent]:
+        parameters = {"filter": "+".join(filters), "sinceid": str(sinceId), "limit": str(limit)}
+        if beforeId is not None:
+            parameters["beforeid"] = str(beforeId)
+
+        return await self.execute(sans.World("happenings", **parameters), parseHappenings, priority) or []
+
+    # Raises APIUnavailableError when every attempt failed
+    async def downloadDump(self, url, path: str) -> None:
+        partialPath = f"{path}.part"
+
+        for attempt in range(DUMP_ATTEMPTS):
             try:
-                response = await self.client.get(sans.Region(regionId, 
-                                                            "messages", 
-                                                            limit=str(limit), 
-                                                            fromid=str(fromid)))
+                async with self.client.stream("GET", self.rebase(httpx.URL(url))) as response:
+                    response.raise_for_status()
+
+                    with open(partialPath, "wb") as file:
+                        async for chunk in response.aiter_bytes():
+                            file.write(chunk)
+
+                    generated = generatedAt(response)
 
-                messages = []
-                        
-                for post in response.xml.findall("./MESSAGES/POST"):
-                    id = int(post.attrib["id"])
-                    timestamp = int(post.find("./TIMESTAMP").text)
-                    nation = post.find("./NATION").text
-                    status = int(post.find("./STATUS").text)
+                # The dump's age is when NationStates generated it, not when we downloaded it
+                if generated is not None:
+                    os.utime(partialPath, (time.time(), generated))
+                os.replace(partialPath, path)
+                logger.info(f"downloaded {url} to {path}")
+                return
+            except httpx.HTTPStatusError as error:
+                status = error.response.status_code
+                if status != 429 and status < 500:
+                    raise APIUnavailableError(f"download of {url} failed: HTTP {status}") from error
+                failure = f"HTTP {status}"
+            except httpx.TransportError as error:
+                failure = type(error).__name__
 
-                    message = RMBMessage(id, timestamp, nation, status, None, None)
+            if attempt == DUMP_ATTEMPTS - 1:
+                break
 
-                    if status != RMB_MOD_SUPPRESSED and status != RMB_SELF_DELETED:
-                        message.content = post.find("./MESSAGE").text
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, DUMP_RETRY_BASE_DELAY * 2 ** attempt))
+            logger.warning(f"download of {url} failed ({failure}), retrying in {delay:.1f} seconds")
+            await asyncio.sleep(delay)
 
-                    if status == RMB_SUPPRESSED:
-                        message.suppressor = post.find("./SUPPRESSOR").text
+        raise APIUnavailableError(f"download of {url} failed {DUMP_ATTEMPTS} times: {failure}")
 
-                    messages.append(message)
+    async def downloadNationsDump(self, path: str) -> None:
+        await self.downloadDump(sans.NationsDump(), path)
 
-                return messages
-            except httpx.ReadTimeout:
-                logger.warning(f"response for fetchRMBPosts({regionId}) timed out, retrying in 10 seconds")
-                await asyncio.sleep(10)
-            except httpx.ReadError:
-                logger.warning(f"response for fetchRMBPosts({regionId}) errored out, retrying in 15 seconds")
-                await asyncio.sleep(15)
+    async def downloadRegionsDump(self, path: str) -> None:
+        await self.downloadDump(sans.RegionsDump(), path)
 
     def serverSentEvents(self, *args):
-        return sans.serversent_events(self.client, *args)
\ No newline at end of file
+        return sans.serversent_events(self.client, *args)
+
+    @app_commands.command(description="View NationStates API usage by subsystem.")
+    async def apistats(self, interaction: discord.Interaction, raw: bool = False):
+        if not interaction.user.guild_permissions.manage_guild:
+            await interaction.response.send_message(embed=getManageGuildRequiredEmbed())
+            return
+
+        snapshot = self.ledger.snapshot()
+        if raw:
+            data = io.BytesIO(json.dumps(snapshot, indent=2).encode("utf-8"))
+            await interaction.response.send_message(file=discord.File(data, filename="apistats.json"))
+            return
+
+        await interaction.response.send_message(embed=getApiStatsEmbed(snapshot, API_LIMIT, API_WINDOW))
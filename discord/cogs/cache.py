@@ -1,57 +1,512 @@
+import discord
 from discord.ext import commands, tasks
-import time, asyncio, logging
+from discord import app_commands
+import time, asyncio, logging, os
+from typing import Any
+from redis_om import get_redis_connection
 from classes import *
-from lib import displayName, normalize
+from lib import displayName, normalize, handle_task_result
+from snapshot import CacheSnapshot, SnapshotError, dumpSnapshot, loadSnapshot
+from dumps import loadNationsDump, loadRegionsDump, RegionsDump, RESIDENCY_SCALE
+from rebuild import RebuildProgress, importanceOrder, fetchAll
+from storage import RegionMembership, NationStore, NationIds, EndorsementSet, SortedIndex, IndexRange
 
-from cogs.api import APIClient
+from limiter import PRIORITY_INTERACTIVE, PRIORITY_RECRUITMENT, PRIORITY_BACKGROUND, PRIORITY_IDLE
+from ledger import accountTo, SUBSYSTEM_REBUILD, SUBSYSTEM_RESYNC, SUBSYSTEM_REFRESH, SUBSYSTEM_LOGIN, SUBSYSTEM_EVENTS
+
+from cogs.api import APIClient, APIUnavailableError, API_LIMIT, API_WINDOW, PROFILE_LOGIN, profileFields
+from cogs.events import EventListener
+
+from views.cachestats import getCacheStatsEmbed
+from views.error import getManageGuildRequiredEmbed
 
 logger = logging.getLogger("cache")
 
+SNAPSHOT_KEY = "Polaris:CacheSnapshot"
+
+# Snapshots older than this are ignored and the cache is rebuilt from scratch
+SNAPSHOT_MAX_AGE = int(os.getenv("POLARIS_SNAPSHOT_MAX_AGE", str(3600 * 12)))
+
+# Daily dumps that seed rebuilds, downloaded once a day old with POLARIS_DOWNLOAD_DUMPS=1
+NATIONS_DUMP = os.getenv("POLARIS_NATIONS_DUMP")
+REGIONS_DUMP = os.getenv("POLARIS_REGIONS_DUMP")
+DOWNLOAD_DUMPS = os.getenv("POLARIS_DOWNLOAD_DUMPS", "0") == "1"
+DUMP_MAX_AGE = 3600 * 24
+
+PUPPET_STORAGE_TAG = normalize("Puppet Storage")
+JUMP_POINT_TAG = normalize("Jump Point")
+
+# Nation fetches kept in flight during a rebuild
+REBUILD_CONCURRENCY = int(os.getenv("POLARIS_REBUILD_CONCURRENCY", "4"))
+
+# Share of the API budget the refresher may use, and the age a nation goes stale at
+REFRESH_SHARE = float(os.getenv("POLARIS_REFRESH_SHARE", "0.25"))
+REFRESH_MAX_AGE = int(os.getenv("POLARIS_REFRESH_MAX_AGE", str(3600 * 6)))
+REFRESH_INTERVAL = API_WINDOW / (API_LIMIT * REFRESH_SHARE)
+
+# How often to look for nations that went stale once everything is fresh
+REFRESH_SCAN_INTERVAL = 60
+
+# The WA member list and the main region's residents are re-fetched this often
+RESYNC_INTERVAL = 3600
+
+# Full rebuilds only refresh the puppet storage and jump point lists now
+FULL_REBUILD_INTERVAL = int(os.getenv("POLARIS_FULL_REBUILD_INTERVAL", str(3600 * 24 * 7)))
+
+# MiB the world-wide region membership index may use, 0 for no limit
+REGION_MEMBERSHIP_CAP = int(os.getenv("POLARIS_REGION_MEMBERSHIP_CAP", "64"))
+
+# Nations outside the main region, kept in an LRU
+FOREIGN_NATION_CACHE_SIZE = int(os.getenv("POLARIS_FOREIGN_NATION_CACHE_SIZE", "5000"))
+FOREIGN_NATION_MAX_AGE = int(os.getenv("POLARIS_FOREIGN_NATION_MAX_AGE", str(3600 * 6)))
+
+# Last logins of regional WA nations are re-checked on spare API budget
+LOGIN_REFRESH_INTERVAL = 2
+LOGIN_REFRESH_BATCH = int(os.getenv("POLARIS_LOGIN_REFRESH_BATCH", "5"))
+LOGIN_REFRESH_MIN_AGE = int(os.getenv("POLARIS_LOGIN_REFRESH_MIN_AGE", "600"))
+
+# The censusranks shard returns this many nations per request
+CENSUS_RANKS_PAGE = 20
+
+# Sorted id arrays over a shared name table instead of sets of strings, slower but much smaller
+COMPACT_ENDORSEMENTS = os.getenv("POLARIS_COMPACT_ENDORSEMENTS", "0") == "1"
+
 class CacheManager(commands.Cog):
     waNations: set[str]
     puppetRegions: set[str]
     jumpPointRegions: set[str]
-    nations: dict[str, Nation]
+    nations: NationStore
     mainRegion: Region
-    regionalNations: dict[str, set[str]]
+    regionalNations: RegionMembership
+    # endorser -> nations whose cached endorsement lists contain it, unverified
+    endorsed: dict[str, set[str]]
+    # waNations & mainRegion.nations
+    regionWa: set[str]
+    # regional WA nation -> endorsements it has from other regional WA nations
+    verifiedCounts: dict[str, int]
+    # region -> cached nations there that may hold endorsements the next update will drop
+    pendingReverify: dict[str, set[str]]
+    # Cached regional WA nations by last login, founding time and when their residency began
+    byLastLogin: SortedIndex
+    byFoundedAt: SortedIndex
+    byResidency: SortedIndex
+    # Regional WA nations by verifiedCounts
+    byEndorsements: SortedIndex
+    # Cached regional WA nations by when their lastLogin was last confirmed
+    byLoginChecked: SortedIndex
+    # main region resident -> when its residency began, WA or not
+    residentSince: dict[str, float]
 
     def __init__(self, bot: commands.Bot, mainRegionId: str):
         self.bot = bot
         self.mainRegionId = normalize(mainRegionId)
         self.api: APIClient = self.bot.get_cog('APIClient')
+        self.events: EventListener = self.bot.get_cog('EventListener')
+        self.redis = get_redis_connection(decode_responses=False)
 
         self.waNations = set()
         self.puppetRegions = set()
         self.jumpPointRegions = set()
-        self.nations = {}
+        self.nations = self.newNationStore()
+        self.endorserIds = NationIds()
+        self.endorsed = {}
+        self.regionWa = set()
+        self.verifiedCounts = {}
+        self.byLastLogin = SortedIndex()
+        self.byFoundedAt = SortedIndex()
+        self.byResidency = SortedIndex()
+        self.byEndorsements = SortedIndex()
+        self.byLoginChecked = SortedIndex()
+        self.residentSince = {}
+        self.endorsementsGivenTotal = 0
+        self.pendingReverify = {}
         self.mainRegion = None
-        self.regionalNations = {}
+        self.regionalNations = self.newRegionMembership()
 
-        self.needsRebuild = False
+        self.needsResync = False
+        self.lastResync = 0
+        self.staleNations: set[str] = set()
+        self.refreshQueue: list[str] = []
+        self.lastRefreshScan = 0
         self.lastRebuildStart = 0
         self.lastRebuildEnd = 0
+        self.restoredFromSnapshot = False
+        self.rebuildProgress: RebuildProgress | None = None
+        self.joinFetches: set[asyncio.Task] = set()
 
-    async def fetchWa(self) -> None:
-        self.waNations = await self.api.fetchWaNations()
+    async def fetchWa(self, priority: int = PRIORITY_INTERACTIVE) -> None:
+        self.waNations = await self.api.fetchWaNations(priority)
+        self.recountRegionWa()
 
-    async def fetchPuppetRegions(self) -> None:
-        self.puppetRegions = await self.api.fetchRegionsByTag(['Puppet Storage'])
+    async def fetchPuppetRegions(self, priority: int = PRIORITY_INTERACTIVE) -> None:
+        self.puppetRegions = await self.api.fetchRegionsByTag([PUPPET_STORAGE_TAG], priority)
 
-    async def fetchJumpPointRegions(self) -> None:
-        self.jumpPointRegions = await self.api.fetchRegionsByTag(['Jump Point'])
+    async def fetchJumpPointRegions(self, priority: int = PRIORITY_INTERACTIVE) -> None:
+        self.jumpPointRegions = await self.api.fetchRegionsByTag([JUMP_POINT_TAG], priority)
 
-    async def fetchNation(self, id: str) -> None:
-        nation = await self.api.fetchNation(id)
-        if nation:
-            self.nations[id] = nation
+    # A failed fetch is left to the refresher
+    async def fetchNation(self, id: str, priority: int = PRIORITY_INTERACTIVE) -> None:
+        try:
+            nation = await self.api.fetchNation(id, priority)
+        except APIUnavailableError as error:
+            logger.warning(f"cache: Could not fetch {id}: {error}")
+            self.markCacheOutdated(id)
+            return
 
-    async def fetchRegion(self, id: str) -> None:
-        region = await self.api.fetchRegion(id)
+        if nation:
+            self.storeNation(nation)
+
+    # Its own task, so the event worker doesn't wait on the limiter
+    def fetchJoined(self, nationId: str, event: str, *args) -> None:
+        async def fetchThenDispatch():
+            with accountTo(SUBSYSTEM_EVENTS):
+                await self.fetchNation(nationId, PRIORITY_RECRUITMENT)
+            self.bot.dispatch(event, *args)
+
+        task = asyncio.create_task(fetchThenDispatch())
+        self.joinFetches.add(task)
+        task.add_done_callback(self.joinFetches.discard)
+        task.add_done_callback(handle_task_result)
+
+    async def fetchRegion(self, id: str, priority: int = PRIORITY_INTERACTIVE) -> None:
+        region = await self.api.fetchRegion(id, priority)
         if region:
             self.mainRegion = region
+            self.recountRegionWa()
+
+    def previousEndorsementCount(self, nationId: str) -> int:
+        nation = self.nation(nationId)
+        return len(nation.endorsements) if nation else 0
+
+    # Fetches the given regional WA nations in the background lane, most important first
+    async def fetchRegionalWaNations(self, nationIds: set[str]) -> RebuildProgress:
+        order = importanceOrder(nationIds, self.mainRegion, self.previousEndorsementCount)
+        self.rebuildProgress = RebuildProgress(len(order))
+
+        async def fetch(nationId: str) -> bool:
+            try:
+                nation = await self.api.fetchNation(nationId, PRIORITY_BACKGROUND, fresh=True)
+            except APIUnavailableError as error:
+                logger.warning(f"cache: Could not fetch {nationId}: {error}")
+                return False
+
+            if nation is None:
+                return False
+
+            self.storeNation(nation)
+            logger.info(f"Queried WA nation {nation.name} in {self.mainRegion.name} with {len(self.verifiedEndorsements(nationId))} verified endorsements")
+            return True
+
+        return await fetchAll(order, fetch, REBUILD_CONCURRENCY, self.rebuildProgress)
 
     def nation(self, id: str) -> Nation | None:
         return self.nations.get(id)
+
+    # A cached nation gets the profile's shards merged in, an uncached one stays uncached
+    async def fetchNationProfile(self, id: str, profile: str, priority: int = PRIORITY_INTERACTIVE) -> dict[str, Any] | None:
+        fields = await self.api.fetchNationFields(id, profile, priority)
+        if fields is not None and self.isNationCached(id):
+            self.mergeNation(id, fields)
+
+        return fields
+
+    # A profile's fields, read from the cached nation if there is one, otherwise fetched
+    async def nationProfile(self, id: str, profile: str, priority: int = PRIORITY_INTERACTIVE) -> dict[str, Any] | None:
+        nation = self.nations.lookup(id)
+        if nation is None:
+            return await self.fetchNationProfile(id, profile, priority)
+
+        fields = {field: getattr(nation, field) for field in profileFields(profile)}
+        if any(value is None for value in fields.values()):
+            # Not known yet, e.g. canRecruit for nations seeded from the dump
+            return await self.fetchNationProfile(id, profile, priority)
+
+        return fields
+
+    # Partial profiles carry neither WA status nor endorsements, those only come with a full fetch
+    def mergeNation(self, id: str, fields: dict[str, Any]) -> None:
+        nation = self.nation(id)
+        for (field, value) in fields.items():
+            setattr(nation, field, value)
+
+        if "flagUrl" in fields:
+            nation.flagDirty = False
+        if "lastLogin" in fields:
+            nation.lastLoginUpdateTime = time.time()
+        if "region" in fields:
+            self.nations.settle(id)
+
+        self.indexNation(id)
+
+    def newNationStore(self) -> NationStore:
+        return NationStore(self.isResident, FOREIGN_NATION_CACHE_SIZE, FOREIGN_NATION_MAX_AGE, self.forgetNation)
+
+    def isResident(self, nation: Nation) -> bool:
+        return nation.region == self.mainRegionId
+
+    # Called when the store evicts a foreign nation
+    def forgetNation(self, nation: Nation) -> None:
+        self.unindexEndorsements(nation)
+        self.unindexNation(nation.id)
+        self.staleNations.discard(nation.id)
+
+    # Every endorsement change goes through these, to keep the endorsed index in sync
+    def indexEndorsements(self, nation: Nation) -> None:
+        for endorserId in nation.endorsements:
+            self.endorsed.setdefault(endorserId, set()).add(nation.id)
+
+    def unindexEndorsements(self, nation: Nation) -> None:
+        for endorserId in nation.endorsements:
+            endorsees = self.endorsed.get(endorserId)
+            if endorsees is not None:
+                endorsees.discard(nation.id)
+                if not endorsees:
+                    del self.endorsed[endorserId]
+
+    def rebuildEndorsementIndex(self) -> None:
+        self.endorsed = {}
+        for nation in self.nations.values():
+            self.indexEndorsements(nation)
+
+    def packEndorsements(self, endorsements: set[str]) -> set[str]:
+        return EndorsementSet(self.endorserIds, endorsements) if COMPACT_ENDORSEMENTS else endorsements
+
+    # Names of nations nobody is endorsed by anymore stay in the table until this runs
+    def repackEndorsements(self) -> None:
+        if not COMPACT_ENDORSEMENTS or len(self.endorserIds) < 2 * len(self.endorsed) + 1000:
+            return
+
+        self.endorserIds = NationIds()
+        for nation in self.nations.values():
+            nation.endorsements = self.packEndorsements(nation.endorsements)
+
+    def storeNation(self, nation: Nation) -> None:
+        previous = self.nation(nation.id)
+        if previous is not None:
+            self.unindexEndorsements(previous)
+
+        nation.endorsements = self.packEndorsements(nation.endorsements)
+        since = self.residentSince.get(nation.id)
+        if since is not None:
+            nation.residencyNum = 0
+            nation.lastResidencyUpdateTime = since
+        self.nations.put(nation)
+        self.indexEndorsements(nation)
+        self.recount(nation.id)
+        self.indexNation(nation.id)
+
+        for endorserId in nation.endorsements:
+            if not self.verifyEndo(nation.id, endorserId):
+                self.markReverify(nation.id)
+                break
+
+    def dropNation(self, id: str) -> None:
+        nation = self.nations.pop(id)
+        if nation is not None:
+            self.unindexEndorsements(nation)
+            self.unindexNation(id)
+            self.recount(id)
+
+    def setEndorsements(self, nationId: str, endorsements: set[str]) -> None:
+        nation = self.nation(nationId)
+        self.unindexEndorsements(nation)
+        nation.endorsements = self.packEndorsements(endorsements)
+        self.indexEndorsements(nation)
+        self.recount(nationId)
+
+    def addEndorsement(self, nationId: str, endorserId: str) -> None:
+        endorsements = self.nation(nationId).endorsements
+        if endorserId in endorsements:
+            return
+
+        endorsements.add(endorserId)
+        self.endorsed.setdefault(endorserId, set()).add(nationId)
+        self.countEndorsement(nationId, endorserId, 1)
+
+        if not self.verifyEndo(nationId, endorserId):
+            self.markReverify(nationId)
+
+    # Raises KeyError if the endorsement wasn't cached
+    def removeEndorsement(self, nationId: str, endorserId: str) -> None:
+        self.nation(nationId).endorsements.remove(endorserId)
+
+        endorsees = self.endorsed[endorserId]
+        endorsees.discard(nationId)
+        if not endorsees:
+            del self.endorsed[endorserId]
+
+        self.countEndorsement(nationId, endorserId, -1)
+
+    # Endorsements a nation gave disappear with its WA membership or when it leaves the region
+    def withdrawEndorsements(self, endorserId: str) -> None:
+        for endorseeId in self.endorsed.pop(endorserId, set()):
+            endorsee = self.nation(endorseeId)
+            if endorsee is not None:
+                endorsee.endorsements.discard(endorserId)
+                self.countEndorsement(endorseeId, endorserId, -1)
+
+    # Kept current by the helpers above and updateRegionWa, see auditEndorsementCounts
+    def countEndorsement(self, nationId: str, endorserId: str, delta: int) -> None:
+        if nationId in self.regionWa and endorserId in self.regionWa:
+            self.verifiedCounts[nationId] += delta
+            self.endorsementsGivenTotal += delta
+            self.byEndorsements.put(nationId, self.verifiedCounts[nationId])
+
+    def recount(self, nationId: str) -> None:
+        if nationId not in self.regionWa:
+            return
+
+        nation = self.nation(nationId)
+        count = len(nation.endorsements & self.regionWa) if nation else 0
+        self.endorsementsGivenTotal += count - self.verifiedCounts.get(nationId, 0)
+        self.verifiedCounts[nationId] = count
+        self.byEndorsements.put(nationId, count)
+
+    # Call after nationId joins or leaves the WA or the main region
+    def updateRegionWa(self, nationId: str) -> None:
+        member = nationId in self.waNations and nationId in self.mainRegion.nations
+        if member == (nationId in self.regionWa):
+            return
+
+        if member:
+            self.regionWa.add(nationId)
+            self.recount(nationId)
+        else:
+            self.regionWa.discard(nationId)
+            self.endorsementsGivenTotal -= self.verifiedCounts.pop(nationId, 0)
+            self.byEndorsements.discard(nationId)
+        self.indexNation(nationId)
+
+        # Endorsements this nation gave start or stop counting (recount already covered its own)
+        delta = 1 if member else -1
+        for endorseeId in self.endorsed.get(nationId, ()):
+            if endorseeId in self.regionWa and endorseeId != nationId:
+                self.verifiedCounts[endorseeId] += delta
+                self.endorsementsGivenTotal += delta
+                self.byEndorsements.put(endorseeId, self.verifiedCounts[endorseeId])
+
+    # After the WA list or the main region is replaced wholesale
+    def recountRegionWa(self) -> None:
+        if self.mainRegion is None:
+            return
+
+        self.regionWa = self.waNations & self.mainRegion.nations
+        self.verifiedCounts = {}
+        self.endorsementsGivenTotal = 0
+        for index in (self.byLastLogin, self.byFoundedAt, self.byResidency, self.byEndorsements, self.byLoginChecked):
+            index.clear()
+
+        for nationId in self.regionWa:
+            self.recount(nationId)
+            self.indexNation(nationId)
+
+        # Anyone could have gained or lost endorsers without us seeing it
+        self.pendingReverify.setdefault(self.mainRegionId, set()).update(self.regionWa)
+
+    # Only regions whose membership we track can be verified against, anywhere else every
+    # endorsement would look invalid
+    def markReverify(self, nationId: str) -> None:
+        regionId = self.nation(nationId).region
+        if regionId in self.regionalNations:
+            self.pendingReverify.setdefault(regionId, set()).add(nationId)
+
+    # Compares the incremental counters against a full recomputation, and fixes them
+    def auditEndorsementCounts(self) -> int:
+        mismatches = 0
+        for nationId in self.waNations & self.mainRegion.nations:
+            expected = len(self.verifiedEndorsements(nationId))
+            if self.verifiedCounts.get(nationId) != expected:
+                mismatches += 1
+                logger.debug(f"cache: {nationId} has {self.verifiedCounts.get(nationId)} counted endorsements, expected {expected}")
+
+        if mismatches or self.regionWa != self.waNations & self.mainRegion.nations:
+            logger.warning(f"cache: Endorsement counters drifted for {mismatches} nations, recounting")
+            self.recountRegionWa()
+
+        return mismatches
+
+    # Login and residency changes must go through resetLogin and resetResidency
+    def indexNation(self, nationId: str) -> None:
+        nation = self.nation(nationId)
+        if nation is None or nationId not in self.regionWa:
+            self.unindexNation(nationId)
+            return
+
+        self.byLastLogin.put(nationId, nation.lastLogin)
+        self.byLoginChecked.put(nationId, nation.loginCheckedAt())
+        self.byFoundedAt.put(nationId, nation.foundedAt)
+        # Everyone's residency grows at the same rate, so order by when it started
+        self.byResidency.put(nationId, nation.lastResidencyUpdateTime - nation.residencyNum * 86400)
+
+    def unindexNation(self, nationId: str) -> None:
+        self.byLastLogin.discard(nationId)
+        self.byLoginChecked.discard(nationId)
+        self.byFoundedAt.discard(nationId)
+        self.byResidency.discard(nationId)
+
+    def resetLogin(self, nationId: str) -> None:
+        nation = self.nation(nationId)
+        nation.resetLogin()
+        if nationId in self.byLastLogin:
+            self.byLastLogin.put(nationId, nation.lastLogin)
+            self.byLoginChecked.put(nationId, nation.loginCheckedAt())
+
+    def resetResidency(self, nationId: str) -> None:
+        self.nation(nationId).resetResidency()
+        self.indexNation(nationId)
+
+    def setResidentSince(self, nationId: str, since: float) -> None:
+        self.residentSince[nationId] = since
+
+        nation = self.nation(nationId)
+        if nation is not None:
+            nation.residencyNum = 0
+            nation.lastResidencyUpdateTime = since
+            self.indexNation(nationId)
+
+    # One request per 20 residents instead of a census shard on every nation fetch
+    async def fetchResidencies(self, priority: int = PRIORITY_BACKGROUND) -> int:
+        # One extra page in case the region grew since it was fetched
+        starts = range(1, len(self.mainRegion.nations) + CENSUS_RANKS_PAGE + 1, CENSUS_RANKS_PAGE)
+
+        # Residents on pages that fail are fetched again at the next reconcile
+        async def fetchPage(start: int) -> dict[str, float] | None:
+            try:
+                return await self.api.fetchCensusRanks(self.mainRegionId, RESIDENCY_SCALE, start, priority)
+            except APIUnavailableError as error:
+                logger.warning(f"cache: Could not fetch residency: {error}")
+                return None
+
+        pages = await asyncio.gather(*(fetchPage(start) for start in starts))
+
+        now = time.time()
+        found = 0
+        for page in pages:
+            for (nationId, days) in (page or {}).items():
+                if nationId in self.mainRegion.nations:
+                    self.setResidentSince(nationId, now - days * 86400)
+                    found += 1
+
+        logger.info(f"cache: Fetched residency for {found} residents of {self.mainRegion.name} in {len(starts)} requests")
+        return found
+
+    # Regional WA nations that last logged in at or before timestamp, longest idle first
+    def idleSince(self, timestamp: float) -> IndexRange:
+        return self.byLastLogin.range(high=timestamp)
+
+    # Regional WA nations, most verified endorsements first
+    def mostEndorsed(self) -> IndexRange:
+        return self.byEndorsements.range(reverse=True)
+
+    # Regional WA nations, longest resident first
+    def longestResident(self) -> IndexRange:
+        return self.byResidency.range()
+
+    def verifiedEndorsementCount(self, nationId: str) -> int:
+        return self.verifiedCounts.get(nationId, 0)
+
+    def regionEndorsementsGiven(self) -> int:
+        return self.endorsementsGivenTotal
     
     def region(self) -> Region:
         return self.mainRegion
@@ -79,17 +534,22 @@ class CacheManager(commands.Cog):
             return self.mainRegion.name
         return displayName(regionId)
     
+    # The live set, copy it before awaiting anything while iterating
     def regionWaNations(self) -> set[str]:
-        return self.waNations & self.mainRegion.nations
+        return self.regionWa
+
+    def newRegionMembership(self) -> RegionMembership:
+        return RegionMembership(REGION_MEMBERSHIP_CAP * 1024 * 1024, self.neededRegions)
+
+    # Regions whose membership endorsement verification depends on, never evicted
+    def neededRegions(self) -> set[str]:
+        return {nation.region for nation in self.nations.values()} | {self.mainRegionId}
 
     def isJPOrPuppetStorage(self, regionId: str) -> bool:
         return regionId in self.puppetRegions or regionId in self.jumpPointRegions
     
     def inRegion(self, nationId: str, regionId: str) -> bool:
-        if regionId not in self.regionalNations:
-            return False
-        
-        return nationId in self.regionalNations[regionId]
+        return self.regionalNations.contains(regionId, nationId)
     
     def verifyEndo(self, nationId: str, endorserId: str) -> bool:
         if not self.inWa(nationId) or not self.inWa(endorserId):
@@ -124,11 +584,11 @@ class CacheManager(commands.Cog):
             return set()
         
         endorsements = set()
-        for endorsee in self.regionWaNations():
-            if endorsee == nationId:
+        for endorsee in self.endorsed.get(nationId, ()):
+            if endorsee == nationId or endorsee not in self.regionWa:
                 continue
 
-            if nationId in self.nation(endorsee).endorsements and self.verifyEndo(endorsee, nationId):
+            if self.verifyEndo(endorsee, nationId):
                 endorsements.add(endorsee)
 
         return endorsements
@@ -139,81 +599,388 @@ class CacheManager(commands.Cog):
             # Cache is already rebuilding
             return
         
-        timeSinceLastRebuild = time.time() - self.lastRebuildEnd
-
-        if timeSinceLastRebuild < (3600 * 2):
-            # Less than 2h since last rebuild
-            return
-        
-        if not self.needsRebuild and timeSinceLastRebuild < (3600 * 24):
-            # Skip if we don't need a rebuild, but do force a rebuild every 24h
+        if time.time() - self.lastRebuildEnd < FULL_REBUILD_INTERVAL:
+            # Everything else is kept fresh by refreshCache
             return
 
-        await self.rebuildCache()
+        try:
+            with accountTo(SUBSYSTEM_REBUILD):
+                await self.rebuildCache()
+        except APIUnavailableError as error:
+            logger.error(f"cache: Rebuild failed: {error}")
+        except Exception:
+            logger.exception("cache: Rebuild failed")
+        finally:
+            if self.lastRebuildStart > self.lastRebuildEnd:
+                # No longer rebuilding, so the next check tries again
+                self.lastRebuildStart = self.lastRebuildEnd
     
     async def rebuildCache(self):
         self.lastRebuildStart = time.time()
 
         logger.info(f"cache: Building regional cache for {self.mainRegionId}")
         
-        await self.fetchWa()
-        logger.info(f"cache: Queried list of WA members ({len(self.waNations)})")
-
-        await asyncio.sleep(1)
+        regionsDump = await self.loadRegionsDump()
 
-        await self.fetchJumpPointRegions()
-        logger.info(f"cache: Queried list of jump points ({len(self.jumpPointRegions)})")
+        # None of these depend on each other, so they share the budget instead of queueing
+        requests = [self.fetchWa(PRIORITY_BACKGROUND), self.fetchRegion(self.mainRegionId, PRIORITY_BACKGROUND)]
 
-        await asyncio.sleep(1)
-
-        await self.fetchPuppetRegions()
-        logger.info(f"cache: Queried list of puppet storages ({len(self.puppetRegions)})")
+        if regionsDump and JUMP_POINT_TAG in regionsDump.tags:
+            self.jumpPointRegions = regionsDump.tags[JUMP_POINT_TAG]
+            logger.info(f"cache: Loaded list of jump points from the regions dump ({len(self.jumpPointRegions)})")
+        else:
+            requests.append(self.fetchJumpPointRegions(PRIORITY_BACKGROUND))
 
-        await asyncio.sleep(1)
+        if regionsDump and PUPPET_STORAGE_TAG in regionsDump.tags:
+            self.puppetRegions = regionsDump.tags[PUPPET_STORAGE_TAG]
+            logger.info(f"cache: Loaded list of puppet storages from the regions dump ({len(self.puppetRegions)})")
+        else:
+            requests.append(self.fetchPuppetRegions(PRIORITY_BACKGROUND))
 
-        self.regionalNations = {}
+        await asyncio.gather(*requests)
 
-        await self.fetchRegion(self.mainRegionId)
+        logger.info(f"cache: Queried list of WA members ({len(self.waNations)})")
+        logger.info(f"cache: Jump points: {len(self.jumpPointRegions)}, puppet storages: {len(self.puppetRegions)}")
 
-        self.regionalNations[self.mainRegionId] = self.mainRegion.nations
+        # Without the dump, other regions are only learned about from moves and foundings
+        self.regionalNations = regionsDump.nations if regionsDump else self.newRegionMembership()
+        self.regionalNations.pin(self.mainRegionId, self.mainRegion.nations)
         logger.info(f"Queried list of residents for {self.mainRegion.name} ({len(self.mainRegion.nations)})")
 
-        await asyncio.sleep(1)
+        dumpNations = await self.loadNationsDump()
+        seeded = 0
+        missing = set()
+
+        self.residentSince = {}
+        for dumpNation in dumpNations.values():
+            if dumpNation.id in self.mainRegion.nations:
+                self.residentSince[dumpNation.id] = dumpNation.lastResidencyUpdateTime - dumpNation.residencyNum * 86400
 
         for nationId in self.regionWaNations():
-            await self.fetchNation(nationId)
+            dumpNation = dumpNations.get(nationId)
+            if dumpNation and dumpNation.waStatus != NON_WA:
+                # The dump's generation time, so the refresher gets to them like any stale nation
+                self.storeNation(dumpNation)
+                seeded += 1
+            else:
+                missing.add(nationId)
 
-            nation = self.nation(nationId)
-            logger.info(f"Queried WA nation {nation.name} in {self.mainRegion.name} with {len(self.verifiedEndorsements(nationId))} verified endorsements")
+        requests = [self.fetchRegionalWaNations(missing)]
+        if not self.mainRegion.nations <= self.residentSince.keys():
+            requests.append(self.fetchResidencies())
 
-            await asyncio.sleep(1.2)
+        progress, *_ = await asyncio.gather(*requests)
+        if progress.failed:
+            logger.warning(f"cache: Could not fetch {progress.failed} WA nations in {self.mainRegion.name}")
+        else:
+            logger.info(f"cache: Fetched {progress.done} WA nations at {progress.rate():.1f} nations/s")
+
+        if seeded:
+            logger.info(f"cache: Seeded {seeded} WA nations in {self.mainRegion.name} from the nations dump")
     
         logger.debug(f"Region: {self.mainRegion}")
         logger.debug(f"Nations: {list[self.nations.values()]}")
 
         self.lastRebuildEnd = time.time()
-        self.needsRebuild = False
+        self.lastResync = self.lastRebuildEnd
+        self.needsResync = False
 
         self.bot.dispatch('cacheRebuildComplete')
         logger.info(f"Cache rebuild completed after {self.lastRebuildEnd-self.lastRebuildStart} seconds.")
 
-    def markCacheOutdated(self) -> None:
-        self.needsRebuild = True
+    async def ensureDump(self, path: str, download) -> bool:
+        if DOWNLOAD_DUMPS:
+            if not os.path.exists(path) or time.time() - os.path.getmtime(path) > DUMP_MAX_AGE:
+                try:
+                    await download(path)
+                except APIUnavailableError as error:
+                    # Nations are fetched one by one instead
+                    logger.warning(f"cache: Could not download {path}, skipping it: {error}")
+                    return False
+
+        if not os.path.exists(path):
+            logger.warning(f"cache: Dump {path} does not exist, skipping it")
+            return False
+
+        return True
+
+    async def loadNationsDump(self) -> dict[str, Nation]:
+        if not NATIONS_DUMP or not await self.ensureDump(NATIONS_DUMP, self.api.downloadNationsDump):
+            return {}
+
+        nations, stats = await asyncio.to_thread(loadNationsDump, NATIONS_DUMP, self.mainRegionId)
+        logger.info(f"cache: Parsed {stats.parsed} nations from {NATIONS_DUMP} in {stats.seconds:.1f} seconds "
+                    f"({stats.rate():.0f} nations/sec, peak RSS {stats.peakRss // 1024} MiB), {stats.matched} in {self.mainRegionId}")
+
+        return nations
+
+    async def loadRegionsDump(self) -> RegionsDump | None:
+        if not REGIONS_DUMP or not await self.ensureDump(REGIONS_DUMP, self.api.downloadRegionsDump):
+            return None
+
+        dump, stats = await asyncio.to_thread(loadRegionsDump, REGIONS_DUMP, self.newRegionMembership())
+        logger.info(f"cache: Indexed {stats.parsed} regions from {REGIONS_DUMP} in {stats.seconds:.1f} seconds "
+                    f"(+{stats.rssGrowth // 1024} MiB resident, peak RSS {stats.peakRss // 1024} MiB), {len(dump.tags)} tags")
+
+        dump.nations.enforceCap()
+        logger.info(f"cache: Region membership uses {dump.nations.footprint() // 1024} KiB for "
+                    f"{dump.nations.residents()} residents of {len(dump.nations)} regions ({dump.nations.evicted} evicted)")
+
+        return dump
+
+    async def saveSnapshot(self) -> None:
+        if not self.firstCacheComplete():
+            return # nothing worth keeping yet
+
+        start = time.perf_counter()
+        # Events still queued aren't in the cache yet, so a restart backfills them
+        (lastEventId, lastEventTime) = self.events.handledThrough()
+
+        blob = dumpSnapshot(CacheSnapshot(
+            createdAt=time.time(),
+            lastRebuildEnd=self.lastRebuildEnd,
+            lastEventId=lastEventId,
+            lastEventTime=lastEventTime,
+            waNations=self.waNations,
+            puppetRegions=self.puppetRegions,
+            jumpPointRegions=self.jumpPointRegions,
+            mainRegion=self.mainRegion,
+            nations=self.nations,
+            regionalNations=self.regionalNations,
+            residentSince=self.residentSince,
+        ))
+
+        await asyncio.to_thread(self.redis.set, SNAPSHOT_KEY, blob)
+
+        logger.info(f"cache: Saved snapshot of {len(self.nations)} nations ({len(blob)} bytes) in {time.perf_counter() - start:.2f} seconds")
+
+    async def restoreSnapshot(self) -> bool:
+        blob = await asyncio.to_thread(self.redis.get, SNAPSHOT_KEY)
+        if not blob:
+            return False
+
+        try:
+            snapshot = loadSnapshot(blob, self.newRegionMembership())
+        except SnapshotError as e:
+            logger.warning(f"cache: Ignoring snapshot: {e.message}")
+            return False
+
+        if snapshot.mainRegion.id != self.mainRegionId:
+            logger.warning(f"cache: Ignoring snapshot for {snapshot.mainRegion.id}, main region is now {self.mainRegionId}")
+            return False
+
+        age = time.time() - snapshot.createdAt
+        if age > SNAPSHOT_MAX_AGE:
+            logger.warning(f"cache: Ignoring snapshot taken {age:.0f} seconds ago")
+            return False
+
+        self.waNations = snapshot.waNations
+        self.puppetRegions = snapshot.puppetRegions
+        self.jumpPointRegions = snapshot.jumpPointRegions
+        self.nations = self.newNationStore()
+        for nation in snapshot.nations.values():
+            nation.endorsements = self.packEndorsements(nation.endorsements)
+            self.nations.put(nation)
+        self.rebuildEndorsementIndex()
+        self.mainRegion = snapshot.mainRegion
+        self.regionalNations = snapshot.regionalNations
+        self.regionalNations.enforceCap()
+        self.residentSince = snapshot.residentSince
+        self.recountRegionWa()
+        self.lastRebuildEnd = snapshot.lastRebuildEnd
+
+        if snapshot.lastEventId is not None:
+            self.events.resume(snapshot.lastEventId, snapshot.lastEventTime)
+
+        logger.info(f"cache: Restored snapshot of {len(self.nations)} nations taken {age:.0f} seconds ago")
+        return True
+
+    # Returns False if NationStates couldn't be reached
+    async def reconcileCache(self) -> bool:
+        self.repackEndorsements()
+        if self.mainRegion is not None:
+            self.auditEndorsementCounts()
+
+        try:
+            _, region = await asyncio.gather(
+                self.fetchWa(PRIORITY_BACKGROUND),
+                self.api.fetchRegion(self.mainRegionId, PRIORITY_BACKGROUND))
+        except APIUnavailableError as error:
+            logger.warning(f"cache: Could not reconcile cache: {error}")
+            return False
+
+        if region:
+            self.mainRegion = region
+            self.regionalNations.pin(self.mainRegionId, region.nations)
+            self.recountRegionWa()
+
+        for nationId in self.residentSince.keys() - self.mainRegion.nations:
+            del self.residentSince[nationId]
+
+        missing = {nationId for nationId in self.regionWaNations() if not self.isNationCached(nationId)}
+        requests = [self.fetchRegionalWaNations(missing)]
+        # Residents we never saw arrive, or a snapshot from before residency was tracked
+        if not self.mainRegion.nations <= self.residentSince.keys():
+            requests.append(self.fetchResidencies())
+
+        await asyncio.gather(*requests)
+
+        self.lastResync = time.time()
+        logger.info(f"cache: Reconciled cache, fetched {len(missing)} WA nations missing from it")
+        return True
+
+    def lastFetched(self, nationId: str) -> float:
+        nation = self.nation(nationId)
+        return nation.lastApiUpdateTime if nation else 0
+
+    # Whether the refresher should re-fetch a cached nation
+    def isStale(self, nationId: str) -> bool:
+        if nationId in self.staleNations:
+            return True
+
+        nation = self.nation(nationId)
+        return nation is None or nation.flagDirty or time.time() - nation.lastApiUpdateTime > REFRESH_MAX_AGE
+
+    # Nations explicitly marked stale come first, then the oldest by last fetch
+    def nextStaleNation(self) -> str | None:
+        regionWa = self.regionWaNations()
+
+        while self.staleNations:
+            nationId = self.staleNations.pop()
+            if nationId in regionWa:
+                return nationId
+
+        if not self.refreshQueue and time.time() - self.lastRefreshScan > REFRESH_SCAN_INTERVAL:
+            self.lastRefreshScan = time.time()
+            candidates = [nationId for nationId in regionWa if self.isStale(nationId)]
+            candidates.sort(key=self.lastFetched, reverse=True)
+            self.refreshQueue = candidates
+
+        while self.refreshQueue:
+            nationId = self.refreshQueue.pop()
+            # Might have been refreshed or left since the queue was built
+            if nationId in regionWa and self.isStale(nationId):
+                return nationId
+
+        return None
+
+    async def refreshNation(self, nationId: str) -> None:
+        try:
+            nation = await self.api.fetchNation(nationId, PRIORITY_BACKGROUND, fresh=True)
+        except APIUnavailableError as error:
+            logger.warning(f"cache: Could not refresh {nationId}: {error}")
+            self.staleNations.add(nationId)
+            return
+
+        if nation is None:
+            # Ceased to exist, the CTE event will clean up the rest
+            self.dropNation(nationId)
+            return
+
+        self.storeNation(nation)
+        logger.debug(f"cache: Refreshed {nationId}")
+
+    @tasks.loop(seconds=REFRESH_INTERVAL)
+    async def refreshCache(self):
+        if not self.firstCacheComplete() or self.lastRebuildStart > self.lastRebuildEnd:
+            return
+
+        if self.needsResync or time.time() - self.lastResync > RESYNC_INTERVAL:
+            resyncAll = self.needsResync
+            self.needsResync = False
+
+            with accountTo(SUBSYSTEM_RESYNC):
+                reconciled = await self.reconcileCache()
+
+            if not reconciled:
+                # Tried again on the next tick
+                self.needsResync = resyncAll
+                return
+
+            if resyncAll:
+                # Events were missed, so nothing in the cache can be trusted any more
+                self.staleNations |= self.regionWaNations()
+            return
+
+        nationId = self.nextStaleNation()
+        if nationId is not None:
+            with accountTo(SUBSYSTEM_REFRESH):
+                await self.refreshNation(nationId)
+
+    async def refreshLogin(self, nationId: str) -> None:
+        # A nation that's gone is left for the CTE event to clean up
+        try:
+            await self.fetchNationProfile(nationId, PROFILE_LOGIN, PRIORITY_IDLE)
+        except APIUnavailableError as error:
+            # Still due, so it's tried again with the next batch
+            logger.debug(f"cache: Could not refresh login of {nationId}: {error}")
+
+    # Keeps lastLogin minutes old for /inactive by fetching only the lastlogin shard
+    @tasks.loop(seconds=LOGIN_REFRESH_INTERVAL)
+    async def refreshLogins(self):
+        if not self.firstCacheComplete() or self.lastRebuildStart > self.lastRebuildEnd:
+            return
+
+        batch = min(LOGIN_REFRESH_BATCH, self.api.limiter.spare(PRIORITY_IDLE))
+        due = self.byLoginChecked.range(high=time.time() - LOGIN_REFRESH_MIN_AGE).page(0, batch)
+        if due:
+            with accountTo(SUBSYSTEM_LOGIN):
+                await asyncio.gather(*(self.refreshLogin(nationId) for (_, nationId) in due))
+
+    @tasks.loop(minutes=10)
+    async def checkpointCache(self):
+        self.nations.trim()
+        await self.saveSnapshot()
+
+    async def cog_load(self):
+        self.restoredFromSnapshot = await self.restoreSnapshot()
+
+    async def cog_unload(self):
+        self.refreshCache.cancel()
+        self.refreshLogins.cancel()
+        self.checkpointCache.cancel()
+        await self.saveSnapshot()
+
+    @app_commands.command(description="View cache memory statistics.")
+    async def cachestats(self, interaction: discord.Interaction):
+        if not interaction.user.guild_permissions.manage_guild:
+            await interaction.response.send_message(embed=getManageGuildRequiredEmbed())
+            return
+
+        await interaction.response.send_message(embed=getCacheStatsEmbed(
+            self.nations, len(self.regionWa), self.regionalNations, REGION_MEMBERSHIP_CAP * 1024 * 1024,
+            self.api.coalesced, self.api.responses))
+
+    # Without a nation, region and WA membership are re-synced
+    def markCacheOutdated(self, nationId: str | None = None) -> None:
+        if nationId is None:
+            self.needsResync = True
+            self.api.responses.clear()
+        else:
+            self.staleNations.add(nationId)
+            self.api.forgetNation(nationId)
+
+    @commands.Cog.listener()
+    async def on_markDirtyCache(self) -> None:
+        logger.warning("events were missed, cache will be re-synced and refreshed")
+        self.markCacheOutdated()
     
     @commands.Cog.listener()
     async def on_eventCte(self, nationId: str, regionId: str) -> None:
-        if regionId in self.regionalNations:
-            self.regionalNations[regionId].discard(nationId)
+        self.api.forgetNation(nationId)
+        self.regionalNations.discard(regionId, nationId)
 
-        if self.isNationCached(nationId):
-            del self.nations[nationId]
+        self.withdrawEndorsements(nationId)
+        self.dropNation(nationId)
 
         if regionId == self.mainRegionId:
+            self.residentSince.pop(nationId, None)
             try:
                 self.mainRegion.nations.remove(nationId)
 
                 if self.inWa(nationId):
                     self.waNations.remove(nationId)
+                    self.updateRegionWa(nationId)
                     self.bot.dispatch('localWaCte', nationId, regionId)
                     logger.warning(f"WA nation {nationId} ceased to exist in {regionId}")
                 else:
@@ -224,15 +991,17 @@ class CacheManager(commands.Cog):
         else:
             self.waNations.discard(nationId)
 
+        self.updateRegionWa(nationId)
+
     @commands.Cog.listener()
     async def on_eventFounding(self, nationId: str, event: str, regionId: str) -> None:
-        if regionId not in self.regionalNations:
-            self.regionalNations[regionId] = set()
-
-        self.regionalNations[regionId].add(nationId)
+        self.api.forgetNation(nationId)
+        self.regionalNations.add(regionId, nationId)
 
         if regionId == self.mainRegionId:
             self.mainRegion.nations.add(nationId)
+            self.residentSince[nationId] = time.time()
+            self.updateRegionWa(nationId)
             self.bot.dispatch('localFounding', nationId, event, regionId)
         else:
             self.bot.dispatch('worldFounding', nationId, event, regionId)
@@ -241,24 +1010,28 @@ class CacheManager(commands.Cog):
 
     @commands.Cog.listener()
     async def on_eventMove(self, nationId: str, sourceId: str, targetId: str) -> None:
-        if sourceId in self.regionalNations:
-            self.regionalNations[sourceId].discard(nationId)
-
-        if targetId not in self.regionalNations:
-            self.regionalNations[targetId] = set()
+        self.api.forgetNation(nationId)
+        self.regionalNations.discard(sourceId, nationId)
+        self.regionalNations.add(targetId, nationId)
 
-        self.regionalNations[targetId].add(nationId)
+        # Moving loses every endorsement received and withdraws every one given
+        self.withdrawEndorsements(nationId)
 
         if self.isNationCached(nationId):
             self.nation(nationId).region = targetId
-            self.nation(nationId).resetResidency()
-            self.nation(nationId).resetLogin()
+            self.nations.settle(nationId)
+            self.setEndorsements(nationId, set())
+            self.resetResidency(nationId)
+            self.resetLogin(nationId)
 
         if sourceId == self.mainRegionId:
+            self.residentSince.pop(nationId, None)
             try:
                 self.mainRegion.nations.remove(nationId)
             except KeyError:
                 self.markCacheOutdated()
+
+            self.updateRegionWa(nationId)
             
             if self.inWa(nationId):
                 self.bot.dispatch('localWaLeave', nationId, sourceId, targetId)
@@ -268,11 +1041,12 @@ class CacheManager(commands.Cog):
                 logger.info(f"Nation {nationId} left {sourceId}")
         elif targetId == self.mainRegionId:
             self.mainRegion.nations.add(nationId)
+            self.residentSince[nationId] = time.time()
+            self.updateRegionWa(nationId)
 
             if self.inWa(nationId):
                 if not self.isNationCached(nationId):
-                    await self.fetchNation(nationId)
-                    self.bot.dispatch('localWaJoin', nationId, sourceId, targetId)
+                    self.fetchJoined(nationId, 'localWaJoin', nationId, sourceId, targetId)
                     logger.warning(f"WA nation {nationId} joined {targetId}")
             else:
                 self.bot.dispatch('localJoin', nationId, sourceId, targetId)
@@ -282,17 +1056,19 @@ class CacheManager(commands.Cog):
     
     @commands.Cog.listener()
     async def on_eventWaAdmit(self, nationId: str) -> None:
+        self.api.forgetNation(nationId)
         self.waNations.add(nationId)
+        self.updateRegionWa(nationId)
 
         if self.isNationCached(nationId):
             self.nation(nationId).waStatus = WA_MEMBER
-            self.nation(nationId).resetLogin()
+            self.resetLogin(nationId)
 
         if nationId in self.mainRegion.nations:
-            if not self.isNationCached(nationId):
-                await self.fetchNation(nationId)
-
-            self.bot.dispatch('localWaAdmit', nationId, self.mainRegionId)
+            if self.isNationCached(nationId):
+                self.bot.dispatch('localWaAdmit', nationId, self.mainRegionId)
+            else:
+                self.fetchJoined(nationId, 'localWaAdmit', nationId, self.mainRegionId)
             logger.warning(f"Nation {nationId} joined the WA in {self.mainRegionId}")
         else:
             self.bot.dispatch('worldWaAdmit', nationId)
@@ -309,15 +1085,19 @@ class CacheManager(commands.Cog):
 
     @commands.Cog.listener()
     async def on_eventWaResign(self, nationId: str) -> None:
+        self.api.forgetNation(nationId)
         try:
             self.waNations.remove(nationId)
         except KeyError:
             self.markCacheOutdated()
 
+        self.updateRegionWa(nationId)
+        self.withdrawEndorsements(nationId)
+
         if self.isNationCached(nationId):
             self.nation(nationId).waStatus = NON_WA
-            self.nation(nationId).endorsements = set()
-            self.nation(nationId).resetLogin()
+            self.setEndorsements(nationId, set())
+            self.resetLogin(nationId)
 
             if nationId in self.mainRegion.nations:
                 self.bot.dispatch('localWaResign', nationId, self.mainRegionId)
@@ -325,8 +1105,9 @@ class CacheManager(commands.Cog):
 
     @commands.Cog.listener()
     async def on_eventEndo(self, sourceId: str, targetId: str) -> None:
+        self.api.forgetNation(targetId)
         if self.isNationCached(targetId):
-            self.nation(targetId).endorsements.add(sourceId)
+            self.addEndorsement(targetId, sourceId)
 
             if targetId in self.mainRegion.nations:
                 if targetId == self.mainRegion.delegate:
@@ -337,13 +1118,14 @@ class CacheManager(commands.Cog):
                     logger.info(f"Nation {sourceId} endorsed {targetId} in {self.mainRegionId}")
 
         if self.isNationCached(sourceId):
-            self.nation(sourceId).resetLogin()
+            self.resetLogin(sourceId)
 
     @commands.Cog.listener()
     async def on_eventUnendo(self, sourceId: str, targetId: str) -> None:
+        self.api.forgetNation(targetId)
         try:
             if self.isNationCached(targetId):
-                self.nation(targetId).endorsements.remove(sourceId)
+                self.removeEndorsement(targetId, sourceId)
 
                 if targetId in self.mainRegion.nations:
                     if targetId == self.mainRegion.delegate:
@@ -353,17 +1135,23 @@ class CacheManager(commands.Cog):
                         self.bot.dispatch('localWaUnendo', sourceId, targetId, self.mainRegionId)
                         logger.info(f"Nation {sourceId} unendorsed {targetId} in {self.mainRegionId}")
         except KeyError:
-            self.markCacheOutdated()
+            self.markCacheOutdated(targetId)
 
         if self.isNationCached(sourceId):
-            self.nation(sourceId).resetLogin()
+            self.resetLogin(sourceId)
 
     @commands.Cog.listener()
     async def on_eventRegionUpdate(self, regionId: str) -> None:
-        if regionId in self.regionalNations:
-            for nation in self.regionalNations[regionId]:
-                if self.isNationCached(nation):
-                    self.nation(nation).endorsements = self.verifiedEndorsements(nationId=nation)
+        # Nearly every region in the world has nothing pending
+        for nationId in self.pendingReverify.pop(regionId, ()):
+            nation = self.nation(nationId)
+            if nation is None or nation.region not in self.regionalNations:
+                # Gone, or its region's membership was evicted since
+                continue
+
+            verified = self.verifiedEndorsements(nationId)
+            if len(verified) != len(nation.endorsements):
+                self.setEndorsements(nationId, verified)
 
         if regionId == self.mainRegionId:
             self.bot.dispatch('localUpdate', regionId)
@@ -371,10 +1159,11 @@ class CacheManager(commands.Cog):
 
     @commands.Cog.listener()
     async def on_eventFlag(self, nationId: str) -> None:
+        self.api.forgetNation(nationId)
         if self.isNationCached(nationId):
             # we mark this so we don't query the new flag until it's needed
             self.nation(nationId).flagDirty = True
-            self.nation(nationId).resetLogin()
+            self.resetLogin(nationId)
 
             if nationId in self.mainRegion.nations:
                 self.bot.dispatch('localFlagChange', nationId, self.mainRegionId)
@@ -435,4 +1224,11 @@ class CacheManager(commands.Cog):
 
     @commands.Cog.listener()
     async def on_startJobs(self):
-        self.checkForRebuild.start()
\ No newline at end of file
+        if self.restoredFromSnapshot:
+            with accountTo(SUBSYSTEM_RESYNC):
+                await self.reconcileCache()
+
+        self.checkForRebuild.start()
+        self.refreshCache.start()
+        self.refreshLogins.start()
+        self.checkpointCache.start()
\ No newline at end of file
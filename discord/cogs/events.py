@@ -1,73 +1,268 @@
-import re, logging, httpx, asyncio, time
+import discord, logging, httpx, asyncio, time, os
 from discord.ext import commands, tasks
+from discord import app_commands
 from contextlib import suppress
+from collections import deque
+from dataclasses import dataclass, field
 
-from cogs.api import APIClient
+from cogs.api import APIClient, APIUnavailableError
+from classifier import classify, Happening
+from lib import handle_task_result, normalize
+from limiter import PRIORITY_RECRUITMENT
+from ledger import accountTo, SUBSYSTEM_BACKFILL
+
+from views.eventqueue import getEventQueueEmbed
+from views.error import getManageGuildRequiredEmbed
 
 logger = logging.getLogger("events")
 
-EVENTS: list[tuple[str, re.Pattern]] = [
-    ("RegionUpdate", re.compile(r"%%([a-z0-9_\-]+)%% updated\.")),
-    ("Endo", re.compile(r"@@([a-z0-9_\-]+)@@ endorsed @@([a-z0-9_\-]+)@@")),
-    ("Unendo", re.compile(r"@@([a-z0-9_\-]+)@@ withdrew its endorsement from @@([a-z0-9_\-]+)@@")),
-    ("WaApply", re.compile(r"@@([a-z0-9_\-]+)@@ applied to join the World Assembly")),
-    ("WaAdmit", re.compile(r"@@([a-z0-9_\-]+)@@ was admitted to the World Assembly")),
-    ("WaResign", re.compile(r"@@([a-z0-9_\-]+)@@ resigned from the World Assembly")),
-    ("NewDelegate", re.compile(r"@@([a-z0-9_\-]+)@@ became WA Delegate of %%([a-z0-9_\-]+)%%")),
-    ("ReplaceDelegate", re.compile(r"@@([a-z0-9_\-]+)@@ seized the position of %%([a-z0-9_\-]+)%% WA Delegate from @@([a-z0-9_\-]+)@@")),
-    ("LoseDelegate", re.compile(r"@@([a-z0-9_\-]+)@@ lost WA Delegate status in %%([a-z0-9_\-]+)%%")),
-    ("Founding", re.compile(r"@@([a-z0-9_\-]+)@@ was (founded|refounded) in %%([a-z0-9_\-]+)%%")),
-    ("Cte", re.compile(r"@@([a-z0-9_\-]+)@@ ceased to exist in %%([a-z0-9_\-]+)%%")),
-    ("Move", re.compile(r"@@([a-z0-9_\-]+)@@ relocated from %%([a-z0-9_\-]+)%% to %%([a-z0-9_\-]+)%%")),
-    ("Rmb", re.compile(r"@@([a-z0-9_\-]+)@@ lodged <a href=\"/region=(?:[a-z0-9_\-]+)/page=display_region_rmb\?postid=([0-9]+)#p(?:[0-9]+)\">a message</a> on the %%([a-z0-9_\-]+)%% Regional Message Board")),
-    ("Flag", re.compile(r"@@([a-z0-9_\-]+)@@ altered its national flag")),
-    ("Suppress", re.compile(r"@@([a-z0-9_\-]+)@@ suppressed a post on the %%([a-z0-9_\-]+)%% Regional Message Board")),
-    ("Unsuppress", re.compile(r"@@([a-z0-9_\-]+)@@ unsuppressed a post on the %%([a-z0-9_\-]+)%% Regional Message Board")),
-]
+SSE_BUCKETS = ["admin", "endo", "founding", "member", "move", "change", "rmb"]
+
+# Happenings shard filters covering everything the SSE buckets deliver
+BACKFILL_FILTERS = ["admin", "endo", "founding", "cte", "member", "move", "change", "rmb"]
+BACKFILL_PAGE_SIZE = 100
+MAX_BACKFILL_PAGES = 20
+
+# After reconnecting to SSE, backfill once more to cover events that happened while connecting
+BACKFILL_OVERLAP = 10
+
+# How many event IDs to remember so that backfilled events aren't handled twice
+RECENT_EVENT_IDS = 5000
+
+# Local events all go to the first worker, in stream order. The rest are partitioned by
+# their first argument, so events about an uncached nation may be handled out of order.
+EVENT_WORKERS = int(os.getenv("POLARIS_EVENT_WORKERS", "4"))
+EVENT_QUEUE_SIZE = int(os.getenv("POLARIS_EVENT_QUEUE_SIZE", "20000"))
+
+# Past this share of a worker's queue, events for it that aren't local are dropped
+EVENT_QUEUE_HIGH_WATERMARK = float(os.getenv("POLARIS_EVENT_QUEUE_HIGH_WATERMARK", "0.75"))
+
+# Foundings and moves are never shed, recruitment feeds on them from all over the world
+SHEDDABLE_EVENTS = {
+    "RegionUpdate", "Rmb", "Suppress", "Unsuppress", "Flag",
+    "WaApply", "NewDelegate", "ReplaceDelegate", "LoseDelegate",
+}
+
+@dataclass
+class QueueStats:
+    enqueued: int = 0
+    handled: int = 0
+    shed: int = 0
+    failed: int = 0
+    lastLag: float = 0.0
+    maxLag: float = 0.0
+    # Workers whose queue is above the high watermark
+    shedding: set[int] = field(default_factory=set)
+
+    def recordLag(self, lag: float) -> None:
+        self.lastLag = lag
+        if lag > self.maxLag:
+            self.maxLag = lag
 
 class EventListener(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.lastEvent = time.time()
+        self.lastEventId: int | None = None
+        self.lastEventTime: float | None = None
+        self.recentIds: set[int] = set()
+        self.recentIdOrder: deque[int] = deque()
+        # id -> time of events queued or being handled, which a snapshot can't resume past
+        self.pendingIds: dict[int, float] = {}
+        self.task = None
+
+        self.mainRegionId = normalize(bot.region)
+        self.queues: list[asyncio.Queue[tuple[int, Happening, float]]] = [
+            asyncio.Queue(maxsize=max(1, EVENT_QUEUE_SIZE // EVENT_WORKERS)) for _ in range(EVENT_WORKERS)
+        ]
+        self.workers: list[asyncio.Task] = []
+        self.queueStats = QueueStats()
+
+    def seen(self, eventId: int) -> bool:
+        if eventId in self.recentIds:
+            return True
+
+        self.recentIds.add(eventId)
+        self.recentIdOrder.append(eventId)
+        if len(self.recentIdOrder) > RECENT_EVENT_IDS:
+            self.recentIds.discard(self.recentIdOrder.popleft())
+
+        return False
+
+    # Picks up from a previous run, so startup backfills instead of relying on a rebuild
+    def resume(self, eventId: int, eventTime: float | None) -> None:
+        self.lastEventId = eventId
+        self.lastEventTime = eventTime
+
+    # The event to resume from after a restart: every event up to it has been handled
+    def handledThrough(self) -> tuple[int | None, float | None]:
+        if not self.pendingIds:
+            return (self.lastEventId, self.lastEventTime)
+
+        eventId = min(self.pendingIds)
+        return (eventId - 1, self.pendingIds[eventId])
+
+    def queueDepth(self) -> int:
+        return sum(queue.qsize() for queue in self.queues)
+
+    # Cached foreign nations count too, or their flag and WA status changes would be lost
+    def isWorldOnly(self, happening: Happening) -> bool:
+        return happening.type in SHEDDABLE_EVENTS and not self.isLocal(happening)
+
+    def isLocal(self, happening: Happening) -> bool:
+        cache = self.bot.get_cog('CacheManager')
+        mainRegion = cache.region() if cache else None
+
+        for arg in happening.args:
+            if arg == self.mainRegionId:
+                return True
+            if mainRegion and arg in mainRegion.nations:
+                return True
+            if cache and cache.isNationCached(arg):
+                return True
+
+        return False
+
+    def queueIndex(self, happening: Happening) -> int:
+        if len(self.queues) == 1 or self.isLocal(happening):
+            return 0
+        return 1 + hash(happening.args[0]) % (len(self.queues) - 1)
+
+    def queueFor(self, happening: Happening) -> asyncio.Queue:
+        return self.queues[self.queueIndex(happening)]
+
+    async def enqueue(self, eventId: int, happening: Happening, eventTime: float) -> None:
+        stats = self.queueStats
+        index = self.queueIndex(happening)
+        queue = self.queues[index]
+
+        # Per queue, a full one blocks the reader however empty the others are
+        if queue.qsize() >= queue.maxsize * EVENT_QUEUE_HIGH_WATERMARK:
+            if index not in stats.shedding:
+                stats.shedding.add(index)
+                logger.warning(f"event queue {index} above high watermark ({queue.qsize()} queued), shedding world-only events")
+
+            if self.isWorldOnly(happening):
+                stats.shed += 1
+                return
+        elif index in stats.shedding:
+            stats.shedding.discard(index)
+            logger.info(f"event queue {index} back below high watermark ({queue.qsize()} queued)")
+
+        stats.enqueued += 1
+        self.pendingIds[eventId] = eventTime
+
+        # Only blocks the reader if even the main region's events can't keep up
+        await queue.put((eventId, happening, eventTime))
+
+    # Awaited directly rather than through bot.dispatch, so listeners must not wait on the API
+    async def deliver(self, happening: Happening) -> None:
+        for listener in self.bot.extra_events.get(f"on_event{happening.type}", []):
+            try:
+                await listener(*happening.args)
+            except Exception as e:
+                self.queueStats.failed += 1
+                logger.exception(f"listener for {happening.type}{happening.args} crashed: {e}")
+
+    async def work(self, queue: asyncio.Queue[tuple[int, Happening, float]]):
+        while True:
+            eventId, happening, eventTime = await queue.get()
+            self.queueStats.recordLag(time.time() - eventTime)
+
+            await self.deliver(happening)
+
+            self.pendingIds.pop(eventId, None)
+            self.queueStats.handled += 1
+            queue.task_done()
+
+    async def handle(self, eventId: int, eventTime: float, text: str) -> None:
+        if self.seen(eventId):
+            return
+
+        if self.lastEventId is None or eventId > self.lastEventId:
+            self.lastEventId = eventId
+            self.lastEventTime = eventTime
+
+        happening = classify(text)
+        if happening is not None:
+            self.lastEvent = time.time()
+            logger.debug(f"new {happening.type}: {text}")
+            await self.enqueue(eventId, happening, eventTime)
 
     async def listen(self):
         api: APIClient = self.bot.get_cog('APIClient')
 
         while True:
             try:
-                self.generator = api.serverSentEvents("admin", 
-                                                        "endo", 
-                                                        "founding",
-                                                        "member", 
-                                                        "move",
-                                                        "change",
-                                                        "rmb")
-                
+                self.generator = api.serverSentEvents(*SSE_BUCKETS)
+
                 async for event in self.generator:
-                    for (event_type, event_regex) in EVENTS:
-                        match = event_regex.match(event["str"])
-                        if match is not None:
-                            self.lastEvent = time.time()
-                            logger.debug(f"new {event_type}: {event["str"]}")
-                            self.bot.dispatch(f"event{event_type}", *match.groups())
-                            break
+                    await self.handle(event["id"], event["time"].timestamp(), event["str"])
             except httpx.ReadError:
                 logger.warning("read error in SSE connection, waiting 60 seconds to reconnect")
                 self.bot.dispatch("delayedEventRestart")
                 return
 
+    # Returns False if the happenings shard couldn't cover the whole gap
+    async def backfill(self, sinceId: int) -> bool:
+        api: APIClient = self.bot.get_cog('APIClient')
+
+        events = []
+        beforeId = None
+        complete = False
+
+        for _ in range(MAX_BACKFILL_PAGES):
+            try:
+                with accountTo(SUBSYSTEM_BACKFILL):
+                    page = await api.fetchHappenings(BACKFILL_FILTERS, sinceId, beforeId, BACKFILL_PAGE_SIZE, PRIORITY_RECRUITMENT)
+            except APIUnavailableError as error:
+                logger.warning(f"could not backfill happenings: {error}")
+                break
+
+            events.extend(page)
+
+            if len(page) < BACKFILL_PAGE_SIZE:
+                complete = True
+                break
+
+            beforeId = page[-1].id
+
+        events.sort(key=lambda e: e.id)
+        for event in events:
+            await self.handle(event.id, event.timestamp, event.text)
+
+        logger.info(f"backfilled {len(events)} happenings since event {sinceId} ({"complete" if complete else "incomplete"})")
+        return complete
+
+    async def reconnect(self):
+        resumeId = self.lastEventId
+
+        if resumeId is None:
+            # Nothing to resume from, so the cache can't be trusted
+            await self.start()
+            self.bot.dispatch("markDirtyCache")
+            return
+
+        complete = await self.backfill(resumeId)
+        await self.start()
+
+        await asyncio.sleep(BACKFILL_OVERLAP)
+        complete = await self.backfill(resumeId) and complete
+
+        if not complete:
+            logger.warning(f"could not backfill every happening since event {resumeId}, marking cache as dirty")
+            self.bot.dispatch("markDirtyCache")
+
     async def close(self):
         self.task.cancel()
         with suppress(asyncio.CancelledError):
             await self.task
 
-        logger.info("closing SSE connection")
-
-        await self.generator._client.aclose()
+        logger.info("closed SSE connection")
 
     async def start(self):
         self.task = asyncio.create_task(self.listen())
-        await self.task
+        self.task.add_done_callback(handle_task_result)
 
     @tasks.loop(minutes=5)
     async def checkActivity(self):
@@ -75,15 +270,30 @@ class EventListener(commands.Cog):
 
         if timeSinceLastEvent > 5 * 60: # 5 minutes with no events
             await self.close()
-            await self.start()
-            self.bot.dispatch("markDirtyCache")
+            await self.reconnect()
 
     @commands.Cog.listener()
     async def on_delayedEventRestart(self):
         await asyncio.sleep(60)
-        await self.start()
-        self.bot.dispatch("markDirtyCache")
+        await self.reconnect()
 
     @commands.Cog.listener()
     async def on_startJobs(self):
-        await self.start()
\ No newline at end of file
+        for queue in self.queues:
+            worker = asyncio.create_task(self.work(queue))
+            worker.add_done_callback(handle_task_result)
+            self.workers.append(worker)
+
+        if self.lastEventId is not None:
+            await self.reconnect()
+        else:
+            await self.start()
+
+    @app_commands.command(description="View event ingestion queue statistics.")
+    async def eventqueue(self, interaction: discord.Interaction):
+        if not interaction.user.guild_permissions.manage_guild:
+            await interaction.response.send_message(embed=getManageGuildRequiredEmbed())
+            return
+
+        await interaction.response.send_message(
+            embed=getEventQueueEmbed(self.queueStats, self.queueDepth(), EVENT_QUEUE_SIZE, len(self.workers)))
@@ -7,10 +7,13 @@ from cogs.cache import CacheManager
 from datetime import datetime
 from classes import *
 from lib import normalize
+from limiter import PRIORITY_RECRUITMENT
+from ledger import accountTo, SUBSYSTEM_RECRUIT, SUBSYSTEM_COMMAND
+from cogs.api import APIUnavailableError, PROFILE_RECRUIT_CHECK
 
 from views.recruit import RecruiterView
 from views.cache import getCacheIncompleteEmbed
-from views.error import getNonResidentEmbed, getManageGuildRequiredEmbed, getNoRecruitmentEmbed
+from views.error import getNonResidentEmbed, getManageGuildRequiredEmbed, getNoRecruitmentEmbed, getAPIUnavailableEmbed
 from views.config.bucket import BucketSelectorView, CreateBucketView
 from views.config.template import TemplateSelectorView, CreateTemplateView
 from views.tgsetup import TemplateSetupView
@@ -110,10 +113,14 @@ class RecruitmentManager(commands.Cog):
         
         # don't bother wasting API calls on checking this for newfounds
         if event == "refounded":
-            await self.cache.fetchNation(nationId)
+            try:
+                with accountTo(SUBSYSTEM_RECRUIT):
+                    nation = await self.cache.fetchNationProfile(nationId, PROFILE_RECRUIT_CHECK, PRIORITY_RECRUITMENT)
+            except APIUnavailableError as error:
+                logger.warning(f"skipping new refounded nation {nationId} as it could not be checked: {error}")
+                return
 
-            nation = self.cache.nation(nationId)
-            if not nation.canRecruit:
+            if nation is None or not nation["canRecruit"]:
                 logger.warning(f"skipping new refounded nation {nationId} as it has recruitment telegrams turned off")
                 return
         
@@ -128,22 +135,27 @@ class RecruitmentManager(commands.Cog):
         if self.checkPuppetFilter(nationId):
             return
         
-        if not self.cache.isNationCached(nationId):
-            await self.cache.fetchNation(nationId)
+        try:
+            with accountTo(SUBSYSTEM_RECRUIT):
+                nation = await self.cache.nationProfile(nationId, PROFILE_RECRUIT_CHECK, PRIORITY_RECRUITMENT)
+        except APIUnavailableError as error:
+            logger.warning(f"skipping new WA nation {nationId} as it could not be checked: {error}")
+            return
 
-        nation = self.cache.nation(nationId)
-        if not nation.canRecruit:
+        if nation is None:
+            return
+        if not nation["canRecruit"]:
             logger.warning(f"skipping new WA nation {nationId} as it has recruitment telegrams turned off")
             return
-        if nation.population > 500:
+        if nation["population"] > 500:
             logger.warning(f"skipping new WA nation {nationId} as it has over 500 million population")
             return
         
-        if self.cache.isJPOrPuppetStorage(nation.region):
+        if self.cache.isJPOrPuppetStorage(nation["region"]):
             logger.warning(f"skipping new WA nation {nationId} as it is in a puppet storage or jump point")
             return
         
-        self.addNation(nationId, nation.region, "wa")
+        self.addNation(nationId, nation["region"], "wa")
 
     def cooldown(self, nation: Nation) -> float:
         daysSinceFounding = (time.time() - nation.foundedAt) / 86400
@@ -265,7 +277,7 @@ class RecruitmentManager(commands.Cog):
         nationId = normalize(nation)
 
         if not self.cache.firstCacheComplete():
-            await interaction.response.send_message(embed=getCacheIncompleteEmbed())
+            await interaction.response.send_message(embed=getCacheIncompleteEmbed(self.cache.rebuildProgress))
             return
         
         if not self.canRecruit(interaction):
@@ -281,7 +293,11 @@ class RecruitmentManager(commands.Cog):
             return
         
         if not self.cache.isNationCached(nationId): # non-WA probably
-            await self.cache.fetchNation(nation)
+            with accountTo(SUBSYSTEM_COMMAND):
+                await self.cache.fetchNation(nationId)
+            if not self.cache.isNationCached(nationId):
+                await interaction.response.send_message(embed=getAPIUnavailableEmbed())
+                return
 
         minimumTimer = self.cooldown(self.cache.nation(nationId)) * 8
         if timer and timer < minimumTimer:
@@ -390,7 +406,7 @@ class RecruitmentManager(commands.Cog):
         nationId = normalize(nation)
 
         if not self.cache.firstCacheComplete():
-            await interaction.response.send_message(embed=getCacheIncompleteEmbed())
+            await interaction.response.send_message(embed=getCacheIncompleteEmbed(self.cache.rebuildProgress))
             return
         
         if nationId not in self.cache.mainRegion.nations:
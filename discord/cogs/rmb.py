@@ -3,7 +3,8 @@ from discord.ext import commands
 from discord import app_commands
 from datetime import datetime, timezone
 from cogs.cache import CacheManager
-from cogs.api import APIClient
+from cogs.api import APIClient, APIUnavailableError
+from ledger import accountTo, SUBSYSTEM_RMB
 
 from views.rmb import RMBView
 from views.error import getManageGuildRequiredEmbed
@@ -45,11 +46,17 @@ class RMBFeed(commands.Cog):
         if timeSinceLastUpdate < self.MAX_RMB_UPDATE_FREQUENCY:
             await asyncio.sleep(self.MAX_RMB_UPDATE_FREQUENCY - timeSinceLastUpdate)
 
-        messages = await self.api.fetchRMBPosts(
-            self.cache.mainRegionId,
-            0,
-            10
-        )
+        try:
+            with accountTo(SUBSYSTEM_RMB):
+                messages = await self.api.fetchRMBPosts(
+                    self.cache.mainRegionId,
+                    0,
+                    10
+                )
+        except APIUnavailableError:
+            # The next post or suppression tries again
+            self.updating = False
+            return
 
         config = ConfigModel.load()
 
@@ -20,7 +20,7 @@ class TartCog(commands.Cog):
     @app_commands.command(description="Endorse other World Assembly members in the region.")
     async def tart(self, interaction: discord.Interaction, nation: str):
         if not self.cache.firstCacheComplete():
-            await interaction.response.send_message(embed=getCacheIncompleteEmbed())
+            await interaction.response.send_message(embed=getCacheIncompleteEmbed(self.cache.rebuildProgress))
             return
         
         nationId = normalize(nation)
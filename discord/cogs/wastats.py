@@ -26,8 +26,7 @@ class WAStatsCog(commands.Cog):
         self.cache: CacheManager = self.bot.get_cog('CacheManager')
 
     def calculateStats(self) -> WaStats:
-        waNations = self.cache.regionWaNations()
-        waCount = len(waNations)
+        waCount = len(self.cache.regionWaNations())
 
         delEndos = 0
         delegateId = self.cache.region().delegate
@@ -35,10 +34,8 @@ class WAStatsCog(commands.Cog):
             delEndos = len(self.cache.nation(delegateId).endorsements)
 
         potentialEndos = waCount * (waCount - 1)
-        endosGiven = 0
-        for nationId in waNations:
-            endosGiven += len(self.cache.verifiedEndorsements(nationId))
-        
+        endosGiven = self.cache.regionEndorsementsGiven()
+
         return WaStats(timestamp=time.time(), waCount=waCount, 
                        delEndos=delEndos, potentialEndos=potentialEndos, 
                        endosGiven=endosGiven)
@@ -51,7 +48,7 @@ class WAStatsCog(commands.Cog):
     @app_commands.command(description="Display WA engagement rates for the region.")
     async def wastats(self, interaction: discord.Interaction):
         if not self.cache.firstCacheComplete():
-            await interaction.response.send_message(embed=getCacheIncompleteEmbed())
+            await interaction.response.send_message(embed=getCacheIncompleteEmbed(self.cache.rebuildProgress))
             return
         
         stats = self.calculateStats()
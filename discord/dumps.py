@@ -0,0 +1,175 @@
+import gzip, html, os, time, resource
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import IO, Iterator
+from classes import *
+from lib import normalize
+from storage import RegionMembership
+
+RESIDENCY_SCALE = "80"
+
+READ_SIZE = 1 << 20
+
+@dataclass
+class DumpStats:
+    parsed: int
+    matched: int
+    seconds: float
+    peakRss: int # in kilobytes
+    rssGrowth: int = 0 # resident memory added while parsing, in kilobytes
+
+    def rate(self) -> float:
+        if self.seconds == 0:
+            return 0
+        return self.parsed / self.seconds
+
+def peakRss() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def openDump(path: str) -> IO[bytes]:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+# Yields each <tag>...</tag> record in the stream as raw bytes
+def iterRecords(file: IO[bytes], tag: str) -> Iterator[bytes]:
+    openTag = f"<{tag}>".encode()
+    closeTag = f"</{tag}>".encode()
+    buffer = b""
+
+    while True:
+        chunk = file.read(READ_SIZE)
+        if not chunk:
+            return
+
+        buffer += chunk
+        position = 0
+        while True:
+            end = buffer.find(closeTag, position)
+            if end == -1:
+                break
+
+            end += len(closeTag)
+            start = buffer.find(openTag, position, end)
+            yield buffer[start:end]
+            position = end
+
+        buffer = buffer[position:]
+
+# Cheap lookup of a leaf field in a raw record, without parsing it
+def recordField(record: bytes, tag: bytes) -> str | None:
+    start = record.find(b"<" + tag + b">")
+    if start == -1:
+        return None
+    start += len(tag) + 2
+
+    end = record.find(b"</" + tag + b">", start)
+    return html.unescape(record[start:end].decode("utf-8"))
+
+def text(element: ET.Element, path: str) -> str | None:
+    child = element.find(path)
+    if child is None:
+        return None
+    return child.text
+
+def parseDumpNation(element: ET.Element, dumpTime: float) -> Nation:
+    name = text(element, "./NAME")
+    id = normalize(name)
+
+    waStatus = NON_WA
+    waStatusText = text(element, "./UNSTATUS")
+    if waStatusText == "WA Member":
+        waStatus = WA_MEMBER
+    elif waStatusText == "WA Delegate":
+        waStatus = WA_DELEGATE
+
+    endorsements = set()
+    endoList = text(element, "./ENDORSEMENTS")
+    if waStatus != NON_WA and endoList:
+        endorsements = set(endoList.split(","))
+
+    residency = 0.0
+    for scale in element.iterfind("./CENSUS/SCALE"):
+        if scale.attrib.get("id") == RESIDENCY_SCALE:
+            residency = float(text(scale, "./SCORE"))
+            break
+
+    lastLogin = int(text(element, "./LASTLOGIN") or 0)
+    foundedAt = int(text(element, "./FOUNDEDTIME") or text(element, "./FIRSTLOGIN") or 0)
+
+    # The dump doesn't say whether a nation accepts recruitment telegrams, a fetch will
+    return Nation(id, name, text(element, "./FLAG"), waStatus,
+                  normalize(text(element, "./REGION")), endorsements, residency,
+                  int(text(element, "./POPULATION") or 0), None, lastLogin, foundedAt,
+                  lastApiUpdateTime=dumpTime, lastResidencyUpdateTime=dumpTime)
+
+# Without dumpTime, the file's modification time is taken as when the dump was generated.
+# downloadDump sets it from Last-Modified, a dump fetched by hand should keep it (curl -R).
+def loadNationsDump(path: str, regionId: str, dumpTime: float | None = None) -> tuple[dict[str, Nation], DumpStats]:
+    if dumpTime is None:
+        dumpTime = os.path.getmtime(path)
+
+    start = time.perf_counter()
+    parsed = 0
+    nations = {}
+
+    with openDump(path) as file:
+        for record in iterRecords(file, "NATION"):
+            parsed += 1
+            if normalize(recordField(record, b"REGION") or "") != regionId:
+                continue
+
+            nation = parseDumpNation(ET.fromstring(record), dumpTime)
+            nations[nation.id] = nation
+
+    stats = DumpStats(parsed, len(nations), time.perf_counter() - start, peakRss())
+    return (nations, stats)
+
+@dataclass
+class RegionsDump:
+    # region -> resident nations
+    nations: RegionMembership
+    # normalized tag -> regions, empty if the dump carries no tags
+    tags: dict[str, set[str]]
+
+def rss() -> int:
+    with open("/proc/self/statm") as file:
+        return int(file.read().split()[1]) * resource.getpagesize() // 1024
+
+def recordTags(record: bytes) -> list[str]:
+    tags = []
+    position = record.find(b"<TAGS>")
+    if position == -1:
+        return tags
+
+    end = record.find(b"</TAGS>", position)
+    while True:
+        start = record.find(b"<TAG>", position, end)
+        if start == -1:
+            return tags
+        start += 5
+        position = record.find(b"</TAG>", start, end)
+        tags.append(normalize(html.unescape(record[start:position].decode("utf-8"))))
+
+def loadRegionsDump(path: str, nations: RegionMembership | None = None) -> tuple[RegionsDump, DumpStats]:
+    start = time.perf_counter()
+    rssBefore = rss()
+    parsed = 0
+    tags = {}
+
+    if nations is None:
+        nations = RegionMembership()
+
+    with openDump(path) as file:
+        for record in iterRecords(file, "REGION"):
+            parsed += 1
+            regionId = normalize(recordField(record, b"NAME"))
+
+            nationList = recordField(record, b"NATIONS")
+            nations.replace(regionId, nationList.split(":") if nationList else ())
+
+            for tag in recordTags(record):
+                tags.setdefault(tag, set()).add(regionId)
+
+    stats = DumpStats(parsed, len(nations), time.perf_counter() - start, peakRss(), rss() - rssBefore)
+    return (RegionsDump(nations, tags), stats)
@@ -0,0 +1,112 @@
+import contextvars, math, time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+SUBSYSTEM_REBUILD = "rebuild" # full cache rebuilds
+SUBSYSTEM_RESYNC = "resync" # region and WA membership re-syncs
+SUBSYSTEM_REFRESH = "refresh" # stale nation refreshes
+SUBSYSTEM_LOGIN = "login" # lastlogin refreshes for /inactive
+SUBSYSTEM_EVENTS = "events" # cache lookups triggered by happenings
+SUBSYSTEM_BACKFILL = "backfill" # happenings backfill after a dropped feed
+SUBSYSTEM_RECRUIT = "recruit" # recruitment checks on new and WA-admitted nations
+SUBSYSTEM_RMB = "rmb" # RMB feed polling
+SUBSYSTEM_FLAG = "flag" # flag refreshes for the RMB feed
+SUBSYSTEM_COMMAND = "command" # slash commands
+SUBSYSTEM_OTHER = "other"
+
+# Listeners run in the dispatching task's context, so anything that fetches sets its own
+currentSubsystem: contextvars.ContextVar[str] = contextvars.ContextVar("subsystem", default=SUBSYSTEM_OTHER)
+
+@contextmanager
+def accountTo(subsystem: str) -> Iterator[None]:
+    token = currentSubsystem.set(subsystem)
+    try:
+        yield
+    finally:
+        currentSubsystem.reset(token)
+
+# Nearest-rank percentile of an already sorted list
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+class LedgerEntry:
+    def __init__(self):
+        # (time, bytes, latency, status) of every attempt in the window, status 0 if none came back
+        self.samples: deque[tuple[float, int, float, int]] = deque()
+        self.requests = 0
+        self.bytes = 0
+        self.throttled = 0
+        self.failed = 0
+        # Calls answered by an identical request already in flight
+        self.shared = 0
+
+    def expire(self, cutoff: float) -> None:
+        while self.samples and self.samples[0][0] <= cutoff:
+            self.samples.popleft()
+
+    def summary(self) -> dict[str, Any]:
+        # Send to response, for attempts that got one
+        latencies = sorted(latency for (_, _, latency, status) in self.samples if status != 0)
+        return {
+            "requests": len(self.samples),
+            "bytes": sum(size for (_, size, _, _) in self.samples),
+            "throttled": sum(1 for (_, _, _, status) in self.samples if status == 429),
+            "failed": sum(1 for (_, _, _, status) in self.samples if status == 0 or status >= 500),
+            "p50": percentile(latencies, 0.5),
+            "p90": percentile(latencies, 0.9),
+            "p99": percentile(latencies, 0.99),
+            "total": {
+                "requests": self.requests,
+                "bytes": self.bytes,
+                "throttled": self.throttled,
+                "failed": self.failed,
+                "shared": self.shared,
+            },
+        }
+
+# Rolling counts over the last window seconds, plus lifetime totals, by (subsystem, endpoint)
+class BudgetLedger:
+    def __init__(self, window: float):
+        self.window = window
+        self.started = time.time()
+        self.entries: dict[tuple[str, str], LedgerEntry] = {}
+
+    def entry(self, endpoint: str) -> LedgerEntry:
+        key = (currentSubsystem.get(), endpoint)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = LedgerEntry()
+        return entry
+
+    def record(self, endpoint: str, size: int, latency: float, status: int) -> None:
+        now = time.monotonic()
+        entry = self.entry(endpoint)
+        entry.expire(now - self.window)
+        entry.samples.append((now, size, latency, status))
+
+        entry.requests += 1
+        entry.bytes += size
+        if status == 429:
+            entry.throttled += 1
+        elif status == 0 or status >= 500:
+            entry.failed += 1
+
+    def share(self, endpoint: str) -> None:
+        self.entry(endpoint).shared += 1
+
+    # One row per (subsystem, endpoint), busiest first
+    def rows(self) -> list[dict[str, Any]]:
+        cutoff = time.monotonic() - self.window
+        rows = []
+        for ((subsystem, endpoint), entry) in self.entries.items():
+            entry.expire(cutoff)
+            rows.append({"subsystem": subsystem, "endpoint": endpoint, **entry.summary()})
+
+        rows.sort(key=lambda row: (row["requests"], row["total"]["requests"]), reverse=True)
+        return rows
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"window": self.window, "since": self.started, "time": time.time(), "rows": self.rows()}
@@ -0,0 +1,118 @@
+import asyncio, heapq, itertools, logging, time
+from collections import deque
+from typing import Mapping
+
+logger = logging.getLogger("limiter")
+
+PRIORITY_INTERACTIVE = 0 # slash commands and user-facing feeds
+PRIORITY_RECRUITMENT = 1 # recruitment checks and other event-driven lookups
+PRIORITY_BACKGROUND = 2 # cache rebuilds and refreshes
+PRIORITY_IDLE = 3 # nice-to-have refreshes that only run on spare budget
+
+# Slots each lane leaves untouched for the lanes above it
+RESERVED_SLOTS = {
+    PRIORITY_INTERACTIVE: 0,
+    PRIORITY_RECRUITMENT: 2,
+    PRIORITY_BACKGROUND: 5,
+    PRIORITY_IDLE: 15,
+}
+
+def headerInt(headers: Mapping[str, str], key: str) -> int | None:
+    try:
+        return int(headers[key])
+    except (KeyError, ValueError):
+        return None
+
+# NationStates counts requests over a sliding window, a refilling bucket would let up to
+# twice the limit through in one window
+class RequestLimiter:
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.sent: deque[float] = deque()
+        self.blockedUntil = 0.0
+        self.waiters: list[tuple[int, int, asyncio.Future]] = []
+        self.order = itertools.count()
+        self.wakeup: asyncio.TimerHandle | None = None
+
+    def expire(self) -> None:
+        cutoff = time.monotonic() - self.window
+        while self.sent and self.sent[0] <= cutoff:
+            self.sent.popleft()
+
+    def free(self) -> int:
+        self.expire()
+        return self.limit - len(self.sent)
+
+    def available(self, priority: int) -> bool:
+        if time.monotonic() < self.blockedUntil:
+            return False
+        return self.free() >= 1 + RESERVED_SLOTS.get(priority, 0)
+
+    # How many requests the lane could send right now without waiting
+    def spare(self, priority: int) -> int:
+        if self.waiters or time.monotonic() < self.blockedUntil:
+            return 0
+        return max(0, self.free() - RESERVED_SLOTS.get(priority, 0))
+
+    def take(self) -> None:
+        self.sent.append(time.monotonic())
+
+    def release(self) -> None:
+        self.wakeup = None
+
+        while self.waiters:
+            priority, _, future = self.waiters[0]
+            if future.done():
+                # cancelled while waiting
+                heapq.heappop(self.waiters)
+                continue
+
+            if not self.available(priority):
+                break
+
+            heapq.heappop(self.waiters)
+            self.take()
+            future.set_result(None)
+
+        if self.waiters and self.wakeup is None:
+            priority = self.waiters[0][0]
+            now = time.monotonic()
+            missing = 1 + RESERVED_SLOTS.get(priority, 0) - self.free()
+            delay = 0.0
+            if missing > 0:
+                delay = self.sent[missing - 1] + self.window - now
+            delay = max(delay, self.blockedUntil - now, 0)
+            self.wakeup = asyncio.get_running_loop().call_later(delay, self.release)
+
+    async def acquire(self, priority: int) -> None:
+        if not self.waiters and self.available(priority):
+            self.take()
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.order), future))
+
+        # The new waiter might need fewer free slots than whoever the wakeup was scheduled for
+        if self.wakeup is not None:
+            self.wakeup.cancel()
+        self.release()
+
+        await future
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        remaining = headerInt(headers, "RateLimit-Remaining")
+        serverLimit = headerInt(headers, "RateLimit-Limit")
+        if remaining is not None and serverLimit is not None:
+            # Requests we don't know about, against the server's limit rather than ours
+            for _ in range(self.free() - max(0, remaining - (serverLimit - self.limit))):
+                self.take()
+
+        reset = headerInt(headers, "RateLimit-Reset")
+        if remaining == 0 and reset:
+            self.blockedUntil = max(self.blockedUntil, time.monotonic() + reset)
+
+        retryAfter = headerInt(headers, "Retry-After")
+        if retryAfter:
+            logger.warning(f"rate limit hit, holding all API requests for {retryAfter} seconds")
+            self.blockedUntil = max(self.blockedUntil, time.monotonic() + retryAfter)
@@ -1,4 +1,4 @@
-import discord, asyncio, sans, os, logging, sys
+import discord, asyncio, sans, os, logging, sys, signal
 from discord.ext import commands
 from redis_om import Migrator
 
@@ -31,6 +31,9 @@ class PolarisBot(commands.Bot):
         loop = asyncio.get_event_loop()
         loop.set_task_factory(asyncio.eager_task_factory)
 
+        # docker stop sends SIGTERM, close cleanly so cogs can persist their state
+        loop.add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(self.close()))
+
         await self.add_cog(APIClient(self))
         await self.add_cog(EventListener(self))
         await self.add_cog(CacheManager(self, self.region))
@@ -0,0 +1,76 @@
+import asyncio, logging, time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+from classes import *
+
+logger = logging.getLogger("rebuild")
+
+# Seconds between progress log lines
+REPORT_INTERVAL = 15
+
+@dataclass
+class RebuildProgress:
+    total: int
+    done: int = 0
+    failed: int = 0
+    startedAt: float = field(default_factory=time.time)
+
+    def finished(self) -> int:
+        return self.done + self.failed
+
+    def rate(self) -> float:
+        elapsed = time.time() - self.startedAt
+        if elapsed == 0:
+            return 0
+        return self.finished() / elapsed
+
+    # Estimated seconds until every nation has been fetched
+    def eta(self) -> float | None:
+        rate = self.rate()
+        if rate == 0:
+            return None
+        return (self.total - self.finished()) / rate
+
+# The delegate first, then officers, then everyone else by endorsements last time we saw them
+def importanceOrder(nationIds: set[str], region: Region, endorsementCount: Callable[[str], int]) -> list[str]:
+    def rank(nationId: str) -> tuple[int, int, str]:
+        if nationId == region.delegate:
+            tier = 0
+        elif nationId in region.officers:
+            tier = 1
+        else:
+            tier = 2
+        return (tier, -endorsementCount(nationId), nationId)
+
+    return sorted(nationIds, key=rank)
+
+# fetch returns whether the nation could be fetched
+async def fetchAll(nationIds: list[str], fetch: Callable[[str], Awaitable[bool]], concurrency: int,
+                   progress: RebuildProgress | None = None) -> RebuildProgress:
+    if progress is None:
+        progress = RebuildProgress(len(nationIds))
+
+    pending = iter(nationIds)
+    lastReport = time.time()
+
+    async def worker():
+        nonlocal lastReport
+
+        for nationId in pending:
+            try:
+                fetched = await fetch(nationId)
+            except Exception as e:
+                logger.exception(f"rebuild: fetching {nationId} crashed: {e}")
+                fetched = False
+
+            if fetched:
+                progress.done += 1
+            else:
+                progress.failed += 1
+
+            if time.time() - lastReport >= REPORT_INTERVAL:
+                lastReport = time.time()
+                logger.info(f"rebuild: {progress.finished()}/{progress.total} nations ({progress.rate():.1f}/s, {progress.eta():.0f}s left)")
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(nationIds))))))
+    return progress
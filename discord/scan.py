@@ -0,0 +1,140 @@
+# Relies on what API responses look like: no element is nested inside another of the same
+# name, and attribute values never contain '>'.
+
+import re
+import xml.etree.ElementTree as ET
+from typing import Iterator
+
+# (tag, attributes, content start, content end) of an element in the response bytes
+Element = tuple[str, bytes, int, int]
+
+ENTITIES = {"lt": "<", "gt": ">", "amp": "&", "quot": '"', "apos": "'"}
+ENTITY_PATTERN = re.compile(r"&(#x[0-9a-fA-F]+|#[0-9]+|[a-z]+);")
+
+def replaceEntity(match: re.Match) -> str:
+    name = match.group(1)
+    if name.startswith("#x"):
+        return chr(int(name[2:], 16))
+    if name.startswith("#"):
+        return chr(int(name[1:]))
+    if name not in ENTITIES:
+        raise ValueError(f"undefined entity &{name};")
+    return ENTITIES[name]
+
+# Replacing one entity at a time is only safe with &amp; last
+def unescape(text: str) -> str:
+    if "&" not in text:
+        return text
+
+    text = text.replace("&#039;", "'").replace("&#39;", "'")
+    if "&#" in text:
+        return ENTITY_PATTERN.sub(replaceEntity, text)
+
+    return text.replace("&lt;", "<").replace("&gt;", ">").replace("&quot;", '"').replace("&apos;", "'").replace("&amp;", "&")
+
+# Yields the elements directly inside data[start:end], in document order
+def iterElements(data: bytes, start: int = 0, end: int | None = None) -> Iterator[Element]:
+    if end is None:
+        end = len(data)
+
+    position = start
+    while True:
+        tagStart = data.find(b"<", position, end)
+        if tagStart == -1:
+            return
+
+        if data.startswith((b"<?", b"<!"), tagStart):
+            # Declaration or comment
+            position = data.index(b">", tagStart, end) + 1
+            continue
+
+        close = data.find(b">", tagStart, end)
+        if close == -1:
+            raise ValueError("unterminated tag")
+
+        selfClosing = data[close - 1] == ord("/")
+        header = data[tagStart + 1:close - 1 if selfClosing else close]
+        space = header.find(b" ")
+        (tag, attributes) = (header, b"") if space == -1 else (header[:space], header[space + 1:])
+
+        if selfClosing:
+            yield (tag.decode("ascii"), attributes, close + 1, close + 1)
+            position = close + 1
+            continue
+
+        closeTag = b"</" + tag + b">"
+        contentEnd = data.find(closeTag, close + 1, end)
+        if contentEnd == -1:
+            raise ValueError(f"unterminated <{tag.decode('ascii', 'replace')}>")
+
+        yield (tag.decode("ascii"), attributes, close + 1, contentEnd)
+        position = contentEnd + len(closeTag)
+
+def rootElement(data: bytes) -> Element:
+    for element in iterElements(data):
+        return element
+    raise ValueError("no root element")
+
+# The first element of each wanted tag directly inside parent, in one pass over it
+def childElements(data: bytes, parent: Element, wanted: set[str]) -> dict[str, Element]:
+    found = {}
+    for element in iterElements(data, parent[2], parent[3]):
+        if element[0] in wanted and element[0] not in found:
+            found[element[0]] = element
+            if len(found) == len(wanted):
+                break
+
+    return found
+
+# Like childElements, but every wanted tag has to be there
+def requireChildren(data: bytes, parent: Element, wanted: set[str]) -> dict[str, Element]:
+    found = childElements(data, parent, wanted)
+    if len(found) < len(wanted):
+        missing = ", ".join(sorted(wanted - found.keys()))
+        raise ValueError(f"<{parent[0]}> has no {missing}")
+    return found
+
+# The first <tag> anywhere inside parent, only for tags never nested deeper in it
+def leafElement(data: bytes, parent: Element, tag: str) -> Element | None:
+    name = tag.encode("ascii")
+    openTag = b"<" + name + b">"
+    start = data.find(openTag, parent[2], parent[3])
+    if start == -1:
+        start = data.find(b"<" + name + b"/>", parent[2], parent[3])
+        if start == -1:
+            return None
+        return (tag, b"", start, start)
+
+    start += len(openTag)
+    end = data.find(b"</" + name + b">", start, parent[3])
+    if end == -1:
+        raise ValueError(f"unterminated <{tag}>")
+    return (tag, b"", start, end)
+
+def requireLeaves(data: bytes, parent: Element, tags: set[str]) -> dict[str, Element]:
+    found = {}
+    for tag in tags:
+        element = leafElement(data, parent, tag)
+        if element is None:
+            raise ValueError(f"<{parent[0]}> has no {tag}")
+        found[tag] = element
+
+    return found
+
+# The element's text with entities resolved, "" if it's empty
+def elementText(data: bytes, element: Element, encoding: str = "utf-8") -> str:
+    text = str(memoryview(data)[element[2]:element[3]], encoding)
+    if "<" in text:
+        return "".join(ET.fromstring(f"<text>{text}</text>").itertext())
+
+    return unescape(text)
+
+def attribute(element: Element, name: str) -> str | None:
+    attributes = b" " + element[1]
+    key = b" " + name.encode("ascii") + b'="'
+    start = attributes.find(key)
+    if start == -1:
+        return None
+
+    start += len(key)
+    return unescape(attributes[start:attributes.index(b'"', start)].decode("utf-8"))
@@ -0,0 +1,131 @@
+import json, zlib, dataclasses
+from classes import *
+from storage import RegionMembership
+
+SNAPSHOT_VERSION = 2
+
+NATION_FIELDS = [field.name for field in dataclasses.fields(Nation)]
+
+class SnapshotError(Exception):
+    def __init__(self, message) -> None:
+        self.message = message
+        super().__init__(self.message)
+
+@dataclass
+class CacheSnapshot:
+    createdAt: float
+    lastRebuildEnd: float
+    lastEventId: int | None
+    lastEventTime: float | None
+    waNations: set[str]
+    puppetRegions: set[str]
+    jumpPointRegions: set[str]
+    mainRegion: Region
+    nations: dict[str, Nation]
+    regionalNations: RegionMembership
+    # main region resident -> when its residency began
+    residentSince: dict[str, float]
+
+def encodeAuthority(authority: Authority) -> str:
+    flags = [
+        (authority.successor, "S"),
+        (authority.appearance, "A"),
+        (authority.borderControl, "B"),
+        (authority.communications, "C"),
+        (authority.embassies, "E"),
+        (authority.polls, "P"),
+    ]
+    return "".join([letter for (enabled, letter) in flags if enabled])
+
+def encodeNation(nation: Nation) -> list:
+    row = []
+    for field in NATION_FIELDS:
+        value = getattr(nation, field)
+        if field == "endorsements":
+            value = sorted(value)
+        row.append(value)
+    return row
+
+def decodeNation(fields: list[str], row: list) -> Nation:
+    values = dict(zip(fields, row))
+    values["endorsements"] = set(values["endorsements"])
+    return Nation(**values)
+
+def encodeRegion(region: Region) -> dict:
+    return {
+        "id": region.id,
+        "name": region.name,
+        "nations": sorted(region.nations),
+        "delegate": region.delegate,
+        "officers": [
+            [officer.nationId, officer.officeName, encodeAuthority(officer.authority)]
+            for officer in region.officers.values()
+        ],
+        "recruiters": sorted(region.recruiters),
+        "lastApiUpdateTime": region.lastApiUpdateTime,
+    }
+
+def decodeRegion(data: dict) -> Region:
+    officers = {}
+    for (nationId, officeName, authority) in data["officers"]:
+        officers[nationId] = RegionalOfficer(nationId, officeName, Authority.parse(authority))
+
+    return Region(data["id"], data["name"], set(data["nations"]), data["delegate"],
+                  officers, set(data["recruiters"]), data["lastApiUpdateTime"])
+
+def dumpSnapshot(snapshot: CacheSnapshot) -> bytes:
+    data = {
+        "version": SNAPSHOT_VERSION,
+        "createdAt": snapshot.createdAt,
+        "lastRebuildEnd": snapshot.lastRebuildEnd,
+        "lastEventId": snapshot.lastEventId,
+        "lastEventTime": snapshot.lastEventTime,
+        "waNations": sorted(snapshot.waNations),
+        "puppetRegions": sorted(snapshot.puppetRegions),
+        "jumpPointRegions": sorted(snapshot.jumpPointRegions),
+        "mainRegion": encodeRegion(snapshot.mainRegion),
+        "nationFields": NATION_FIELDS,
+        "nations": [encodeNation(nation) for nation in snapshot.nations.values()],
+        # Resident name hashes; the main region's residents are stored with the region itself
+        "regionalNations": dict(snapshot.regionalNations.items()),
+        "residentSince": snapshot.residentSince,
+    }
+
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+def loadSnapshot(blob: bytes, regionalNations: RegionMembership | None = None) -> CacheSnapshot:
+    try:
+        data = json.loads(zlib.decompress(blob))
+    except (zlib.error, ValueError) as e:
+        raise SnapshotError(f"snapshot is corrupted: {e}")
+
+    if data.get("version") != SNAPSHOT_VERSION:
+        raise SnapshotError(f"snapshot version {data.get("version")} is not supported (expected {SNAPSHOT_VERSION})")
+
+    mainRegion = decodeRegion(data["mainRegion"])
+
+    nations = {}
+    for row in data["nations"]:
+        nation = decodeNation(data["nationFields"], row)
+        nations[nation.id] = nation
+
+    if regionalNations is None:
+        regionalNations = RegionMembership()
+    for (regionId, members) in data["regionalNations"].items():
+        regionalNations.replaceHashes(regionId, members)
+    regionalNations.pin(mainRegion.id, mainRegion.nations)
+
+    return CacheSnapshot(
+        createdAt=data["createdAt"],
+        lastRebuildEnd=data["lastRebuildEnd"],
+        lastEventId=data["lastEventId"],
+        lastEventTime=data["lastEventTime"],
+        waNations=set(data["waNations"]),
+        puppetRegions=set(data["puppetRegions"]),
+        jumpPointRegions=set(data["jumpPointRegions"]),
+        mainRegion=mainRegion,
+        nations=nations,
+        regionalNations=regionalNations,
+        # Older snapshots don't have it, the next re-sync fetches it
+        residentSince=data.get("residentSince", {}),
+    )
@@ -0,0 +1,374 @@
+# Usage (from the discord/ directory): python -m standin [fixture.json] [--port 8080], then
+# start the bot with POLARIS_API_URL=http://127.0.0.1:8080. POST a happening's text to
+# /standin/happenings to publish it, POST to /standin/outage?seconds=60 for a run of 503s.
+
+import argparse, asyncio, email.utils, gzip, json, random, time
+from collections import deque
+from dataclasses import dataclass, field
+from xml.sax.saxutils import escape
+from aiohttp import web
+from lib import normalize
+
+CENSUS_RANKS_PAGE = 20
+
+@dataclass
+class StandInNation:
+    id: str
+    name: str
+    region: str
+    waStatus: str = "Non-member" # or "WA Member", "WA Delegate"
+    endorsements: list[str] = field(default_factory=list)
+    flag: str = "https://www.nationstates.net/images/flags/Default.svg"
+    lastLogin: int = 0
+    foundedAt: int = 0
+    population: int = 5
+    canRecruit: bool = True
+    residency: float = 0.0 # days, census scale 80
+
+@dataclass
+class StandInRegion:
+    id: str
+    name: str
+    delegate: str | None = None
+    # [{"nation": ..., "office": ..., "authority": "XABCEP"}]
+    officers: list[dict[str, str]] = field(default_factory=list)
+    recruiters: list[str] = field(default_factory=list)
+    tags: list[str] = field(default_factory=list)
+    # [{"id": ..., "timestamp": ..., "nation": ..., "status": 0, "message": ...}]
+    messages: list[dict] = field(default_factory=list)
+    nations: list[str] = field(default_factory=list)
+
+@dataclass
+class StandInHappening:
+    id: int
+    timestamp: int
+    text: str
+
+class StandInWorld:
+    def __init__(self, nations: list[StandInNation], regions: list[StandInRegion], happenings: list[StandInHappening]):
+        self.nations = {nation.id: nation for nation in nations}
+        self.regions = {region.id: region for region in regions}
+        self.happenings = sorted(happenings, key=lambda happening: happening.id)
+
+        for nation in nations:
+            if nation.region not in self.regions:
+                self.regions[nation.region] = StandInRegion(nation.region, nation.region.replace("_", " ").title())
+            self.regions[nation.region].nations.append(nation.id)
+
+    def waMembers(self) -> list[str]:
+        return [nation.id for nation in self.nations.values() if nation.waStatus != "Non-member"]
+
+    def nextHappeningId(self) -> int:
+        return self.happenings[-1].id + 1 if self.happenings else 1
+
+    # {"nations": [...], "regions": [...], "happenings": [...]}, with the fields of the
+    # dataclasses above; ids are derived from names when left out
+    def load(path: str) -> "StandInWorld":
+        with open(path) as file:
+            data = json.load(file)
+
+        nations = [StandInNation(**{"id": normalize(entry["name"]), **entry}) for entry in data.get("nations", [])]
+        for nation in nations:
+            nation.region = normalize(nation.region)
+        regions = [StandInRegion(**{"id": normalize(entry["name"]), **entry}) for entry in data.get("regions", [])]
+        happenings = [StandInHappening(**entry) for entry in data.get("happenings", [])]
+        return StandInWorld(nations, regions, happenings)
+
+    # count WA nations in region endorsing a random share of each other, like bench data
+    def synthetic(count: int, region: str = "bench_region", seed: int = 1) -> "StandInWorld":
+        rng = random.Random(seed)
+        nationIds = [f"nation_{i}" for i in range(count)]
+
+        nations = []
+        for (number, nationId) in enumerate(nationIds):
+            nations.append(StandInNation(
+                nationId, nationId.replace("_", " ").title(), region, "WA Member",
+                rng.sample(nationIds, min(len(nationIds), rng.randrange(40))),
+                lastLogin=1700000000 + number, foundedAt=1500000000 + number,
+                population=number % 3000 + 5, residency=float(number % 900)))
+
+        delegate = nationIds[7] if count > 7 else None
+        regions = [StandInRegion(region, region.replace("_", " ").title(), delegate)]
+        return StandInWorld(nations, regions, [])
+
+def element(tag: str, text: object) -> str:
+    return f"<{tag}>{escape(str(text))}</{tag}>"
+
+class StandInServer:
+    def __init__(self, world: StandInWorld, latency: float = 0.2, limit: int = 50, window: float = 30, port: int = 0):
+        self.world = world
+        self.latency = latency
+        self.limit = limit
+        self.window = window
+
+        self.requests: deque[float] = deque()
+        self.served = 0
+        self.rejected = 0
+        self.bytesServed = 0
+        self.inFlight = 0
+        self.maxInFlight = 0
+        self.outageUntil = 0.0
+        self.subscribers: set[asyncio.Queue] = set()
+        self.runner: web.AppRunner | None = None
+        self.port = port
+
+    @property
+    def nationIds(self) -> list[str]:
+        return list(self.world.nations)
+
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def rateLimitHeaders(self, now: float) -> dict[str, str]:
+        while self.requests and self.requests[0] <= now - self.window:
+            self.requests.popleft()
+
+        reset = self.window - (now - self.requests[0]) if self.requests else self.window
+        return {
+            "RateLimit-Policy": f"{self.limit};w={int(self.window)}",
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(max(0, self.limit - len(self.requests))),
+            "RateLimit-Reset": str(max(1, round(reset))),
+        }
+
+    def nationXml(self, nationId: str, shards: list[str], scale: str = "80") -> str:
+        nation = self.world.nations[nationId]
+        elements = {
+            "name": element("NAME", nation.name),
+            "flag": element("FLAG", nation.flag),
+            "wa": element("UNSTATUS", nation.waStatus),
+            "region": element("REGION", self.world.regions[nation.region].name),
+            "endorsements": element("ENDORSEMENTS", ",".join(nation.endorsements)),
+            "lastlogin": element("LASTLOGIN", nation.lastLogin),
+            "census": f'<CENSUS><SCALE id="{scale}">{element("SCORE", f"{nation.residency:.2f}")}</SCALE></CENSUS>',
+            "population": element("POPULATION", nation.population),
+            "tgcanrecruit": element("TGCANRECRUIT", int(nation.canRecruit)),
+            "foundedtime": element("FOUNDEDTIME", nation.foundedAt),
+        }
+        return f'<NATION id="{nationId}">{"".join(elements[shard] for shard in shards if shard in elements)}</NATION>'
+
+    def censusRanksXml(self, region: StandInRegion, scale: str, start: int) -> str:
+        ranked = sorted(region.nations, key=lambda nationId: -self.world.nations[nationId].residency)
+        page = []
+        for (rank, nationId) in enumerate(ranked[start - 1:start - 1 + CENSUS_RANKS_PAGE], start):
+            page.append(f"<NATION>{element("NAME", nationId)}{element("RANK", rank)}"
+                        f"{element("SCORE", f"{self.world.nations[nationId].residency:.2f}")}</NATION>")
+        return f'<CENSUSRANKS id="{scale}"><NATIONS>{"".join(page)}</NATIONS></CENSUSRANKS>'
+
+    def messagesXml(self, region: StandInRegion, limit: int, fromId: int) -> str:
+        posts = [post for post in region.messages if post["id"] >= fromId][-limit:] if fromId else region.messages[-limit:]
+        xml = []
+        for post in posts:
+            fields = [element("TIMESTAMP", post["timestamp"]), element("NATION", post["nation"]),
+                      element("STATUS", post.get("status", 0))]
+            if "message" in post:
+                fields.append(element("MESSAGE", post["message"]))
+            if "suppressor" in post:
+                fields.append(element("SUPPRESSOR", post["suppressor"]))
+            xml.append(f'<POST id="{post["id"]}">{"".join(fields)}</POST>')
+        return f"<MESSAGES>{"".join(xml)}</MESSAGES>"
+
+    def regionXml(self, regionId: str, shards: list[str], query) -> str:
+        region = self.world.regions[regionId]
+        elements = []
+        for shard in shards:
+            if shard == "name":
+                elements.append(element("NAME", region.name))
+            elif shard == "nations":
+                elements.append(element("NATIONS", ":".join(region.nations)))
+            elif shard == "delegate":
+                elements.append(element("DELEGATE", region.delegate or "0"))
+            elif shard == "officers":
+                officers = "".join(f"<OFFICER>{element("NATION", officer["nation"])}{element("OFFICE", officer["office"])}"
+                                   f"{element("AUTHORITY", officer["authority"])}</OFFICER>" for officer in region.officers)
+                elements.append(f"<OFFICERS>{officers}</OFFICERS>")
+            elif shard == "recruiters":
+                elements.append(element("RECRUITERS", ",".join(region.recruiters)))
+            elif shard == "tags":
+                elements.append(f"<TAGS>{"".join(element("TAG", tag) for tag in region.tags)}</TAGS>")
+            elif shard == "censusranks":
+                elements.append(self.censusRanksXml(region, query.get("scale", "80"), int(query.get("start", "1"))))
+            elif shard == "messages":
+                elements.append(self.messagesXml(region, int(query.get("limit", "10")), int(query.get("fromid", "0"))))
+        return f'<REGION id="{regionId}">{"".join(elements)}</REGION>'
+
+    def worldXml(self, shards: list[str], query) -> str:
+        elements = []
+        for shard in shards:
+            if shard == "regionsbytag":
+                tags = set(query.get("tags", "").replace(" ", "+").split("+"))
+                regions = [region.name for region in self.world.regions.values()
+                           if tags <= {normalize(tag) for tag in region.tags}]
+                elements.append(element("REGIONS", ",".join(regions)))
+            elif shard == "happenings":
+                sinceId = int(query.get("sinceid", "0"))
+                beforeId = int(query.get("beforeid", str(self.world.nextHappeningId())))
+                limit = int(query.get("limit", "100"))
+                matching = [happening for happening in reversed(self.world.happenings) if sinceId < happening.id < beforeId]
+                events = "".join(f'<EVENT id="{happening.id}">{element("TIMESTAMP", happening.timestamp)}'
+                                 f'{element("TEXT", happening.text)}</EVENT>' for happening in matching[:limit])
+                elements.append(f"<HAPPENINGS>{events}</HAPPENINGS>")
+        return f"<WORLD>{"".join(elements)}</WORLD>"
+
+    def answer(self, query) -> tuple[int, str]:
+        shards = query.get("q", "").replace(" ", "+").split("+")
+
+        if "nation" in query:
+            nationId = normalize(query["nation"])
+            if nationId not in self.world.nations:
+                return (404, "Unknown nation")
+            return (200, self.nationXml(nationId, shards, query.get("scale", "80")))
+        elif "region" in query:
+            regionId = normalize(query["region"])
+            if regionId not in self.world.regions:
+                return (404, "Unknown region")
+            return (200, self.regionXml(regionId, shards, query))
+        elif "wa" in query:
+            return (200, f'<WA council="{query["wa"]}">{element("MEMBERS", ",".join(self.world.waMembers()))}</WA>')
+        elif query.get("a", "").lower() == "sendtg":
+            return (200, "queued\n")
+        return (200, self.worldXml(shards, query))
+
+    async def handle(self, request: web.Request) -> web.Response:
+        now = time.monotonic()
+        headers = self.rateLimitHeaders(now)
+        if len(self.requests) >= self.limit:
+            self.rejected += 1
+            headers["Retry-After"] = headers["RateLimit-Reset"]
+            return web.Response(status=429, text="Too Many Requests", headers=headers)
+
+        self.requests.append(now)
+        headers["RateLimit-Remaining"] = str(self.limit - len(self.requests))
+
+        self.inFlight += 1
+        self.maxInFlight = max(self.maxInFlight, self.inFlight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.inFlight -= 1
+
+        if time.monotonic() < self.outageUntil:
+            return web.Response(status=503, text="Service Unavailable", headers=headers)
+
+        (status, body) = self.answer(request.query)
+        if status == 200:
+            self.served += 1
+            self.bytesServed += len(body)
+        return web.Response(status=status, text=body, content_type="text/xml", headers=headers)
+
+    def publish(self, text: str, timestamp: int | None = None) -> StandInHappening:
+        happening = StandInHappening(self.world.nextHappeningId(), timestamp or int(time.time()), text)
+        self.world.happenings.append(happening)
+        for queue in self.subscribers:
+            queue.put_nowait(happening)
+        return happening
+
+    def sseEvent(self, happening: StandInHappening) -> bytes:
+        data = json.dumps({"id": str(happening.id), "time": happening.timestamp, "str": happening.text, "htmlStr": happening.text})
+        return f"id: {happening.id}\ndata: {data}\n\n".encode()
+
+    # Every bucket gets every happening, the bot subscribes to all the ones it handles anyway
+    async def handleEvents(self, request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+
+        queue = asyncio.Queue()
+        lastEventId = int(request.headers.get("Last-Event-ID", "0") or 0)
+        if lastEventId:
+            for happening in self.world.happenings:
+                if happening.id > lastEventId:
+                    queue.put_nowait(happening)
+
+        self.subscribers.add(queue)
+        try:
+            while True:
+                try:
+                    happening = await asyncio.wait_for(queue.get(), 15)
+                    if happening is None:
+                        break
+                    await response.write(self.sseEvent(happening))
+                except TimeoutError:
+                    # Keeps the connection from idling out
+                    await response.write(b": heartbeat\n\n")
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            self.subscribers.discard(queue)
+
+        return response
+
+    async def handlePublish(self, request: web.Request) -> web.Response:
+        happening = self.publish((await request.text()).strip())
+        return web.Response(text=f"{happening.id}\n")
+
+    async def handleOutage(self, request: web.Request) -> web.Response:
+        self.outageUntil = time.monotonic() + float(request.query.get("seconds", "60"))
+        return web.Response(text="ok\n")
+
+    def nationsDump(self) -> bytes:
+        records = []
+        for nation in self.world.nations.values():
+            records.append(
+                f"<NATION>{element("NAME", nation.name)}{element("UNSTATUS", nation.waStatus)}"
+                f"{element("ENDORSEMENTS", ",".join(nation.endorsements))}"
+                f"{element("REGION", self.world.regions[nation.region].name)}{element("FLAG", nation.flag)}"
+                f"{element("POPULATION", nation.population)}{element("LASTLOGIN", nation.lastLogin)}"
+                f"{element("FOUNDEDTIME", nation.foundedAt)}"
+                f'<CENSUS><SCALE id="80">{element("SCORE", f"{nation.residency:.2f}")}</SCALE></CENSUS></NATION>')
+        return gzip.compress(f"<NATIONS>{"".join(records)}</NATIONS>".encode())
+
+    def regionsDump(self) -> bytes:
+        records = []
+        for region in self.world.regions.values():
+            records.append(
+                f"<REGION>{element("NAME", region.name)}{element("NATIONS", ":".join(region.nations))}"
+                f"<TAGS>{"".join(element("TAG", tag) for tag in region.tags)}</TAGS></REGION>")
+        return gzip.compress(f"<REGIONS>{"".join(records)}</REGIONS>".encode())
+
+    async def handleDump(self, dump, headers: dict[str, str]) -> web.Response:
+        if time.monotonic() < self.outageUntil:
+            return web.Response(status=503, text="Service Unavailable")
+        return web.Response(body=dump(), headers=headers)
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/cgi-bin/api.cgi", self.handle)
+        app.router.add_get("/api/{buckets}", self.handleEvents)
+        # Dumps are "generated" when the server starts
+        dumpHeaders = {"Last-Modified": email.utils.formatdate(time.time(), usegmt=True)}
+        app.router.add_get("/pages/nations.xml.gz", lambda _: self.handleDump(self.nationsDump, dumpHeaders))
+        app.router.add_get("/pages/regions.xml.gz", lambda _: self.handleDump(self.regionsDump, dumpHeaders))
+        app.router.add_post("/standin/happenings", self.handlePublish)
+        app.router.add_post("/standin/outage", self.handleOutage)
+
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        # Open streams would hold up the shutdown until their next heartbeat
+        for queue in self.subscribers:
+            queue.put_nowait(None)
+        await self.runner.cleanup()
+
+async def serve(world: StandInWorld, port: int, latency: float) -> None:
+    server = StandInServer(world, latency=latency, port=port)
+    await server.start()
+    print(f"Serving {len(world.nations)} nations in {len(world.regions)} regions at {server.url()}")
+    await asyncio.Event().wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the NationStates API")
+    parser.add_argument("fixture", nargs="?", help="fixture JSON file, a synthetic region if left out")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--nations", type=int, default=200, help="size of the synthetic region")
+    args = parser.parse_args()
+
+    world = StandInWorld.load(args.fixture) if args.fixture else StandInWorld.synthetic(args.nations)
+    asyncio.run(serve(world, args.port, args.latency))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,471 @@
+import sys, hashlib, time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from collections.abc import MutableSet, Set
+from operator import itemgetter
+from typing import Any, Callable, Iterable, Iterator
+from classes import Nation
+
+# Stable across restarts (unlike hash()), so snapshots can store the hashes directly
+def nationHash(nationId: str) -> int:
+    return int.from_bytes(hashlib.blake2b(nationId.encode("utf-8"), digest_size=8).digest(), "little")
+
+# Most regions hold one nation, so those keep a bare int instead of an array
+Members = int | array
+
+def memberCount(members: Members) -> int:
+    return 1 if isinstance(members, int) else len(members)
+
+def memberHashes(members: Members) -> Iterable[int]:
+    return (members,) if isinstance(members, int) else members
+
+def hasMember(members: Members, hash: int) -> bool:
+    if isinstance(members, int):
+        return members == hash
+
+    index = bisect_left(members, hash)
+    return index < len(members) and members[index] == hash
+
+def packMembers(hashes: Iterable[int]) -> Members | None:
+    hashes = sorted(set(hashes))
+    if not hashes:
+        return None
+    if len(hashes) == 1:
+        return hashes[0]
+    return array("Q", hashes)
+
+# Ids are never reused: build a new table and re-pack everything using it to reclaim space
+class NationIds:
+    def __init__(self):
+        self.ids: dict[str, int] = {}
+        self.names: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def lookup(self, name: str) -> int | None:
+        return self.ids.get(name)
+
+    def id(self, name: str) -> int:
+        id = self.ids.get(name)
+        if id is None:
+            id = len(self.names)
+            self.ids[name] = id
+            self.names.append(name)
+        return id
+
+# Behaves like set[str], stored as a sorted array of ids from a shared NationIds table
+class EndorsementSet(MutableSet):
+    __slots__ = ("table", "members")
+
+    def __init__(self, table: NationIds, names: Iterable[str] = ()):
+        self.table = table
+        self.members = array("I", sorted({table.id(name) for name in names}))
+
+    def _from_iterable(self, names: Iterable[str]) -> set[str]:
+        return set(names)
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __iter__(self) -> Iterator[str]:
+        names = self.table.names
+        return (names[id] for id in self.members)
+
+    def __contains__(self, name: str) -> bool:
+        id = self.table.lookup(name)
+        if id is None:
+            return False
+
+        index = bisect_left(self.members, id)
+        return index < len(self.members) and self.members[index] == id
+
+    def __and__(self, other: Iterable[str]) -> set[str]:
+        if isinstance(other, Set) and len(other) < len(self):
+            return {name for name in other if name in self}
+        return {name for name in self if name in other}
+
+    __rand__ = __and__
+
+    def add(self, name: str) -> None:
+        id = self.table.id(name)
+        index = bisect_left(self.members, id)
+        if index == len(self.members) or self.members[index] != id:
+            self.members.insert(index, id)
+
+    def discard(self, name: str) -> None:
+        id = self.table.lookup(name)
+        if id is None:
+            return
+
+        index = bisect_left(self.members, id)
+        if index < len(self.members) and self.members[index] == id:
+            del self.members[index]
+
+    def __repr__(self) -> str:
+        return f"EndorsementSet({set(self)!r})"
+
+# Residents are 64-bit name hashes. Pinned regions keep a plain set that other code shares.
+class RegionMembership:
+    def __init__(self, capBytes: int = 0, neededRegions: Callable[[], set[str]] | None = None):
+        self.capBytes = capBytes
+        self.neededRegions = neededRegions
+        self.regions: OrderedDict[str, Members] = OrderedDict()
+        self.pinned: dict[str, set[str]] = {}
+        self.entryBytes = 0
+        self.residentCount = 0
+        self.evicted = 0
+
+    def __contains__(self, regionId: str) -> bool:
+        return regionId in self.pinned or regionId in self.regions
+
+    def __len__(self) -> int:
+        return len(self.pinned) + len(self.regions)
+
+    def pin(self, regionId: str, members: set[str]) -> None:
+        self.drop(regionId)
+        self.pinned[regionId] = members
+
+    def contains(self, regionId: str, nationId: str) -> bool:
+        pinned = self.pinned.get(regionId)
+        if pinned is not None:
+            return nationId in pinned
+
+        members = self.regions.get(regionId)
+        if members is None:
+            return False
+
+        return hasMember(members, nationHash(nationId))
+
+    def store(self, regionId: str, members: Members | None) -> None:
+        previous = self.regions.pop(regionId, None)
+        if previous is not None:
+            self.entryBytes -= sys.getsizeof(regionId) + sys.getsizeof(previous)
+            self.residentCount -= memberCount(previous)
+
+        if members is None:
+            return
+
+        self.regions[regionId] = members
+        self.entryBytes += sys.getsizeof(regionId) + sys.getsizeof(members)
+        self.residentCount += memberCount(members)
+
+    # Doesn't enforce the cap, so dumps can be loaded off the event loop
+    def replace(self, regionId: str, nationIds: Iterable[str]) -> None:
+        if regionId in self.pinned:
+            self.pinned[regionId].clear()
+            self.pinned[regionId].update(nationIds)
+            return
+
+        self.store(regionId, packMembers(nationHash(nationId) for nationId in nationIds))
+
+    # Same as replace, with hashes from items()
+    def replaceHashes(self, regionId: str, hashes: Iterable[int]) -> None:
+        self.store(regionId, packMembers(hashes))
+
+    def add(self, regionId: str, nationId: str) -> None:
+        pinned = self.pinned.get(regionId)
+        if pinned is not None:
+            pinned.add(nationId)
+            return
+
+        hash = nationHash(nationId)
+        members = self.regions.get(regionId)
+        if members is None or isinstance(members, int):
+            if members != hash:
+                self.store(regionId, packMembers([hash] if members is None else [members, hash]))
+                self.enforceCap()
+            else:
+                self.regions.move_to_end(regionId)
+            return
+
+        index = bisect_left(members, hash)
+        if index < len(members) and members[index] == hash:
+            self.regions.move_to_end(regionId)
+            return
+
+        before = sys.getsizeof(members)
+        members.insert(index, hash)
+        self.entryBytes += sys.getsizeof(members) - before
+        self.residentCount += 1
+        self.regions.move_to_end(regionId)
+
+        self.enforceCap()
+
+    def discard(self, regionId: str, nationId: str) -> None:
+        pinned = self.pinned.get(regionId)
+        if pinned is not None:
+            pinned.discard(nationId)
+            return
+
+        members = self.regions.get(regionId)
+        hash = nationHash(nationId)
+        if members is None or not hasMember(members, hash):
+            return
+
+        if memberCount(members) <= 2:
+            self.store(regionId, packMembers(other for other in memberHashes(members) if other != hash))
+            return
+
+        before = sys.getsizeof(members)
+        del members[bisect_left(members, hash)]
+        self.entryBytes += sys.getsizeof(members) - before
+        self.residentCount -= 1
+        self.regions.move_to_end(regionId)
+
+    def drop(self, regionId: str) -> None:
+        self.pinned.pop(regionId, None)
+        self.store(regionId, None)
+
+    # Every region except the pinned ones, with resident hashes, for snapshots
+    def items(self) -> Iterator[tuple[str, list[int]]]:
+        for (regionId, members) in self.regions.items():
+            yield (regionId, list(memberHashes(members)))
+
+    def residents(self) -> int:
+        return self.residentCount + sum(len(members) for members in self.pinned.values())
+
+    # Approximate bytes held, not counting pinned sets, which belong to someone else
+    def footprint(self) -> int:
+        return self.entryBytes + sys.getsizeof(self.regions) + sys.getsizeof(self.pinned)
+
+    def enforceCap(self) -> None:
+        if not self.capBytes or self.footprint() <= self.capBytes:
+            return
+
+        needed = self.neededRegions() if self.neededRegions else set()
+
+        # Leave some room so this doesn't run again on the very next add
+        target = self.capBytes * 0.9
+        for _ in range(len(self.regions)):
+            if self.footprint() <= target:
+                break
+
+            regionId = next(iter(self.regions))
+            if regionId in needed:
+                self.regions.move_to_end(regionId)
+                continue
+
+            self.drop(regionId)
+            self.evicted += 1
+
+# Nations pinned() rejects live in an LRU and expire after maxAge seconds
+class NationStore:
+    def __init__(self, pinned: Callable[[Nation], bool], maxTransient: int, maxAge: float,
+                 onEvict: Callable[[Nation], None] | None = None, clock: Callable[[], float] = time.time):
+        self.pinned = pinned
+        self.maxTransient = maxTransient
+        self.maxAge = maxAge
+        self.onEvict = onEvict
+        self.clock = clock
+        self.resident: dict[str, Nation] = {}
+        self.transient: OrderedDict[str, Nation] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self.resident) + len(self.transient)
+
+    def __contains__(self, id: str) -> bool:
+        return self.get(id) is not None
+
+    def values(self) -> Iterator[Nation]:
+        yield from self.resident.values()
+        yield from self.transient.values()
+
+    def isExpired(self, nation: Nation) -> bool:
+        return self.clock() - nation.lastApiUpdateTime > self.maxAge
+
+    def get(self, id: str) -> Nation | None:
+        nation = self.resident.get(id)
+        if nation is not None:
+            return nation
+
+        nation = self.transient.get(id)
+        if nation is None:
+            return None
+
+        if self.isExpired(nation):
+            self.evict(id)
+            self.expired += 1
+            return None
+
+        return nation
+
+    # Like get, but counts hits and misses and marks the nation as recently used
+    def lookup(self, id: str) -> Nation | None:
+        nation = self.get(id)
+        if nation is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        if id in self.transient:
+            self.transient.move_to_end(id)
+        return nation
+
+    def put(self, nation: Nation) -> None:
+        self.resident.pop(nation.id, None)
+        self.transient.pop(nation.id, None)
+
+        if self.pinned(nation):
+            self.resident[nation.id] = nation
+            return
+
+        self.transient[nation.id] = nation
+        self.trim()
+
+    def pop(self, id: str) -> Nation | None:
+        nation = self.resident.pop(id, None)
+        return nation if nation is not None else self.transient.pop(id, None)
+
+    # Moves a nation to the right tier after whatever pinned() looks at changed
+    def settle(self, id: str) -> None:
+        nation = self.resident.get(id) or self.transient.get(id)
+        if nation is not None and self.pinned(nation) != (id in self.resident):
+            self.put(nation)
+
+    def settleAll(self) -> None:
+        for nation in list(self.values()):
+            self.settle(nation.id)
+
+    def evict(self, id: str) -> None:
+        nation = self.transient.pop(id)
+        if self.onEvict:
+            self.onEvict(nation)
+
+    # Drops expired nations from the cold end, then whatever is over the size limit
+    def trim(self) -> None:
+        while self.transient:
+            id, nation = next(iter(self.transient.items()))
+            if not self.isExpired(nation):
+                break
+            self.evict(id)
+            self.expired += 1
+
+        while len(self.transient) > self.maxTransient:
+            self.evict(next(iter(self.transient)))
+            self.evicted += 1
+
+# Recent API answers, each kept for its own number of seconds, least recently used dropped first
+class ResponseCache:
+    def __init__(self, maxSize: int, clock: Callable[[], float] = time.monotonic):
+        self.maxSize = maxSize
+        self.clock = clock
+        # key -> (expiry, value)
+        self.entries: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.invalidated = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Any) -> Any | None:
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Any, value: Any, ttl: float) -> None:
+        if ttl <= 0 or self.maxSize <= 0:
+            return
+
+        self.entries.pop(key, None)
+        self.entries[key] = (self.clock() + ttl, value)
+        while len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+            self.evicted += 1
+
+    def discard(self, key: Any) -> None:
+        if self.entries.pop(key, None) is not None:
+            self.invalidated += 1
+
+    def clear(self) -> None:
+        self.invalidated += len(self.entries)
+        self.entries.clear()
+
+    def hitRate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+# Nation ids kept sorted by a key, for range and top-k queries
+class SortedIndex:
+    def __init__(self):
+        self.entries: list[tuple[Any, str]] = []
+        self.keys: dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self.keys
+
+    def key(self, id: str) -> Any:
+        return self.keys.get(id)
+
+    def put(self, id: str, key: Any) -> None:
+        previous = self.keys.get(id)
+        if previous is not None:
+            if previous == key:
+                return
+            del self.entries[bisect_left(self.entries, (previous, id))]
+
+        self.keys[id] = key
+        insort(self.entries, (key, id))
+
+    def discard(self, id: str) -> None:
+        previous = self.keys.pop(id, None)
+        if previous is not None:
+            del self.entries[bisect_left(self.entries, (previous, id))]
+
+    def clear(self) -> None:
+        self.entries = []
+        self.keys = {}
+
+    # low <= key <= high, either bound optional. A live view, nothing is copied until it's paged.
+    def range(self, low: Any = None, high: Any = None, reverse: bool = False) -> "IndexRange":
+        return IndexRange(self, low, high, reverse)
+
+class IndexRange:
+    def __init__(self, index: SortedIndex, low: Any, high: Any, reverse: bool):
+        self.index = index
+        self.low = low
+        self.high = high
+        self.reverse = reverse
+
+    def bounds(self) -> tuple[int, int]:
+        entries = self.index.entries
+        start = 0 if self.low is None else bisect_left(entries, self.low, key=itemgetter(0))
+        stop = len(entries) if self.high is None else bisect_right(entries, self.high, key=itemgetter(0))
+        return start, max(start, stop)
+
+    def __len__(self) -> int:
+        start, stop = self.bounds()
+        return stop - start
+
+    # Returns (key, id) pairs for positions [offset, offset + count) of the range
+    def page(self, offset: int, count: int) -> list[tuple[Any, str]]:
+        start, stop = self.bounds()
+        if self.reverse:
+            end = max(start, stop - offset)
+            return self.index.entries[max(start, end - count):end][::-1]
+
+        begin = min(stop, start + offset)
+        return self.index.entries[begin:min(stop, begin + count)]
+
+    def __iter__(self) -> Iterator[str]:
+        start, stop = self.bounds()
+        positions = range(stop - 1, start - 1, -1) if self.reverse else range(start, stop)
+        entries = self.index.entries
+        return (entries[position][1] for position in positions)
@@ -0,0 +1,4 @@
+import sans
+
+# sans takes a user agent once per process, before any request
+sans.set_agent("Polaris tests")
@@ -0,0 +1,59 @@
+# The bot's API client, event listener and cache wired to a StandInServer, for tests
+
+import asyncio, unittest
+from cogs.api import APIClient, API_WINDOW
+from cogs.cache import CacheManager
+from cogs.events import EventListener
+from limiter import RequestLimiter
+from standin import StandInServer, StandInWorld
+
+class StandInBot:
+    region = "test_region"
+
+    def __init__(self):
+        self.cogs = {}
+        self.extra_events = {}
+        self.dispatched = []
+
+    def get_cog(self, name):
+        return self.cogs.get(name)
+
+    def dispatch(self, *args):
+        self.dispatched.append(args)
+
+class StandInTestCase(unittest.IsolatedAsyncioTestCase):
+    nations = 20
+    latency = 0.0
+
+    async def asyncSetUp(self):
+        self.world = StandInWorld.synthetic(self.nations, "test_region")
+        self.server = StandInServer(self.world, latency=self.latency)
+        await self.server.start()
+
+        self.bot = StandInBot()
+        self.api = self.bot.cogs["APIClient"] = APIClient(self.bot, self.server.url())
+        # The stand-in doesn't need the real limit, and tests shouldn't wait on it
+        self.api.limiter = RequestLimiter(1000, API_WINDOW)
+        self.events = self.bot.cogs["EventListener"] = EventListener(self.bot)
+        self.cache = self.bot.cogs["CacheManager"] = CacheManager(self.bot, "test_region")
+        self.bot.extra_events = {name: [getattr(self.cache, name)] for name in dir(self.cache) if name.startswith("on_event")}
+
+    async def asyncTearDown(self):
+        tasks = [*self.events.workers, *self.cache.joinFetches]
+        if self.events.task is not None:
+            tasks.append(self.events.task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        await self.api.client.aclose()
+        await self.server.stop()
+
+    def startWorkers(self) -> None:
+        for queue in self.events.queues:
+            self.events.workers.append(asyncio.create_task(self.events.work(queue)))
+
+    # Waits until every queued event, and every fetch they started, is done
+    async def settle(self) -> None:
+        await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self.events.queues)), 5)
+        await asyncio.wait_for(asyncio.gather(*self.cache.joinFetches), 5)
@@ -0,0 +1,105 @@
+# Run from the discord/ directory: python -m unittest discover tests
+
+import unittest
+from unittest import mock
+from cogs.cache import CacheManager
+from cogs.events import EventListener
+from tests.support import StandInTestCase
+
+class FakeRedis(dict):
+    def set(self, key, value):
+        self[key] = value
+
+class BackfillTest(StandInTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        await self.cache.rebuildCache()
+        self.startWorkers()
+
+    # An endorsement between regional WA nations that the cache doesn't know about yet
+    def endorse(self) -> tuple[str, str]:
+        for source in self.world.nations.values():
+            for target in self.world.nations.values():
+                if source is not target and source.id not in target.endorsements:
+                    target.endorsements.append(source.id)
+                    self.server.publish(f"@@{source.id}@@ endorsed @@{target.id}@@.")
+                    return (source.id, target.id)
+
+    def assertEndorsed(self, sourceId: str, targetId: str) -> None:
+        self.assertIn(sourceId, self.cache.nation(targetId).endorsements)
+        self.assertIn(sourceId, self.cache.verifiedEndorsements(targetId))
+
+    async def testAppliesMissedEvents(self):
+        (sourceId, targetId) = self.endorse()
+        self.assertNotIn(sourceId, self.cache.nation(targetId).endorsements)
+
+        self.assertTrue(await self.events.backfill(0))
+        await self.settle()
+        self.assertEndorsed(sourceId, targetId)
+        self.assertEqual(self.cache.auditEndorsementCounts(), 0)
+
+    async def testHandlesEachEventOnce(self):
+        self.endorse()
+        await self.events.backfill(0)
+        await self.events.backfill(0)
+        await self.settle()
+        self.assertEqual(self.events.queueStats.enqueued, 1)
+
+    async def testIncompleteWhenThePagesRunOut(self):
+        for _ in range(5):
+            self.endorse()
+
+        with mock.patch("cogs.events.BACKFILL_PAGE_SIZE", 2), mock.patch("cogs.events.MAX_BACKFILL_PAGES", 1):
+            self.assertFalse(await self.events.backfill(0))
+        await self.settle()
+        self.assertEqual(self.events.queueStats.enqueued, 2)
+
+    async def testReconnectReplaysSinceTheLastEvent(self):
+        (firstSource, firstTarget) = self.endorse()
+        self.events.resume(self.world.happenings[-1].id, None)
+        (sourceId, targetId) = self.endorse()
+
+        with mock.patch("cogs.events.BACKFILL_OVERLAP", 0):
+            await self.events.reconnect()
+        await self.settle()
+
+        self.assertEndorsed(sourceId, targetId)
+        self.assertNotIn(firstSource, self.cache.nation(firstTarget).endorsements)
+        self.assertNotIn(("markDirtyCache",), self.bot.dispatched)
+
+    async def testReconnectWithoutAResumePoint(self):
+        await self.events.reconnect()
+        self.assertIn(("markDirtyCache",), self.bot.dispatched)
+
+    async def testSnapshotResumesWhereItLeftOff(self):
+        self.endorse()
+        await self.events.backfill(0)
+        await self.settle()
+
+        self.cache.redis = FakeRedis()
+        await self.cache.saveSnapshot()
+        (sourceId, targetId) = self.endorse()
+
+        # A restart: a new listener and cache, restored from the snapshot
+        for worker in self.events.workers:
+            worker.cancel()
+        redis = self.cache.redis
+        self.events = self.bot.cogs["EventListener"] = EventListener(self.bot)
+        with mock.patch("cogs.cache.get_redis_connection", lambda **_: redis):
+            self.cache = self.bot.cogs["CacheManager"] = CacheManager(self.bot, "test_region")
+        self.bot.extra_events = {name: [getattr(self.cache, name)] for name in dir(self.cache) if name.startswith("on_event")}
+
+        self.assertTrue(await self.cache.restoreSnapshot())
+        self.assertEqual(self.events.lastEventId, self.world.happenings[-2].id)
+        self.assertNotIn(sourceId, self.cache.nation(targetId).endorsements)
+
+        self.startWorkers()
+        with mock.patch("cogs.events.BACKFILL_OVERLAP", 0):
+            await self.events.reconnect()
+        await self.settle()
+
+        self.assertEndorsed(sourceId, targetId)
+        self.assertEqual(self.cache.auditEndorsementCounts(), 0)
+
+if __name__ == "__main__":
+    unittest.main()
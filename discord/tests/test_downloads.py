@@ -0,0 +1,42 @@
+# Run from the discord/ directory: python -m unittest discover tests
+
+import os, tempfile, time, unittest
+from unittest import mock
+from cogs.api import APIClient, APIUnavailableError
+from cogs.cache import CacheManager
+from standin import StandInServer, StandInWorld
+from tests.test_nationstore import StandInBot
+
+class DownloadDumpTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = StandInServer(StandInWorld.synthetic(10), latency=0)
+        await self.server.start()
+        self.api = APIClient(None, self.server.url())
+        self.path = os.path.join(tempfile.mkdtemp(), "nations.xml.gz")
+
+    async def asyncTearDown(self):
+        await self.api.client.aclose()
+        await self.server.stop()
+
+    async def testDownloads(self):
+        await self.api.downloadNationsDump(self.path)
+        self.assertTrue(os.path.exists(self.path))
+
+    async def testOutageRunsOutOfAttempts(self):
+        self.server.outageUntil = time.monotonic() + 60
+        with mock.patch("cogs.api.DUMP_RETRY_BASE_DELAY", 0.01):
+            with self.assertRaises(APIUnavailableError):
+                await self.api.downloadNationsDump(self.path)
+        self.assertFalse(os.path.exists(self.path))
+
+    async def testFailedDownloadMeansNoDump(self):
+        self.server.outageUntil = time.monotonic() + 60
+        bot = StandInBot()
+        bot.get_cog = lambda name: self.api if name == "APIClient" else None
+        cache = CacheManager(bot, "bench_region")
+
+        with mock.patch("cogs.api.DUMP_RETRY_BASE_DELAY", 0.01), mock.patch("cogs.cache.DOWNLOAD_DUMPS", True):
+            self.assertFalse(await cache.ensureDump(self.path, self.api.downloadNationsDump))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+# Run from the discord/ directory: python -m unittest discover tests
+
+import gzip, os, tempfile, unittest
+from dumps import loadNationsDump
+
+NATIONS_DUMP = """<?xml version="1.0" encoding="UTF-8"?>
+<NATIONS api_version="12">
+<NATION><NAME>Testlandia</NAME><UNSTATUS>WA Member</UNSTATUS><ENDORSEMENTS>a,b</ENDORSEMENTS><REGION>Test Region</REGION><POPULATION>5</POPULATION><FLAG>flag.svg</FLAG><LASTLOGIN>1700000000</LASTLOGIN><FIRSTLOGIN>1500000000</FIRSTLOGIN><CENSUS><SCALE id="80"><SCORE>12.5</SCORE></SCALE></CENSUS></NATION>
+<NATION><NAME>Elsewhere</NAME><UNSTATUS>Non-member</UNSTATUS><ENDORSEMENTS></ENDORSEMENTS><REGION>Other Region</REGION><POPULATION>5</POPULATION><FLAG>flag.svg</FLAG><LASTLOGIN>1700000000</LASTLOGIN><FIRSTLOGIN>1500000000</FIRSTLOGIN><CENSUS></CENSUS></NATION>
+</NATIONS>
+"""
+
+class LoadNationsDumpTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.path = os.path.join(directory, "nations.xml.gz")
+        with gzip.open(self.path, "wt", encoding="utf-8") as file:
+            file.write(NATIONS_DUMP)
+        # Generated a day before it was read
+        os.utime(self.path, (1700086400, 1700000000))
+
+    def testDumpTimeIsModificationTime(self):
+        (nations, _) = loadNationsDump(self.path, "test_region")
+        nation = nations["testlandia"]
+        self.assertEqual(nation.lastApiUpdateTime, 1700000000)
+        self.assertEqual(nation.lastResidencyUpdateTime, 1700000000)
+
+    def testCanRecruitLeftUnknown(self):
+        (nations, _) = loadNationsDump(self.path, "test_region")
+        self.assertIsNone(nations["testlandia"].canRecruit)
+
+    def testOnlyRegionNations(self):
+        (nations, stats) = loadNationsDump(self.path, "test_region")
+        self.assertEqual(set(nations), {"testlandia"})
+        self.assertEqual(stats.parsed, 2)
+
+if __name__ == "__main__":
+    unittest.main()
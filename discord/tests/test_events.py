@@ -0,0 +1,123 @@
+# Run from the discord/ directory: python -m unittest discover tests
+
+import asyncio, time, unittest
+from unittest import mock
+from classifier import classify
+from classes import *
+from cogs.cache import CacheManager
+from cogs.events import EventListener
+from tests.test_nationstore import StandInBot, newNation
+
+class EventBot(StandInBot):
+    def __init__(self):
+        self.extra_events = {}
+
+class HandledThroughTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.bot = EventBot()
+        self.listener = EventListener(self.bot)
+        self.released = asyncio.Event()
+        self.handled = []
+
+        async def on_eventEndo(sourceId, targetId):
+            if targetId == "slow":
+                await self.released.wait()
+            self.handled.append(targetId)
+        self.bot.extra_events["on_eventEndo"] = [on_eventEndo]
+
+        for queue in self.listener.queues:
+            self.listener.workers.append(asyncio.create_task(self.listener.work(queue)))
+
+    async def asyncTearDown(self):
+        for worker in self.listener.workers:
+            worker.cancel()
+
+    # Events from different senders, handled by different workers
+    def senders(self) -> list[str]:
+        senders = {}
+        for number in range(100):
+            sourceId = f"sender_{number}"
+            queue = self.listener.queueFor(classify(f"@@{sourceId}@@ endorsed @@target@@."))
+            senders.setdefault(id(queue), sourceId)
+        return list(senders.values())
+
+    async def publish(self, eventId: int, sourceId: str, targetId: str) -> None:
+        await self.listener.handle(eventId, 1700000000 + eventId, f"@@{sourceId}@@ endorsed @@{targetId}@@.")
+
+    async def handledCount(self, count: int) -> None:
+        while len(self.handled) < count:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0)
+
+    async def testStopsBeforeUnhandledEvents(self):
+        (first, second, *_) = self.senders()
+        await self.publish(10, first, "fast")
+        await self.publish(11, first, "slow")
+        await self.publish(12, second, "other")
+        await asyncio.wait_for(self.handledCount(2), 5)
+
+        # 12 is done, but 11 is still being handled
+        self.assertEqual(self.listener.lastEventId, 12)
+        self.assertEqual(self.listener.handledThrough(), (10, 1700000011))
+
+        self.released.set()
+        await asyncio.wait_for(self.handledCount(3), 5)
+        self.assertEqual(self.listener.handledThrough(), (12, 1700000012))
+
+class SheddingTest(unittest.IsolatedAsyncioTestCase):
+    async def testWatermarkIsPerQueue(self):
+        with mock.patch("cogs.events.EVENT_QUEUE_SIZE", 16):
+            listener = EventListener(EventBot())
+        queue = listener.queueFor(classify("@@flagger@@ altered its national flag."))
+
+        # Nothing is handling events, so without shedding the fourth would block
+        for eventId in range(1, 6):
+            await asyncio.wait_for(listener.handle(eventId, 1700000000, "@@flagger@@ altered its national flag."), 1)
+
+        self.assertEqual(queue.qsize(), 3)
+        self.assertEqual(listener.queueStats.shed, 2)
+        self.assertTrue(listener.queueStats.shedding)
+
+    def testCachedNationsAreNeverShed(self):
+        bot = EventBot()
+        cache = mock.Mock(region=lambda: None, isNationCached=lambda nationId: nationId == "cached")
+        bot.get_cog = lambda name: cache if name == "CacheManager" else None
+        listener = EventListener(bot)
+
+        self.assertFalse(listener.isWorldOnly(classify("@@cached@@ altered its national flag.")))
+        self.assertFalse(listener.isWorldOnly(classify("@@cached@@ became WA Delegate of %%elsewhere%%.")))
+        self.assertTrue(listener.isWorldOnly(classify("@@stranger@@ altered its national flag.")))
+
+class SlowAPI:
+    def __init__(self):
+        self.released = asyncio.Event()
+
+    def forgetNation(self, nationId):
+        pass
+
+    async def fetchNation(self, nationId, priority):
+        await self.released.wait()
+        return newNation(nationId, "test_region")
+
+class JoinFetchTest(unittest.IsolatedAsyncioTestCase):
+    async def testAdmitDoesNotWaitForTheFetch(self):
+        api = SlowAPI()
+        bot = StandInBot()
+        bot.get_cog = lambda name: api if name == "APIClient" else None
+        dispatched = []
+        bot.dispatch = lambda *args: dispatched.append(args)
+
+        cache = CacheManager(bot, "test_region")
+        cache.mainRegion = Region("test_region", "Test Region", {"joiner"}, None, {}, set(), time.time())
+        cache.regionalNations.pin("test_region", {"joiner"})
+
+        await asyncio.wait_for(cache.on_eventWaAdmit("joiner"), 1)
+        self.assertNotIn(("localWaAdmit", "joiner", "test_region"), dispatched)
+
+        api.released.set()
+        await asyncio.wait_for(asyncio.gather(*cache.joinFetches), 1)
+        self.assertTrue(cache.isNationCached("joiner"))
+        self.assertIn(("localWaAdmit", "joiner", "test_region"), dispatched)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+# Run from the discord/ directory: python -m unittest discover tests
+
+import asyncio, time, unittest
+from unittest import mock
+import sans
+from classes import *
+from cogs.api import APIUnavailableError
+from limiter import PRIORITY_INTERACTIVE, PRIORITY_RECRUITMENT
+from tests.support import StandInTestCase
+
+def fetchName(api, nationId: str, **kwargs):
+    return api.execute(sans.Nation(nationId, "name"), lambda response: response.status_code, PRIORITY_INTERACTIVE, **kwargs)
+
+class RetryTest(StandInTestCase):
+    async def testRetriesThroughAShortOutage(self):
+        self.server.outageUntil = time.monotonic() + 0.3
+        with mock.patch("cogs.api.RETRY_BASE_DELAY", 0.2):
+            self.assertEqual(await fetchName(self.api, "nation_1"), 200)
+
+        (row,) = self.api.ledger.rows()
+        self.assertGreater(row["requests"], 1)
+        self.assertEqual(row["failed"], row["requests"] - 1)
+
+    async def testNotFound(self):
+        self.assertIsNone(await fetchName(self.api, "nowhere"))
+
+    async def testNoRetry(self):
+        self.server.outageUntil = time.monotonic() + 60
+        with self.assertRaises(APIUnavailableError):
+            await fetchName(self.api, "nation_1", retry=False)
+        self.assertEqual(len(self.server.requests), 1)
+
+class DeadlineTest(StandInTestCase):
+    latency = 0.2
+
+    async def testGivesUpAtTheDeadline(self):
+        self.server.outageUntil = time.monotonic() + 60
+        start = time.monotonic()
+        with self.assertRaises(APIUnavailableError):
+            await fetchName(self.api, "nation_1", deadline=1)
+        self.assertLess(time.monotonic() - start, 1.5)
+
+    async def testSlowAnswerTimesOut(self):
+        with self.assertRaisesRegex(APIUnavailableError, "deadline"):
+            await fetchName(self.api, "nation_1", deadline=0.05)
+
+class TelegramTest(StandInTestCase):
+    latency = 0.2
+
+    async def testOutlivesTheRecruitmentDeadline(self):
+        telegram = APITelegram("nation_1", "1", "secret")
+        with mock.patch.dict("cogs.api.DEADLINES", {PRIORITY_RECRUITMENT: 0.05}):
+            result = await self.api.sendAPITelegram("client", telegram, sans.TelegramLimiter(recruitment=False))
+        self.assertEqual(result, "queued")
+
+class BreakerTest(StandInTestCase):
+    latency = 0.05
+
+    async def testOpensAndFailsFast(self):
+        self.server.outageUntil = time.monotonic() + 60
+        for number in range(self.api.breaker.threshold):
+            with self.assertRaises(APIUnavailableError):
+                await fetchName(self.api, f"nation_{number}", retry=False)
+        self.assertTrue(self.api.breaker.isOpen())
+
+        sent = len(self.server.requests)
+        with self.assertRaisesRegex(APIUnavailableError, "unavailable"):
+            await fetchName(self.api, "nation_10", deadline=1)
+        self.assertEqual(len(self.server.requests), sent)
+
+    async def testProbeClosesIt(self):
+        self.server.outageUntil = time.monotonic() + 60
+        for number in range(self.api.breaker.threshold):
+            with self.assertRaises(APIUnavailableError):
+                await fetchName(self.api, f"nation_{number}", retry=False)
+
+        self.server.outageUntil = 0
+        self.api.breaker.openUntil = 0
+        self.assertEqual(await fetchName(self.api, "nation_10"), 200)
+        self.assertFalse(self.api.breaker.isOpen())
+
+    async def testSharedFailureCountsOnce(self):
+        self.server.outageUntil = time.monotonic() + 60
+        calls = [fetchName(self.api, "nation_1", retry=False) for _ in range(self.api.breaker.threshold)]
+        results = await asyncio.gather(*calls, return_exceptions=True)
+
+        self.assertTrue(all(isinstance(result, APIUnavailableError) for result in results))
+        self.assertEqual(self.api.coalesced, len(calls) - 1)
+        self.assertEqual(self.api.breaker.failures, 1)
+        self.assertFalse(self.api.breaker.isOpen())
+
+if __name__ == "__main__":
+    unittest.main()
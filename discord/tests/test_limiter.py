@@ -0,0 +1,26 @@
+# Run from the discord/ directory: python -m unittest discover tests
+
+import unittest
+from limiter import RequestLimiter, PRIORITY_INTERACTIVE
+
+class UpdateTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.limiter = RequestLimiter(45, 30)
+        await self.limiter.acquire(PRIORITY_INTERACTIVE)
+
+    def testBooksOutsideRequests(self):
+        # Two requests against the server's limit of 50, only one of them ours
+        self.limiter.update({"RateLimit-Limit": "50", "RateLimit-Remaining": "48"})
+        self.assertEqual(self.limiter.free(), 43)
+
+    def testNothingOutside(self):
+        self.limiter.update({"RateLimit-Limit": "50", "RateLimit-Remaining": "49"})
+        self.assertEqual(self.limiter.free(), 44)
+
+    def testBlocksWhenExhausted(self):
+        self.limiter.update({"RateLimit-Limit": "50", "RateLimit-Remaining": "0", "RateLimit-Reset": "10"})
+        self.assertEqual(self.limiter.free(), 0)
+        self.assertFalse(self.limiter.available(PRIORITY_INTERACTIVE))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+# Run from the discord/ directory: python -m unittest discover tests
+
+import time, unittest
+from classes import *
+from cogs.cache import CacheManager
+from storage import NationStore
+
+class StandInBot:
+    region = "test_region"
+
+    def get_cog(self, name):
+        return None
+
+    def dispatch(self, *args):
+        pass
+
+def newNation(nationId: str, region: str, endorsements: set[str] = set()) -> Nation:
+    return Nation(nationId, nationId, "", WA_MEMBER, region, set(endorsements),
+                  0, 0, True, 0, 0, time.time(), time.time())
+
+class NationStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.store = NationStore(lambda nation: nation.region == "home", maxTransient=10, maxAge=3600)
+
+    def testPopResident(self):
+        nation = newNation("a", "home")
+        self.store.put(nation)
+        self.assertIs(self.store.pop("a"), nation)
+        self.assertIsNone(self.store.get("a"))
+
+    def testPopTransient(self):
+        nation = newNation("b", "elsewhere")
+        self.store.put(nation)
+        self.assertIs(self.store.pop("b"), nation)
+        self.assertIsNone(self.store.get("b"))
+
+    def testPopMissing(self):
+        self.assertIsNone(self.store.pop("nobody"))
+
+class DropNationTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = CacheManager(StandInBot(), "test_region")
+        self.cache.mainRegion = Region("test_region", "Test Region", {"a", "b"}, None, {}, set(), time.time())
+        self.cache.regionalNations.pin("test_region", {"a", "b"})
+        self.cache.waNations = {"a", "b"}
+        self.cache.recountRegionWa()
+
+    def testDropsCachedNation(self):
+        self.cache.storeNation(newNation("b", "test_region"))
+        self.cache.storeNation(newNation("a", "test_region", {"b"}))
+
+        self.cache.dropNation("a")
+        self.assertFalse(self.cache.isNationCached("a"))
+        self.assertEqual(self.cache.endorsementsGiven("b"), set())
+
+    def testDropsUnknownNation(self):
+        self.cache.dropNation("nobody")
+        self.assertFalse(self.cache.isNationCached("nobody"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+# Run from the discord/ directory: python -m unittest discover tests
+
+import random, time, unittest
+from cogs.cache import CacheManager
+from standin import StandInNation, StandInRegion
+from tests.support import StandInTestCase
+from tests.test_nationstore import StandInBot
+
+class CheckForRebuildTest(unittest.IsolatedAsyncioTestCase):
+    async def testFailedRebuildCanBeRetried(self):
+        cache = CacheManager(StandInBot(), "test_region")
+
+        async def rebuildCache():
+            cache.lastRebuildStart = time.time()
+            raise OSError("dump unreadable")
+        cache.rebuildCache = rebuildCache
+
+        with self.assertLogs("cache", "ERROR"):
+            await cache.checkForRebuild()
+        self.assertEqual(cache.lastRebuildStart, cache.lastRebuildEnd)
+
+# The counters and indexes the cache maintains incrementally, against a recount
+class ConsistencyMixin:
+    def assertConsistent(self) -> None:
+        cache = self.cache
+        self.assertEqual(cache.auditEndorsementCounts(), 0)
+
+        regionWa = cache.regionWaNations()
+        self.assertEqual(regionWa, cache.waNations & cache.mainRegion.nations)
+        self.assertEqual(cache.regionEndorsementsGiven(), sum(len(cache.verifiedEndorsements(nationId)) for nationId in regionWa))
+
+        for nationId in regionWa:
+            given = {endorsee for endorsee in regionWa
+                     if endorsee != nationId and nationId in cache.verifiedEndorsements(endorsee)}
+            self.assertEqual(cache.endorsementsGiven(nationId), given, nationId)
+
+        indexed = {nationId for nationId in regionWa if cache.isNationCached(nationId)}
+        for index in (cache.byLastLogin, cache.byLoginChecked, cache.byFoundedAt, cache.byResidency):
+            self.assertEqual(len(index), len(indexed))
+            self.assertTrue(all(nationId in index for nationId in indexed))
+
+class RebuildTest(ConsistencyMixin, StandInTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        await self.cache.rebuildCache()
+
+    async def testMatchesTheStandIn(self):
+        self.assertTrue(self.cache.firstCacheComplete())
+        self.assertEqual(self.cache.regionWaNations(), set(self.world.waMembers()))
+        for (nationId, nation) in self.world.nations.items():
+            self.assertEqual(set(self.cache.nation(nationId).endorsements), set(nation.endorsements), nationId)
+        self.assertIn(("cacheRebuildComplete",), self.bot.dispatched)
+        self.assertConsistent()
+
+    async def testReconcilesMembershipChanges(self):
+        region = self.world.regions["test_region"]
+        self.world.regions["elsewhere"] = StandInRegion("elsewhere", "Elsewhere")
+
+        # One resident left without the cache hearing about it, another arrived
+        leaver = self.world.nations["nation_3"]
+        region.nations.remove(leaver.id)
+        leaver.region = "elsewhere"
+        self.world.regions["elsewhere"].nations.append(leaver.id)
+        newcomer = StandInNation("newcomer", "Newcomer", "test_region", "WA Member", ["nation_1"])
+        self.world.nations[newcomer.id] = newcomer
+        region.nations.append(newcomer.id)
+
+        self.assertTrue(await self.cache.reconcileCache())
+        self.assertNotIn(leaver.id, self.cache.mainRegion.nations)
+        self.assertNotIn(leaver.id, self.cache.regionWaNations())
+        self.assertTrue(self.cache.isNationCached(newcomer.id))
+        self.assertIn(newcomer.id, self.cache.regionWaNations())
+        self.assertConsistent()
+
+class EventConsistencyTest(ConsistencyMixin, StandInTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        elsewhere = self.world.regions["elsewhere"] = StandInRegion("elsewhere", "Elsewhere")
+        for number in range(5):
+            nation = StandInNation(f"foreign_{number}", f"Foreign {number}", "elsewhere", "WA Member")
+            self.world.nations[nation.id] = nation
+            elsewhere.nations.append(nation.id)
+
+        await self.cache.rebuildCache()
+        self.startWorkers()
+        self.eventId = 0
+
+    async def happen(self, text: str) -> None:
+        self.eventId += 1
+        await self.events.handle(self.eventId, time.time(), text)
+
+    def inWa(self, nationId: str) -> bool:
+        return self.world.nations[nationId].waStatus != "Non-member"
+
+    # Applies a random happening to the stand-in's world, then tells the cache about it
+    async def randomHappening(self, rng: random.Random) -> None:
+        nation = self.world.nations[rng.choice(sorted(self.world.nations))]
+        other = self.world.nations[rng.choice(self.world.regions[nation.region].nations)]
+        kind = rng.choices(["endo", "unendo", "resign", "admit", "move", "cte"], [12, 4, 1, 2, 2, 1])[0]
+
+        if kind == "endo" and nation is not other and self.inWa(nation.id) and self.inWa(other.id) \
+                and nation.id not in other.endorsements:
+            other.endorsements.append(nation.id)
+            await self.happen(f"@@{nation.id}@@ endorsed @@{other.id}@@.")
+        elif kind == "unendo" and nation.id in other.endorsements:
+            other.endorsements.remove(nation.id)
+            await self.happen(f"@@{nation.id}@@ withdrew its endorsement from @@{other.id}@@.")
+        elif kind == "resign" and self.inWa(nation.id):
+            nation.waStatus = "Non-member"
+            nation.endorsements.clear()
+            for endorsee in self.world.nations.values():
+                if nation.id in endorsee.endorsements:
+                    endorsee.endorsements.remove(nation.id)
+            await self.happen(f"@@{nation.id}@@ resigned from the World Assembly.")
+        elif kind == "admit" and not self.inWa(nation.id):
+            nation.waStatus = "WA Member"
+            await self.happen(f"@@{nation.id}@@ was admitted to the World Assembly.")
+        elif kind == "move":
+            source = nation.region
+            target = "elsewhere" if source == "test_region" else "test_region"
+            self.world.regions[source].nations.remove(nation.id)
+            self.world.regions[target].nations.append(nation.id)
+            nation.region = target
+            # Endorsements don't survive a move
+            nation.endorsements.clear()
+            for endorsee in self.world.nations.values():
+                if nation.id in endorsee.endorsements:
+                    endorsee.endorsements.remove(nation.id)
+            await self.happen(f"@@{nation.id}@@ relocated from %%{source}%% to %%{target}%%.")
+        elif kind == "cte" and len(self.world.nations) > 20:
+            del self.world.nations[nation.id]
+            self.world.regions[nation.region].nations.remove(nation.id)
+            for endorsee in self.world.nations.values():
+                if nation.id in endorsee.endorsements:
+                    endorsee.endorsements.remove(nation.id)
+            await self.happen(f"@@{nation.id}@@ ceased to exist in %%{nation.region}%%.")
+
+    async def testRandomHappenings(self):
+        rng = random.Random(3)
+        for step in range(600):
+            await self.randomHappening(rng)
+            if step % 50 == 49:
+                await self.settle()
+                self.assertConsistent()
+
+        await self.settle()
+        self.assertConsistent()
+        self.assertEqual(self.events.queueStats.failed, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+# Run from the discord/ directory: python -m unittest discover tests
+
+import asyncio, time, unittest
+from classes import *
+from cogs.cache import CacheManager
+from tests.test_nationstore import StandInBot, newNation
+
+class ReverifyTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = CacheManager(StandInBot(), "test_region")
+        self.cache.mainRegion = Region("test_region", "Test Region", {"home"}, None, {}, set(), time.time())
+        self.cache.regionalNations.pin("test_region", {"home"})
+        self.cache.waNations = {"home", "foreign", "endorser", "stranger"}
+        self.cache.recountRegionWa()
+
+    def updateRegion(self, regionId: str) -> None:
+        asyncio.run(self.cache.on_eventRegionUpdate(regionId))
+
+    def testUntrackedRegionKeepsEndorsements(self):
+        # Nothing is known about who lives in elsewhere, so nothing can be verified there
+        self.cache.storeNation(newNation("foreign", "elsewhere", {"endorser"}))
+        self.assertNotIn("elsewhere", self.cache.pendingReverify)
+
+        self.updateRegion("elsewhere")
+        self.assertEqual(self.cache.nation("foreign").endorsements, {"endorser"})
+
+    def testTrackedRegionDropsInvalidEndorsements(self):
+        self.cache.storeNation(newNation("home", "test_region", {"stranger"}))
+        self.assertIn("home", self.cache.pendingReverify["test_region"])
+
+        self.updateRegion("test_region")
+        self.assertEqual(self.cache.nation("home").endorsements, set())
+
+if __name__ == "__main__":
+    unittest.main()
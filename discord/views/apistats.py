@@ -0,0 +1,52 @@
+import discord
+from typing import Any
+
+# Endpoints listed per subsystem, the rest are in the raw dump
+MAX_ENDPOINTS = 6
+
+def formatBytes(size: int) -> str:
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KiB"
+    return f"{size / (1024 * 1024):.1f} MiB"
+
+def formatEndpoint(row: dict[str, Any]) -> str:
+    line = (f"`{row['endpoint']}` `{row['requests']}`, {formatBytes(row['bytes'])}, "
+            f"p50 `{row['p50']:.2f}s` p90 `{row['p90']:.2f}s` p99 `{row['p99']:.2f}s`")
+    if row["throttled"]:
+        line += f", `{row['throttled']}` 429s"
+    if row["failed"]:
+        line += f", `{row['failed']}` failed"
+    return line
+
+def getApiStatsEmbed(snapshot: dict[str, Any], limit: int, window: int):
+    rows = [row for row in snapshot["rows"] if row["requests"]]
+    requests = sum(row["requests"] for row in rows)
+    minutes = snapshot["window"] // 60
+    budget = limit * snapshot["window"] // window
+
+    embed = discord.Embed(
+        color=5814783,
+        title="API Usage",
+        description=f"`{requests}` requests in the last {minutes} minutes, {requests / budget:.0%} of the `{budget}` the rate limit allows",
+    )
+
+    # Busiest subsystem first, rows are already busiest first
+    subsystems: dict[str, list[dict[str, Any]]] = {}
+    for row in rows:
+        subsystems.setdefault(row["subsystem"], []).append(row)
+
+    for (subsystem, endpoints) in sorted(subsystems.items(), key=lambda item: -sum(row["requests"] for row in item[1]))[:25]:
+        used = sum(row["requests"] for row in endpoints)
+        lines = [formatEndpoint(row) for row in endpoints[:MAX_ENDPOINTS]]
+        if len(endpoints) > MAX_ENDPOINTS:
+            lines.append(f"and {len(endpoints) - MAX_ENDPOINTS} more")
+
+        embed.add_field(
+            name=f"{subsystem}: {used} ({used / requests:.0%})",
+            value="\n".join(lines),
+            inline=False,
+        )
+
+    return embed
@@ -1,8 +1,18 @@
 import discord
+from rebuild import RebuildProgress
+
+def getCacheIncompleteEmbed(progress: RebuildProgress | None = None) -> discord.Embed:
+    description = "Sorry, the bot is starting up and gathering data! Please try again in a few minutes."
+
+    if progress and progress.total:
+        description += f"\n\nFetched {progress.finished()} of {progress.total} WA nations"
+        eta = progress.eta()
+        if eta is not None:
+            description += f", about {max(1, round(eta / 60))} minute(s) left"
+        description += "."
 
-def getCacheIncompleteEmbed() -> discord.Embed:
     return discord.Embed(
         color=5814783,
         title="Startup Incomplete",
-        description="Sorry, the bot is starting up and gathering data! Please try again in a few minutes.",
+        description=description,
     )
\ No newline at end of file
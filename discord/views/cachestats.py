@@ -0,0 +1,46 @@
+import discord
+from storage import RegionMembership, NationStore, ResponseCache
+
+def getCacheStatsEmbed(nations: NationStore, regionWa: int, membership: RegionMembership, capBytes: int, coalesced: int, responses: ResponseCache):
+    cap = f"`{capBytes // 1024} KiB`" if capBytes else "none"
+
+    return discord.Embed(
+        color=5814783,
+        title="Cache Statistics",
+    ).add_field(
+        name="Cached Nations",
+        value=f"`{len(nations.resident)}` residents, `{len(nations.transient)}` of `{nations.maxTransient}` foreign",
+        inline=False,
+    ).add_field(
+        name="Regional WA Nations",
+        value=f"`{regionWa}`",
+        inline=True,
+    ).add_field(
+        name="Foreign Lookups",
+        value=f"`{nations.hits}` hits, `{nations.misses}` misses",
+        inline=True,
+    ).add_field(
+        name="Foreign Nations Dropped",
+        value=f"`{nations.evicted}` evicted, `{nations.expired}` expired",
+        inline=True,
+    ).add_field(
+        name="Requests Coalesced",
+        value=f"`{coalesced}` saved",
+        inline=True,
+    ).add_field(
+        name="Nation Response Cache",
+        value=f"`{responses.hits}` hits ({responses.hitRate():.0%}), `{len(responses)}` of `{responses.maxSize}` entries",
+        inline=True,
+    ).add_field(
+        name="Tracked Regions",
+        value=f"`{len(membership)}` (`{membership.residents()}` residents)",
+        inline=False,
+    ).add_field(
+        name="Membership Memory",
+        value=f"`{membership.footprint() // 1024} KiB` (cap {cap})",
+        inline=True,
+    ).add_field(
+        name="Evicted Regions",
+        value=f"`{membership.evicted}`",
+        inline=True,
+    )
@@ -12,6 +12,13 @@ def getNonWaEmbed(nation: str, region: str):
         description=f"**{nation}** is a resident of **{region}**, but isn't in the World Assembly!\n\nHead over to the [World Assembly page](https://www.nationstates.net/page=un) to join first. **Remember that you can only have one nation in the World Assembly at a time.**",
     )
 
+def getAPIUnavailableEmbed():
+    return discord.Embed(
+        color=15277667,
+        title="NationStates Unavailable",
+        description="Sorry, NationStates isn't answering right now. Please try again in a few minutes.",
+    )
+
 def getNoBotOwnerEmbed():
     return discord.Embed(
         color=15277667,
@@ -0,0 +1,35 @@
+import discord
+
+def getEventQueueEmbed(stats, depth: int, capacity: int, workers: int):
+    return discord.Embed(
+        color=5814783,
+        title="Event Queue",
+    ).add_field(
+        name="Queued Events",
+        value=f"`{depth}` of `{capacity}`",
+        inline=True,
+    ).add_field(
+        name="Workers",
+        value=f"`{workers}`",
+        inline=True,
+    ).add_field(
+        name="Shedding",
+        value="Yes" if stats.shedding else "No",
+        inline=True,
+    ).add_field(
+        name="Handled",
+        value=f"`{stats.handled}` of `{stats.enqueued}`",
+        inline=True,
+    ).add_field(
+        name="Shed",
+        value=f"`{stats.shed}`",
+        inline=True,
+    ).add_field(
+        name="Listener Errors",
+        value=f"`{stats.failed}`",
+        inline=True,
+    ).add_field(
+        name="Lag",
+        value=f"`{stats.lastLag:.1f}s` (max `{stats.maxLag:.1f}s`)",
+        inline=False,
+    )
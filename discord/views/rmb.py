@@ -2,6 +2,8 @@ import discord
 from datetime import datetime
 from classes import RMBMessage, RMB_NORMAL_POST, RMB_MOD_SUPPRESSED, RMB_SELF_DELETED, RMB_SUPPRESSED
 from cogs.cache import CacheManager
+from cogs.api import APIUnavailableError, PROFILE_FLAG
+from ledger import accountTo, SUBSYSTEM_FLAG
 from nscode import parseNsCode
 from lib import normalize
 
@@ -46,8 +48,11 @@ class RMBView(discord.ui.View):
         nation = self.cache.nation(self.post.nation)
         if nation:
             if nation.flagDirty: # fetch it again
-                await self.cache.fetchNation(nation.id)
-                nation = self.cache.nation(nation.id)
+                try:
+                    with accountTo(SUBSYSTEM_FLAG):
+                        await self.cache.fetchNationProfile(nation.id, PROFILE_FLAG)
+                except APIUnavailableError:
+                    pass # the old flag will do
 
             embed.set_thumbnail(url=nation.flagUrl)
         